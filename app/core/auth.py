@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.invalidation import InvalidationEvent, invalidation_bus
+from app.core.security import decode_access_token
+from app.database.session import get_db
+from app.models.database import User as DBUser
+
+ANONYMOUS_USER_ID = "anonymous"
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/token", auto_error=False)
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: str
+    email: str
+    name: str
+    role: str
+
+
+class TokenCache:
+    """Bounded LRU of verified tokens that expires entries at the token's ``exp``"""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            principal, expires_at = entry
+            if time.time() >= expires_at:
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def put(self, token: str, principal: Principal, exp: float) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = min(exp, time.time() + self.ttl_seconds)
+        with self._lock:
+            self._entries[token] = (principal, expires_at)
+            self._entries.move_to_end(token)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[0].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[0].id]
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL_SECONDS)
+
+
+def apply_user_invalidation(event: InvalidationEvent) -> None:
+    """Drop cached principals of a user changed in any worker"""
+    if event.entity == "user":
+        token_cache.invalidate_user(event.entity_id)
+
+
+invalidation_bus.subscribe(apply_user_invalidation)
+
+
+def authenticate_token(token: str, db: Session) -> Optional[Principal]:
+    """Resolve a bearer token to a principal, using the cache when possible"""
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+
+    payload = decode_access_token(token)
+    if not payload or not payload.get("sub"):
+        return None
+    user = db.get(DBUser, payload["sub"])
+    if not user:
+        return None
+
+    principal = Principal(id=user.id, email=user.email, name=user.name, role=user.role)
+    token_cache.put(token, principal, float(payload.get("exp", 0)))
+    return principal
+
+
+async def get_current_user(
+    token: Optional[str] = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """Dependency for routes that require an authenticated user"""
+    principal = authenticate_token(token, db) if token else None
+    if not principal:
+        raise HTTPException(
+            status_code=401,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return principal
+
+
+async def get_current_user_id(
+    token: Optional[str] = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> str:
+    """Dependency that resolves the caller, falling back to the anonymous user"""
+    if not token:
+        return ANONYMOUS_USER_ID
+    principal = authenticate_token(token, db)
+    if not principal:
+        raise HTTPException(
+            status_code=401,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return principal.id
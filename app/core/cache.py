@@ -0,0 +1,303 @@
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    entries: int = 0
+    bytes: int = 0
+    max_bytes: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class CacheBackend(ABC):
+    """Key/value cache for service reads.
+
+    Values are treated as immutable: callers must copy before modifying
+    anything they get back. ``None`` is never cached.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]: ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None: ...
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Cached values for ``keys``, omitting misses"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    @abstractmethod
+    def stats(self) -> CacheStats: ...
+
+
+class FillGenerations:
+    """Per-scope counters that keep read-through fills from outliving an invalidation.
+
+    A reader takes ``current(scope)`` before loading from the database and
+    stores through ``set_if_current``. Invalidation calls ``bump`` before
+    deleting keys, so a fill that loaded rows before a write committed is
+    either refused or removed again right after it lands.
+    """
+
+    def __init__(self):
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def current(self, scope: str) -> int:
+        return self._generations.get(scope, 0)
+
+    def bump(self, *scopes: str) -> None:
+        with self._lock:
+            for scope in scopes:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+
+    def set_if_current(self, cache: CacheBackend, scope: str, generation: int, items: Dict[str, Any]) -> bool:
+        if not items or self.current(scope) != generation:
+            return False
+        cache.set_many(items)
+        # A bump between the check and the write: its deletes may have run first
+        if self.current(scope) != generation:
+            for key in items:
+                cache.delete(key)
+            return False
+        return True
+
+
+class NullCache(CacheBackend):
+    """Backend that caches nothing"""
+
+    def __init__(self):
+        self._stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        self._stats.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    def delete(self, key: str) -> None:
+        pass
+
+    def delete_prefix(self, prefix: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> CacheStats:
+        return self._stats
+
+
+class MemoryCache(CacheBackend):
+    """In-process TTL cache with LRU eviction bounded by total bytes.
+
+    Entry sizes are measured as their pickled length when stored.
+    """
+
+    def __init__(self, max_bytes: int, default_ttl: float):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._stats = CacheStats(max_bytes=max_bytes)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            value, _, expires_at = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if value is None:
+            return
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            self._stats.entries = len(self._entries)
+            self._stats.bytes = self._bytes
+            return CacheStats(**self._stats.as_dict())
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+class ExternalCache(CacheBackend):
+    """Cache stored in an external key/value service.
+
+    ``client`` needs the redis-py subset ``get``, ``mget``,
+    ``set(key, value, ex=...)``, ``delete(*keys)`` and ``scan_iter(match=...)``. Keys are
+    namespaced with ``prefix`` and values are pickled.
+    """
+
+    def __init__(self, client: Any, default_ttl: float, prefix: str = "quiz-api:"):
+        self.client = client
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+        self._stats = CacheStats()
+
+    def get(self, key: str) -> Optional[Any]:
+        payload = self.client.get(self.prefix + key)
+        if payload is None:
+            self._stats.misses += 1
+            return None
+        self._stats.hits += 1
+        return pickle.loads(payload)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if value is None:
+            return
+        ttl = ttl if ttl is not None else self.default_ttl
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.client.set(self.prefix + key, payload, ex=max(1, int(ttl)))
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        payloads = self.client.mget([self.prefix + key for key in keys])
+        found = {}
+        for key, payload in zip(keys, payloads):
+            if payload is not None:
+                found[key] = pickle.loads(payload)
+        self._stats.hits += len(found)
+        self._stats.misses += len(keys) - len(found)
+        return found
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        keys = list(self.client.scan_iter(match=f"{self.prefix}{prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self) -> None:
+        self.delete_prefix("")
+
+    def stats(self) -> CacheStats:
+        return CacheStats(**self._stats.as_dict())
+
+
+class LocalStoreClient:
+    """In-process stand-in for a Redis client, for development and tests"""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[1]:
+                del self._data[key]
+                return None
+            return entry[0]
+
+    def mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [self.get(key) for key in keys]
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None) -> bool:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ex if ex else float("inf"))
+        return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    def scan_iter(self, match: str = "*") -> Iterator[str]:
+        prefix = match[:-1] if match.endswith("*") else match
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+        return iter(keys)
+
+    def flushdb(self) -> bool:
+        with self._lock:
+            self._data.clear()
+        return True
+
+
+def build_cache() -> CacheBackend:
+    """Create the cache backend selected by ``CACHE_BACKEND``"""
+    backend = settings.CACHE_BACKEND
+    if backend == "memory":
+        return MemoryCache(settings.CACHE_MAX_BYTES, settings.CACHE_TTL_SECONDS)
+    if backend == "redis":
+        import redis
+
+        return ExternalCache(redis.Redis.from_url(settings.CACHE_URL), settings.CACHE_TTL_SECONDS)
+    if backend == "local":
+        return ExternalCache(LocalStoreClient(), settings.CACHE_TTL_SECONDS)
+    return NullCache()
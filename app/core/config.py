@@ -10,6 +10,10 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-here-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4  # threads available for bcrypt
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # 0 disables the verified-token cache
+    AUTH_TOKEN_CACHE_TTL_SECONDS: int = 300
     
     # API
     API_V1_STR: str = "/api/v1"
@@ -27,6 +31,91 @@ class Settings(BaseSettings):
     # Environment
     ENVIRONMENT: str = "development"
     
+    # Server
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WORKERS: int = 0  # 0 uses one worker per CPU core
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    DB_CREATE_ON_STARTUP: bool = True  # the production launcher creates tables once instead
+    
+    # Quiz data shards, by consistent hash of quiz_set_id; empty keeps everything in DATABASE_URL
+    SHARD_DATABASE_URLS: List[str] = []  # append new shards at the end, never reorder
+    SHARD_VIRTUAL_NODES: int = 64  # ring points per shard
+    
+    # Question rating recalculation
+    RATING_RECALC_INTERVAL_SECONDS: int = 0  # 0 disables the in-process job
+    RATING_RECALC_CHUNK_SIZE: int = 1000
+    RATING_RECALC_SETTLE_SECONDS: int = 5
+    
+    # Attempt storage: compact binary results instead of JSON
+    ATTEMPT_COMPACT_ENCODING: bool = True
+    ATTEMPT_HOT_DAYS: int = 90  # raw attempts kept in quiz_attempts before compaction
+    ATTEMPT_ARCHIVE_DIR: str = "archive/attempts"
+    ATTEMPT_COMPACTION_INTERVAL_SECONDS: int = 0  # 0 disables the in-process job
+    
+    # Post-submit side effects (progress, review scheduling) via the outbox table
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0  # 0 runs side effects inline in the request
+    OUTBOX_CONCURRENCY: int = 4
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_BATCH_DELAY_SECONDS: float = 0.05  # wait after a wake-up so events are handled in batches
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_RETRY_BASE_SECONDS: float = 2.0  # doubled after each failed attempt
+    OUTBOX_LEASE_SECONDS: int = 60  # a claimed event is retried if not finished by then
+    
+    # Deleted quiz sets: soft-deleted at once, rows purged in chunks by a background job
+    QUIZ_SET_PURGE_INTERVAL_SECONDS: int = 10  # 0 purges inline in the delete request
+    QUIZ_SET_PURGE_CHUNK_SIZE: int = 1000
+    
+    # Per-question timing sketches
+    TIMING_SKETCH_ACCURACY: float = 0.01  # relative error of reported percentiles
+    TIMING_MAX_SECONDS: float = 3600.0  # longer per-question times are clamped
+    TIMING_FLUSH_INTERVAL_SECONDS: float = 5.0  # 0 writes sketches on every submit
+    
+    # Cross-quiz reports (columnar analytics engine)
+    ANALYTICS_REFRESH_SECONDS: int = 60
+    ANALYTICS_PASS_SCORE: float = 70.0
+    ANALYTICS_PROCESS_WORKERS: int = 0  # 0 runs every report in the threadpool
+    ANALYTICS_PROCESS_MIN_RESPONSES: int = 1000000  # smaller snapshots skip the process pool
+    
+    # Adaptive practice
+    ADAPTIVE_INDEX_TTL_SECONDS: int = 300
+    ADAPTIVE_ELO_K: float = 0.4
+    
+    # Spaced repetition
+    REVIEW_MIN_EASE: float = 1.3
+    REVIEW_DEFAULT_EASE: float = 2.5
+    
+    # Exam generation
+    EXAM_POOL_TTL_SECONDS: int = 300
+    EXAM_SESSION_CACHE_SIZE: int = 10000
+    
+    # Quiz set/question read cache
+    CACHE_BACKEND: str = "memory"  # memory, redis, local (in-process stand-in) or none
+    CACHE_URL: str = "redis://localhost:6379/0"
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_TTL_SECONDS: int = 300
+    
+    # Cross-worker cache invalidation
+    INVALIDATION_BACKEND: str = "database"  # database, redis or local (single process)
+    INVALIDATION_URL: str = "redis://localhost:6379/0"
+    INVALIDATION_POLL_INTERVAL_SECONDS: float = 0.2
+    INVALIDATION_RETENTION_SECONDS: int = 3600
+    INVALIDATION_SETTLE_SECONDS: float = 30.0  # how long skipped change-log ids are re-checked
+    
+    # On-demand request profiling (stack samples, SQL timings, collapsed-stack files)
+    PROFILING_ENABLED: bool = False  # False leaves the middleware out entirely
+    PROFILING_TOKEN: str = ""  # X-Profile-Token value that profiles a request and reads profiles
+    PROFILING_SAMPLE_RATE: float = 0.0  # fraction of all requests profiled
+    PROFILING_INTERVAL_SECONDS: float = 0.005
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_ARTIFACTS: int = 200  # oldest profiles are deleted beyond this
+    
+    # Cache warm-up
+    WARMUP_ENABLED: bool = True
+    WARMUP_QUIZ_SET_IDS: List[str] = []  # empty uses the most attempted quiz sets
+    WARMUP_TOP_N: int = 20
+    WARMUP_LOOKBACK_DAYS: int = 7
+    
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, or_
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class InvalidationEvent:
+    entity: str
+    entity_id: str
+    version: int  # publisher's time.time_ns(), also used to measure propagation latency
+    origin: str = ""
+
+
+Handler = Callable[[InvalidationEvent], None]
+
+
+class InvalidationBus(ABC):
+    """Broadcasts cache invalidations to every worker.
+
+    ``publish`` evicts in the calling worker immediately, then broadcasts;
+    ``listen`` runs for the worker's lifetime and applies events published
+    by other workers to the subscribed handlers.
+    """
+
+    def __init__(self):
+        self._handlers: List[Handler] = []
+        self._instance = uuid.uuid4().hex[:8]
+        self.published = 0
+        self.received = 0
+        self.last_latency_ms: Optional[float] = None
+        self.max_latency_ms = 0.0
+
+    @property
+    def origin(self) -> str:
+        # Resolved per call so forked workers do not share an origin
+        return f"{socket.gethostname()}:{os.getpid()}:{self._instance}"
+
+    def subscribe(self, handler: Handler) -> None:
+        self._handlers.append(handler)
+
+    def publish(self, entity: str, entity_id: str) -> None:
+        self.publish_many([(entity, entity_id)])
+
+    def publish_many(self, keys: Sequence[Tuple[str, str]]) -> None:
+        version = time.time_ns()
+        origin = self.origin
+        events = [InvalidationEvent(entity, entity_id, version, origin) for entity, entity_id in keys]
+        self._dispatch(events)
+        self.published += len(events)
+        try:
+            self._broadcast(events)
+        except Exception:
+            # Other workers fall back to cache TTL expiry
+            logger.exception("Failed to broadcast cache invalidation")
+
+    async def listen(self) -> None:
+        """Receive events from other workers until cancelled"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "published": self.published,
+            "received": self.received,
+            "last_latency_ms": self.last_latency_ms,
+            "max_latency_ms": self.max_latency_ms,
+        }
+
+    @abstractmethod
+    def _broadcast(self, events: List[InvalidationEvent]) -> None: ...
+
+    def _receive(self, events: List[InvalidationEvent]) -> None:
+        origin = self.origin
+        remote = [event for event in events if event.origin != origin]
+        if not remote:
+            return
+        now = time.time_ns()
+        for event in remote:
+            self.last_latency_ms = (now - event.version) / 1e6
+            self.max_latency_ms = max(self.max_latency_ms, self.last_latency_ms)
+        self.received += len(remote)
+        self._dispatch(remote)
+
+    def _dispatch(self, events: List[InvalidationEvent]) -> None:
+        for event in events:
+            for handler in self._handlers:
+                try:
+                    handler(event)
+                except Exception:
+                    logger.exception("Cache invalidation handler failed for %s", event)
+
+
+class LocalBus(InvalidationBus):
+    """Single-process bus: evictions only apply to the publishing worker"""
+
+    def _broadcast(self, events: List[InvalidationEvent]) -> None:
+        pass
+
+
+class DatabaseBus(InvalidationBus):
+    """Change-log table in the application database, polled by each worker.
+
+    Workers start from the newest row when they begin listening. Rows are
+    pruned after ``retention_seconds``. Ids can commit out of order, so ids
+    skipped below the newest row read are re-checked on every poll for
+    ``settle_seconds`` before they are given up as rolled back.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        poll_interval: float,
+        retention_seconds: int,
+        settle_seconds: float = 30.0
+    ):
+        super().__init__()
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.settle_seconds = settle_seconds
+        self._last_id: Optional[int] = None
+        self._gaps: Dict[int, float] = {}  # skipped id -> monotonic time it was first skipped
+
+    def _broadcast(self, events: List[InvalidationEvent]) -> None:
+        from app.models.database import CacheInvalidation
+
+        db = self.session_factory()
+        try:
+            db.add_all([
+                CacheInvalidation(
+                    entity=event.entity,
+                    entity_id=event.entity_id,
+                    version=event.version,
+                    origin=event.origin
+                )
+                for event in events
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+    def poll(self, batch_size: int = 1000) -> int:
+        """Apply change-log rows written since the last poll"""
+        from app.models.database import CacheInvalidation
+
+        db = self.session_factory()
+        try:
+            if self._last_id is None:
+                self._last_id = db.query(func.max(CacheInvalidation.id)).scalar() or 0
+                return 0
+            now = time.monotonic()
+            self._gaps = {
+                gap: skipped_at for gap, skipped_at in self._gaps.items()
+                if now - skipped_at < self.settle_seconds
+            }
+            newer = CacheInvalidation.id > self._last_id
+            rows = (
+                db.query(CacheInvalidation)
+                .filter(or_(newer, CacheInvalidation.id.in_(self._gaps)) if self._gaps else newer)
+                .order_by(CacheInvalidation.id)
+                .limit(batch_size + len(self._gaps))
+                .all()
+            )
+            events = [
+                InvalidationEvent(row.entity, row.entity_id, row.version, row.origin)
+                for row in rows
+            ]
+        finally:
+            db.close()
+        for row in rows:
+            if row.id in self._gaps:
+                del self._gaps[row.id]
+                continue
+            # Ids between the previous high-water mark and this row may still commit
+            for gap in range(max(self._last_id + 1, row.id - batch_size), row.id):
+                self._gaps[gap] = now
+            self._last_id = row.id
+        if rows:
+            self._receive(events)
+        return len(rows)
+
+    def prune(self) -> int:
+        from app.models.database import CacheInvalidation
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        db = self.session_factory()
+        try:
+            deleted = (
+                db.query(CacheInvalidation)
+                .filter(CacheInvalidation.created_at < cutoff)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    async def listen(self) -> None:
+        last_prune = time.monotonic()
+        while True:
+            try:
+                await run_in_threadpool(self.poll)
+                if time.monotonic() - last_prune >= 60:
+                    await run_in_threadpool(self.prune)
+                    last_prune = time.monotonic()
+            except Exception:
+                logger.exception("Cache invalidation poll failed")
+            await asyncio.sleep(self.poll_interval)
+
+
+class RedisBus(InvalidationBus):
+    """Redis pub/sub channel shared by all workers"""
+
+    def __init__(self, url: str, channel: str = "quiz-api:invalidations"):
+        super().__init__()
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+
+    def _broadcast(self, events: List[InvalidationEvent]) -> None:
+        self.client.publish(self.channel, json.dumps([asdict(event) for event in events]))
+
+    async def listen(self) -> None:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await run_in_threadpool(pubsub.subscribe, self.channel)
+        try:
+            while True:
+                message = await run_in_threadpool(pubsub.get_message, timeout=1.0)
+                if message:
+                    self._receive([InvalidationEvent(**event) for event in json.loads(message["data"])])
+        finally:
+            pubsub.close()
+
+
+def build_bus() -> InvalidationBus:
+    """Create the bus selected by ``INVALIDATION_BACKEND``"""
+    backend = settings.INVALIDATION_BACKEND
+    if backend == "database":
+        from app.database.session import SessionLocal
+
+        return DatabaseBus(
+            SessionLocal,
+            settings.INVALIDATION_POLL_INTERVAL_SECONDS,
+            settings.INVALIDATION_RETENTION_SECONDS,
+            settings.INVALIDATION_SETTLE_SECONDS
+        )
+    if backend == "redis":
+        return RedisBus(settings.INVALIDATION_URL)
+    return LocalBus()
+
+
+invalidation_bus = build_bus()
@@ -0,0 +1,355 @@
+"""On-demand request profiling.
+
+A request is profiled when it carries ``X-Profile-Token: <PROFILING_TOKEN>``
+or falls into the ``PROFILING_SAMPLE_RATE`` fraction of traffic. While it
+runs, a sampler thread records its stacks every ``PROFILING_INTERVAL_SECONDS``
+and SQLAlchemy cursor events time its queries. Afterwards a collapsed-stack
+file (``flamegraph.pl``/speedscope input) and a JSON summary are written to
+``PROFILING_DIR``, and the response carries ``X-Profile-Id``.
+
+Event-loop samples are taken only while the request's own task is running.
+Worker threads (threadpool, shard fan-out) are attributed from the request's
+first query in them until the work item that ran it returns. Ticks where the
+request runs nowhere are recorded as ``waiting``.
+
+With ``PROFILING_ENABLED`` off the middleware is not installed, and the SQL
+listeners are only attached while a profile is active.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.models.schemas import ProfileFrame, ProfileSqlStatement, ProfileSummary
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_HEADER = "x-profile-token"
+PROFILE_ID_HEADER = "x-profile-id"
+PROFILE_ID_PATTERN = r"^[0-9A-Za-z-]+$"
+
+# Modules that hand work to a thread; the first frame above them is the work item
+_PLUMBING_MODULES = {"threading", "concurrent", "anyio", "starlette", "asyncio", "contextvars", "queue"}
+_TOP_FRAMES = 25
+_TOP_STATEMENTS = 25
+
+_active_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "active_profile", default=None
+)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _is_plumbing(frame) -> bool:
+    return frame.f_globals.get("__name__", "").partition(".")[0] in _PLUMBING_MODULES
+
+
+def _work_root(frame):
+    """Outermost frame of the work item a pool thread is running"""
+    chain = []
+    while frame is not None:
+        chain.append(frame)
+        frame = frame.f_back
+    for candidate in reversed(chain):
+        if not _is_plumbing(candidate):
+            return candidate
+    return chain[0]
+
+
+def _stack_up_to(frame, root, include_root: bool = False) -> Optional[Tuple[str, ...]]:
+    """Labels from ``root`` to the leaf, or None if ``root`` is not on the stack"""
+    labels = []
+    while frame is not None:
+        if frame is root:
+            if include_root:
+                labels.append(_frame_label(frame))
+            return tuple(reversed(labels))
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return None
+
+
+def _normalize_statement(statement: str) -> str:
+    return " ".join(statement.split())[:300]
+
+
+class RequestProfile:
+    """Stack samples and SQL timings collected for one request"""
+
+    def __init__(self, method: str, path: str, root_frame, loop_thread: int):
+        self.id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.started_at = datetime.utcnow()
+        self.status_code = 500
+        self.duration = 0.0
+        self.ticks = 0
+        self.stacks: Counter = Counter()
+        self.statements: Dict[str, List[float]] = {}  # statement -> [count, total, max]
+        self._started = time.perf_counter()
+        self._root_frame = root_frame
+        self._loop_thread = loop_thread
+        self._work_roots: Dict[int, object] = {}  # pool thread -> frame of the work item
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def claim_thread(self) -> None:
+        thread = threading.get_ident()
+        if thread != self._loop_thread:
+            self._work_roots[thread] = _work_root(sys._getframe())
+
+    def add_query(self, statement: str, elapsed: float) -> None:
+        key = _normalize_statement(statement)
+        with self._lock:
+            totals = self.statements.setdefault(key, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
+            totals[2] = max(totals[2], elapsed)
+
+    def sample(self, frames: Dict[int, object]) -> None:
+        with self._lock:
+            if self._finished:
+                return
+            self.ticks += 1
+            running = False
+            loop_frame = frames.get(self._loop_thread)
+            stack = _stack_up_to(loop_frame, self._root_frame) if loop_frame is not None else None
+            if stack is not None:
+                self.stacks[("event-loop",) + stack] += 1
+                running = True
+            for thread, root in list(self._work_roots.items()):
+                frame = frames.get(thread)
+                stack = _stack_up_to(frame, root, include_root=True) if frame is not None else None
+                if stack is not None:
+                    self.stacks[("worker",) + stack] += 1
+                    running = True
+            if not running:
+                self.stacks[("waiting",)] += 1
+
+    def finish(self, status_code: int) -> None:
+        with self._lock:
+            self._finished = True
+            self.status_code = status_code
+            self.duration = time.perf_counter() - self._started
+            # Frames keep their locals alive; drop them once sampling is over
+            self._root_frame = None
+            self._work_roots.clear()
+
+    def collapsed(self) -> str:
+        """One ``frame;frame;frame count`` line per distinct stack"""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> ProfileSummary:
+        self_samples: Counter = Counter()
+        inclusive_samples: Counter = Counter()
+        for stack, count in self.stacks.items():
+            self_samples[stack[-1]] += count
+            for label in set(stack):
+                inclusive_samples[label] += count
+        statements = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        return ProfileSummary(
+            id=self.id,
+            method=self.method,
+            path=self.path,
+            status_code=self.status_code,
+            started_at=self.started_at,
+            duration_ms=self.duration * 1000,
+            sample_interval_ms=settings.PROFILING_INTERVAL_SECONDS * 1000,
+            samples=self.ticks,
+            sql_queries=sum(int(totals[0]) for _, totals in statements),
+            sql_ms=sum(totals[1] for _, totals in statements) * 1000,
+            sql_statements=[
+                ProfileSqlStatement(statement=statement, count=int(count), total_ms=total * 1000, max_ms=longest * 1000)
+                for statement, (count, total, longest) in statements[:_TOP_STATEMENTS]
+            ],
+            hot_frames=[
+                ProfileFrame(frame=label, self_samples=count, inclusive_samples=inclusive_samples[label])
+                for label, count in self_samples.most_common(_TOP_FRAMES)
+            ],
+            inclusive_frames=[
+                ProfileFrame(frame=label, self_samples=self_samples[label], inclusive_samples=count)
+                for label, count in inclusive_samples.most_common(_TOP_FRAMES)
+            ]
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.claim_thread()
+        conn.info.setdefault("profile_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _active_profile.get()
+    started = conn.info.get("profile_query_started")
+    if profile is not None and started:
+        profile.add_query(statement, time.perf_counter() - started.pop())
+
+
+class Profiler:
+    """Runs one sampler thread for all active profiles and stores their artifacts"""
+
+    def __init__(self, interval: float, directory: str, max_artifacts: int):
+        self.interval = interval
+        self.directory = directory
+        self.max_artifacts = max_artifacts
+        self._active: Set[RequestProfile] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: RequestProfile) -> None:
+        with self._lock:
+            if not self._active:
+                event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def stop(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active.discard(profile)
+            if not self._active:
+                event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+                event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                profiles = list(self._active)
+            frames = sys._current_frames()
+            for profile in profiles:
+                profile.sample(frames)
+            del frames
+            time.sleep(self.interval)
+
+    def save(self, profile: RequestProfile) -> ProfileSummary:
+        os.makedirs(self.directory, exist_ok=True)
+        summary = profile.summary()
+        with open(self.collapsed_path(profile.id), "w", encoding="utf-8") as collapsed:
+            collapsed.write(profile.collapsed())
+        with open(self._summary_path(profile.id), "w", encoding="utf-8") as summary_file:
+            summary_file.write(summary.model_dump_json())
+        self._prune()
+        return summary
+
+    def summaries(self) -> List[ProfileSummary]:
+        """Stored profiles, newest first"""
+        summaries = [self.load_summary(profile_id) for profile_id in self._stored_ids()]
+        return [summary for summary in summaries if summary is not None]
+
+    def load_summary(self, profile_id: str) -> Optional[ProfileSummary]:
+        try:
+            with open(self._summary_path(profile_id), encoding="utf-8") as summary_file:
+                return ProfileSummary.model_validate(json.load(summary_file))
+        except FileNotFoundError:
+            return None
+
+    def collapsed_path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.collapsed")
+
+    def _summary_path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def _stored_ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        # Ids start with a UTC timestamp, so names sort by age
+        return sorted(
+            (name[:-len(".json")] for name in os.listdir(self.directory) if name.endswith(".json")),
+            reverse=True
+        )
+
+    def _prune(self) -> None:
+        for profile_id in self._stored_ids()[self.max_artifacts:]:
+            for path in (self._summary_path(profile_id), self.collapsed_path(profile_id)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+profiler = Profiler(settings.PROFILING_INTERVAL_SECONDS, settings.PROFILING_DIR, settings.PROFILING_MAX_ARTIFACTS)
+
+
+def valid_profile_token(token: Optional[str]) -> bool:
+    return bool(settings.PROFILING_TOKEN) and token is not None and secrets.compare_digest(
+        token.encode(), settings.PROFILING_TOKEN.encode()
+    )
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests selected by token header or sampling"""
+
+    def __init__(self, app, excluded_prefix: str = ""):
+        self.app = app
+        self.excluded_prefix = excluded_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+        await self._profile(scope, receive, send)
+
+    def _selected(self, scope) -> bool:
+        if self.excluded_prefix and scope["path"].startswith(self.excluded_prefix):
+            return False
+        if settings.PROFILING_TOKEN:
+            for name, value in scope["headers"]:
+                if name == PROFILE_TOKEN_HEADER.encode():
+                    return valid_profile_token(value.decode("latin-1"))
+        return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+
+    async def _profile(self, scope, receive, send):
+        # This coroutine's frame is on the event-loop stack exactly while the request runs
+        profile = RequestProfile(scope["method"], scope["path"], sys._getframe(), threading.get_ident())
+        status_code = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER.encode(), profile.id.encode())
+                ]
+            await send(message)
+
+        token = _active_profile.set(profile)
+        profiler.start(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop(profile)
+            _active_profile.reset(token)
+            profile.finish(status_code)
+            try:
+                summary = await run_in_threadpool(profiler.save, profile)
+                logger.info(
+                    "Profiled %s %s in %.1f ms (%d SQL queries, %.1f ms): %s",
+                    summary.method, summary.path, summary.duration_ms,
+                    summary.sql_queries, summary.sql_ms, summary.id
+                )
+            except Exception:
+                logger.exception("Saving profile %s failed", profile.id)
@@ -1,16 +1,36 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
-from jose import jwt
-from passlib.context import CryptContext
+from functools import lru_cache
+from typing import Any, Dict, Union, Optional
 from app.core.config import settings
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# jose and passlib are imported on first use to keep them off the cold-start path
+@lru_cache(maxsize=None)
+def get_password_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=settings.BCRYPT_ROUNDS
+    )
+
+
+# bcrypt is CPU-bound and releases the GIL, so it runs on a bounded pool
+# instead of blocking the event loop.
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
 
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
 ) -> str:
+    from jose import jwt
+
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -23,18 +43,35 @@ def create_access_token(
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_password_context().hash(password)
 
 
-def verify_token(token: str) -> Optional[str]:
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
+
+
+def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
+    """Verify the signature and expiry of a token and return its claims"""
+    from jose import jwt
+
     try:
-        payload = jwt.decode(
+        return jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        return payload.get("sub")
     except jwt.JWTError:
         return None
+
+
+def verify_token(token: str) -> Optional[str]:
+    payload = decode_access_token(token)
+    return payload.get("sub") if payload else None
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent identical reads into one in-flight computation.
+
+    Callers with the same key that arrive while a computation is running await
+    its result instead of starting their own. Completed results are not kept;
+    callers cache them separately.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        if not self.enabled:
+            self.executions += 1
+            return await fn()
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # The computation is a task of its own, so a cancelled caller (say, a
+            # disconnected client, even the first one) only stops waiting for it
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Waiters re-raise it; avoid "exception was never retrieved" when all of them left
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
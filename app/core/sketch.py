@@ -0,0 +1,111 @@
+import math
+import struct
+from typing import Dict, Optional, Tuple
+
+
+class QuantileSketch:
+    """Mergeable streaming quantile sketch with relative-error guarantees (DDSketch).
+
+    Positive values fall into logarithmic buckets ``(gamma^(i-1), gamma^i]``
+    with ``gamma = (1 + alpha) / (1 - alpha)``, so any quantile is returned
+    within ``alpha`` relative error of the true value. Values at or below
+    ``min_value`` share a zero bucket. Merging adds bucket counts, so sketches
+    built on different workers or days combine exactly.
+    """
+
+    VERSION = 1
+    HEADER = struct.Struct("<BdQdiI")  # version, alpha, zero count, sum, first index, bucket count
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-3):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value <= self.min_value:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+        self.sum += value * count
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile ``q`` (0..1), or None for an empty sketch"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Midpoint (in relative terms) of the bucket's range
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_bytes(self) -> bytes:
+        """Header plus dense bucket counts from the lowest to the highest index as varints"""
+        first, last = (min(self.bins), max(self.bins)) if self.bins else (0, -1)
+        counts = bytearray()
+        for index in range(first, last + 1):
+            _write_varint(counts, self.bins.get(index, 0))
+        header = self.HEADER.pack(
+            self.VERSION, self.relative_accuracy, self.zero_count, self.sum, first, last - first + 1
+        )
+        return header + bytes(counts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, min_value: float = 1e-3) -> "QuantileSketch":
+        version, alpha, zero_count, total, first, size = cls.HEADER.unpack_from(data)
+        if version != cls.VERSION:
+            raise ValueError(f"Unsupported sketch version {version}")
+        sketch = cls(alpha, min_value)
+        offset = cls.HEADER.size
+        for index in range(first, first + size):
+            count, offset = _read_varint(data, offset)
+            if count:
+                sketch.bins[index] = count
+        sketch.zero_count = zero_count
+        sketch.count = zero_count + sum(sketch.bins.values())
+        sketch.sum = total
+        return sketch
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
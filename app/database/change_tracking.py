@@ -0,0 +1,102 @@
+"""Change sequence for the delta-sync feed.
+
+Every ORM insert, update or delete of a quiz set or question takes the next
+value of a single database counter as its ``change_seq``; deletes also
+write a tombstone. The counter row stays locked until the writing
+transaction commits, so sequence order matches commit order and a client
+that has read up to N never misses a later commit with a smaller number.
+Bulk ``update()`` statements (rating recalculation) bypass the hook and do
+not count as content changes; statements that do change content reserve
+their own sequence numbers (see ``QuizService.update_question``). New
+objects that already carry a ``change_seq`` are left as they are.
+
+With sharding the counter stays in the home database: the reserving
+transaction there is committed right after the shard session commits
+(and rolled back with it), so the lock still spans the content commit.
+"""
+from sqlalchemy import event, insert, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.database.session import engine
+from app.database.sharding import shard_router
+from app.models.database import ChangeCounter, Question, QuizSet, Tombstone
+
+COUNTER_NAME = "content"
+TRACKED = (QuizSet, Question)
+HOME_CONNECTION = "change_counter_connection"
+
+
+def _counter_connection(session: Session) -> Connection:
+    if shard_router is None:
+        return session.connection()
+    connection = session.info.get(HOME_CONNECTION)
+    if connection is None:
+        # Begin the session's own transaction too, so its end releases this one
+        session.connection()
+        connection = session.info[HOME_CONNECTION] = engine.connect()
+        connection.begin()
+    return connection
+
+
+@event.listens_for(Session, "after_commit")
+def _commit_counter(session: Session) -> None:
+    connection = session.info.pop(HOME_CONNECTION, None)
+    if connection is not None:
+        connection.commit()
+        connection.close()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _release_counter(session: Session, transaction) -> None:
+    # Rolled back or closed without a commit
+    if transaction.parent is None:
+        connection = session.info.pop(HOME_CONNECTION, None)
+        if connection is not None:
+            connection.close()
+
+
+def reserve_change_seqs(session: Session, count: int) -> int:
+    """Advance the counter by ``count`` and return the first reserved value"""
+    connection = _counter_connection(session)
+    last = connection.execute(
+        update(ChangeCounter)
+        .where(ChangeCounter.name == COUNTER_NAME)
+        .values(value=ChangeCounter.value + count)
+        .returning(ChangeCounter.value)
+    ).scalar()
+    if last is None:
+        connection.execute(insert(ChangeCounter).values(name=COUNTER_NAME, value=count))
+        return 1
+    return last - count + 1
+
+
+def _needs_seq(session: Session, obj) -> bool:
+    if obj in session.new:
+        # Callers that reserved a sequence themselves set it before adding
+        return obj.change_seq is None
+    return session.is_modified(obj)
+
+
+@event.listens_for(Session, "before_flush")
+def stamp_changes(session: Session, flush_context, instances) -> None:
+    changed = [
+        obj for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, TRACKED) and _needs_seq(session, obj)
+    ]
+    deleted = [obj for obj in session.deleted if isinstance(obj, TRACKED)]
+    if not changed and not deleted:
+        return
+
+    seq = reserve_change_seqs(session, len(changed) + len(deleted))
+    for obj in changed:
+        obj.change_seq = seq
+        seq += 1
+    for obj in deleted:
+        session.add(Tombstone(
+            entity="quiz_set" if isinstance(obj, QuizSet) else "question",
+            entity_id=obj.id,
+            quiz_set_id=obj.id if isinstance(obj, QuizSet) else obj.quiz_set_id,
+            change_seq=seq
+        ))
+        seq += 1
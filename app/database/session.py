@@ -1,4 +1,7 @@
-from sqlalchemy import create_engine
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -24,3 +27,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def ping_database(bind: Optional[Engine] = None) -> Dict[str, Any]:
+    """Run a trivial query and report how long the round trip took"""
+    started = time.perf_counter()
+    try:
+        with (bind or engine).connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"ok": False, "latency_ms": (time.perf_counter() - started) * 1000, "error": str(e)}
+    return {"ok": True, "latency_ms": (time.perf_counter() - started) * 1000}
+
+
+def pool_status() -> Dict[str, Any]:
+    """Connection pool counters, where the pool implementation provides them"""
+    pool = engine.pool
+    status: Dict[str, Any] = {"class": type(pool).__name__, "status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    return status
@@ -0,0 +1,179 @@
+"""Horizontal sharding of quiz data by ``quiz_set_id``.
+
+With ``SHARD_DATABASE_URLS`` set, everything that belongs to a quiz set
+(the set, its questions, attempts, progress, reviews, rollups, outbox
+events, ...) lives on the shard that the quiz set id hashes to on a
+consistent-hash ring. Users, the change counter and cache invalidations
+stay in the home database (``DATABASE_URL``). Shards are identified by
+their position in the list, so new shards are appended: only the quiz sets
+that land on the new shard's ring points move, and moving their rows is an
+operational step, not something the router does.
+
+Without ``SHARD_DATABASE_URLS`` the home database is the only shard and
+every helper here behaves like plain ``SessionLocal``.
+"""
+import bisect
+import contextvars
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.core.config import settings
+from app.database.session import Base, SessionLocal
+
+T = TypeVar("T")
+
+# Tables that only exist in the home database
+HOME_TABLES = ("users", "change_counters", "cache_invalidations")
+
+
+def _ring_hash(key: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring with ``virtual_nodes`` points per shard"""
+
+    def __init__(self, shard_count: int, virtual_nodes: int = 64):
+        if shard_count < 1:
+            raise ValueError("A hash ring needs at least one shard")
+        points = sorted(
+            (_ring_hash(f"shard-{shard}#{node}"), shard)
+            for shard in range(shard_count)
+            for node in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, key: str) -> int:
+        index = bisect.bisect(self._hashes, _ring_hash(key))
+        return self._shards[index % len(self._shards)]
+
+
+def make_engine(url: str) -> Engine:
+    return create_engine(url, connect_args={"check_same_thread": False} if "sqlite" in url else {})
+
+
+class ShardRouter:
+    """Maps quiz set ids to shard databases and runs work on all of them in parallel"""
+
+    def __init__(self, urls: Sequence[str], virtual_nodes: int = 64):
+        self.engines = [make_engine(url) for url in urls]
+        self.sessionmakers = [
+            sessionmaker(autocommit=False, autoflush=False, bind=shard_engine)
+            for shard_engine in self.engines
+        ]
+        self.ring = HashRing(len(self.engines), virtual_nodes)
+        self._executor = ThreadPoolExecutor(max_workers=len(self.engines), thread_name_prefix="shard")
+
+    def shard_for(self, quiz_set_id: str) -> int:
+        return self.ring.shard_for(quiz_set_id)
+
+    def session_for(self, quiz_set_id: str) -> Session:
+        return self.sessionmakers[self.shard_for(quiz_set_id)]()
+
+    def fan_out(self, work: Callable[[Session], T]) -> List[T]:
+        """Run ``work`` on every shard concurrently, each with its own session; results in shard order"""
+        results = self.run_on({shard: work for shard in range(len(self.sessionmakers))})
+        return [results[shard] for shard in range(len(self.sessionmakers))]
+
+    def run_on(self, work: Dict[int, Callable[[Session], T]]) -> Dict[int, T]:
+        """Run each shard's work concurrently, each with its own session"""
+        def run(shard: int) -> T:
+            with self.sessionmakers[shard]() as db:
+                return work[shard](db)
+
+        # Each shard runs in a copy of the caller's context, like run_in_threadpool
+        futures = {
+            shard: self._executor.submit(contextvars.copy_context().run, run, shard)
+            for shard in work
+        }
+        return {shard: future.result() for shard, future in futures.items()}
+
+    def create_schema(self) -> None:
+        for shard_engine in self.engines:
+            create_shard_schema(shard_engine)
+
+    def dispose(self) -> None:
+        self._executor.shutdown(wait=False)
+        for shard_engine in self.engines:
+            shard_engine.dispose()
+
+
+def create_shard_schema(bind: Engine) -> None:
+    """Create the missing quiz tables on a shard.
+
+    User rows live in the home database, so foreign keys to ``users`` are
+    left out; the rest of the schema matches the home database.
+    """
+    with bind.begin() as connection:
+        existing = set(inspect(connection).get_table_names())
+        for table in Base.metadata.sorted_tables:
+            if table.name in HOME_TABLES or table.name in existing:
+                continue
+            connection.execute(CreateTable(table, include_foreign_key_constraints=[
+                constraint for constraint in table.foreign_key_constraints
+                if constraint.referred_table.name not in HOME_TABLES
+            ]))
+            for index in table.indexes:
+                connection.execute(CreateIndex(index))
+
+
+shard_router: Optional[ShardRouter] = (
+    ShardRouter(settings.SHARD_DATABASE_URLS, settings.SHARD_VIRTUAL_NODES)
+    if settings.SHARD_DATABASE_URLS else None
+)
+
+
+def session_factories() -> List[sessionmaker]:
+    """One session factory per shard, for jobs that sweep all quiz data"""
+    return shard_router.sessionmakers if shard_router else [SessionLocal]
+
+
+def shard_index(quiz_set_id: str) -> int:
+    return shard_router.shard_for(quiz_set_id) if shard_router else 0
+
+
+def quiz_session(quiz_set_id: str) -> Session:
+    """A new session on the database that holds ``quiz_set_id``"""
+    return shard_router.session_for(quiz_set_id) if shard_router else SessionLocal()
+
+
+def fan_out(work: Callable[[Session], T], db: Optional[Session] = None) -> List[T]:
+    """Run ``work`` against every shard in parallel and return the per-shard results.
+
+    Unsharded, ``work`` runs once on ``db`` (or a new session) instead.
+    """
+    if shard_router is not None:
+        return shard_router.fan_out(work)
+    if db is not None:
+        return [work(db)]
+    with SessionLocal() as own:
+        return [work(own)]
+
+
+def run_on_shards(work: Dict[int, Callable[[Session], T]]) -> Dict[int, T]:
+    """Run per-shard work (keyed by ``shard_index``) in parallel, each in its own session"""
+    if shard_router is not None:
+        return shard_router.run_on(work)
+    return {shard: _run_local(shard_work) for shard, shard_work in work.items()}
+
+
+def _run_local(work: Callable[[Session], T]) -> T:
+    with SessionLocal() as db:
+        return work(db)
+
+
+def get_quiz_db(quiz_set_id: str) -> Iterator[Session]:
+    """Dependency for routes with a ``quiz_set_id`` path parameter"""
+    db = quiz_session(quiz_set_id)
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,41 +1,81 @@
+import asyncio
+import logging
+import sys
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
-from app.routers import quiz
-from app.database.session import engine
+from app.core.invalidation import invalidation_bus
+from app.core.profiling import ProfilingMiddleware
+from app.routers import quiz, auth, reports, profiles
+from app.database.session import engine, ping_database, pool_status
+from app.database.sharding import shard_router
 from app.models.database import Base
+from app.services.outbox_service import outbox_worker
+from app.services.purge_service import quiz_set_purge_loop
+from app.services.quiz_service import quiz_cache
+from app.services.timing_service import run_timing_flush, timing_flush_loop
+from app.services.warmup_service import run_warmup, skip_warmup, warmup_state
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create tables if configured, and start and stop in-process background jobs"""
+    if settings.DB_CREATE_ON_STARTUP:
+        await run_in_threadpool(Base.metadata.create_all, bind=engine)
+        if shard_router is not None:
+            await run_in_threadpool(shard_router.create_schema)
+    
+    # Applies cache invalidations published by other workers
+    tasks = [asyncio.create_task(invalidation_bus.listen())]
+    if settings.WARMUP_ENABLED:
+        # Runs alongside traffic; /ready reports it until it finishes
+        tasks.append(asyncio.create_task(run_in_threadpool(run_warmup)))
+    else:
+        skip_warmup()
+    if settings.RATING_RECALC_INTERVAL_SECONDS > 0:
+        # Imported here so NumPy stays off the startup path unless the job is enabled
+        from app.services.rating_service import rating_recalculation_loop
+        
+        tasks.append(asyncio.create_task(
+            rating_recalculation_loop(settings.RATING_RECALC_INTERVAL_SECONDS)
+        ))
+    if settings.OUTBOX_POLL_INTERVAL_SECONDS > 0:
+        # Post-submit side effects recorded in the outbox table
+        tasks.append(asyncio.create_task(outbox_worker.run(settings.OUTBOX_POLL_INTERVAL_SECONDS)))
+    if settings.QUIZ_SET_PURGE_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(quiz_set_purge_loop(settings.QUIZ_SET_PURGE_INTERVAL_SECONDS)))
+    if settings.TIMING_FLUSH_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(timing_flush_loop(settings.TIMING_FLUSH_INTERVAL_SECONDS)))
+    if settings.ATTEMPT_COMPACTION_INTERVAL_SECONDS > 0:
+        from app.services.compaction_service import attempt_compaction_loop
+        
+        tasks.append(asyncio.create_task(
+            attempt_compaction_loop(settings.ATTEMPT_COMPACTION_INTERVAL_SECONDS)
+        ))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    try:
+        # Persist timings still buffered in this worker
+        await run_in_threadpool(run_timing_flush)
+    except Exception:
+        logger.exception("Final timing sketch flush failed")
+    # Only loaded once a report has been requested
+    analytics_engine = sys.modules.get("app.services.analytics_engine")
+    if analytics_engine is not None:
+        analytics_engine.shutdown_process_pool()
+    if shard_router is not None:
+        shard_router.dispose()
+    engine.dispose()
+
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-# Create FastAPI app
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version=settings.PROJECT_VERSION,
-    description="API para o sistema de simulados Salesforce",
-    docs_url="/docs",
-    redoc_url="/redoc"
-)
-
-# Set up CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.BACKEND_CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(
-    quiz.router,
-    prefix=settings.API_V1_STR,
-    tags=["quiz"]
-)
-
-
-@app.get("/")
 async def root():
     """Root endpoint with API information"""
     return {
@@ -47,7 +87,6 @@ async def root():
     }
 
 
-@app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
@@ -57,7 +96,29 @@ async def health_check():
     }
 
 
-@app.exception_handler(404)
+async def readiness_check():
+    """Readiness probe: warm-up progress, database and shard latency, pool, cache and outbox state"""
+    database = await run_in_threadpool(ping_database)
+    shards = [
+        await run_in_threadpool(ping_database, shard_engine)
+        for shard_engine in (shard_router.engines if shard_router else [])
+    ]
+    ready = warmup_state.ready and database["ok"] and all(shard["ok"] for shard in shards)
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "warmup": jsonable_encoder(warmup_state.as_dict()),
+            "database": database,
+            "shards": shards,
+            "pool": pool_status(),
+            "cache": quiz_cache.stats().as_dict(),
+            "invalidation": invalidation_bus.stats(),
+            "outbox": outbox_worker.stats()
+        }
+    )
+
+
 async def not_found_handler(request, exc):
     return JSONResponse(
         status_code=404,
@@ -68,7 +129,6 @@ async def not_found_handler(request, exc):
     )
 
 
-@app.exception_handler(500)
 async def internal_server_error_handler(request, exc):
     return JSONResponse(
         status_code=500,
@@ -77,3 +137,62 @@ async def internal_server_error_handler(request, exc):
             "message": "Something went wrong. Please try again later."
         }
     )
+
+
+def create_app() -> FastAPI:
+    """Build the FastAPI application"""
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        version=settings.PROJECT_VERSION,
+        description="API para o sistema de simulados Salesforce",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        lifespan=lifespan
+    )
+
+    # Set up CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.BACKEND_CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Include routers
+    app.include_router(
+        quiz.router,
+        prefix=settings.API_V1_STR,
+        tags=["quiz"]
+    )
+    app.include_router(
+        auth.router,
+        prefix=settings.API_V1_STR,
+        tags=["auth"]
+    )
+    app.include_router(
+        reports.router,
+        prefix=settings.API_V1_STR,
+        tags=["reports"]
+    )
+
+    if settings.PROFILING_ENABLED:
+        # Outermost, so the profile covers the other middleware too
+        app.add_middleware(ProfilingMiddleware, excluded_prefix=f"{settings.API_V1_STR}/profiles")
+        app.include_router(
+            profiles.router,
+            prefix=settings.API_V1_STR,
+            tags=["profiles"]
+        )
+
+    app.add_api_route("/", root, methods=["GET"])
+    app.add_api_route("/health", health_check, methods=["GET"])
+    app.add_api_route("/ready", readiness_check, methods=["GET"])
+
+    app.add_exception_handler(404, not_found_handler)
+    app.add_exception_handler(500, internal_server_error_handler)
+
+    return app
+
+
+app = create_app()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Text, DateTime, Boolean, Float, ForeignKey, JSON
+from sqlalchemy import Column, String, Integer, Text, Date, DateTime, Boolean, Float, ForeignKey, JSON, LargeBinary, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.session import Base
@@ -37,9 +37,12 @@ class QuizSet(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    change_seq = Column(Integer, index=True)  # assigned on every ORM write, see change_tracking
+    deleted_at = Column(DateTime(timezone=True), index=True)  # soft delete; rows are purged in the background
 
-    # Relationships
-    questions = relationship("Question", back_populates="quiz_set", cascade="all, delete-orphan")
+    # Relationships; set deletion goes through QuizSetPurgeService's bulk statements,
+    # and passive_deletes leaves any ORM delete to the database cascade
+    questions = relationship("Question", back_populates="quiz_set", cascade="all, delete-orphan", passive_deletes=True)
     progress = relationship("UserProgress", back_populates="quiz_set")
 
 
@@ -47,7 +50,7 @@ class Question(Base):
     __tablename__ = "questions"
 
     id = Column(String, primary_key=True, default=generate_uuid)
-    quiz_set_id = Column(String, ForeignKey("quiz_sets.id"), nullable=False)
+    quiz_set_id = Column(String, ForeignKey("quiz_sets.id", ondelete="CASCADE"), nullable=False)
     question = Column(Text, nullable=False)
     options = Column(JSON, nullable=False)  # List of strings
     correct_answer = Column(JSON, nullable=False)  # int or List[int]
@@ -71,6 +74,9 @@ class Question(Base):
     review_status = Column(String(20), default="pending")
     difficulty_rating = Column(Float)
     success_rate = Column(Float)
+    times_answered = Column(Integer, default=0)
+    times_correct = Column(Integer, default=0)
+    change_seq = Column(Integer, index=True)
 
     # Relationships
     quiz_set = relationship("QuizSet", back_populates="questions")
@@ -78,6 +84,9 @@ class Question(Base):
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
+    __table_args__ = (
+        UniqueConstraint("user_id", "quiz_set_id", name="uq_user_progress_user_quiz_set"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
@@ -87,6 +96,7 @@ class UserProgress(Base):
     score = Column(Float, default=0.0)
     time_spent = Column(Integer, default=0)  # seconds
     completed_at = Column(DateTime(timezone=True))
+    client_updated_at = Column(DateTime(timezone=True))  # last-writer-wins clock for offline sync
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -101,14 +111,189 @@ class QuizAttempt(Base):
     id = Column(String, primary_key=True, default=generate_uuid)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     quiz_set_id = Column(String, ForeignKey("quiz_sets.id"), nullable=False)
-    answers = Column(JSON, nullable=False)
+    answers = Column(JSON, nullable=False)  # {} when results_blob is set
     score = Column(Float, nullable=False)
     correct_answers = Column(Integer, nullable=False)
     total_questions = Column(Integer, nullable=False)
     time_spent = Column(Integer, nullable=False)
-    detailed_results = Column(JSON, nullable=False)
-    completed_at = Column(DateTime(timezone=True), server_default=func.now())
+    detailed_results = Column(JSON, nullable=False)  # [] when results_blob is set
+    question_order_id = Column(Integer, ForeignKey("question_orders.id"))
+    results_blob = Column(LargeBinary)  # see app/services/attempt_codec.py
+    completed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     # Relationships
     user = relationship("User")
     quiz_set = relationship("QuizSet")
+
+
+class AttemptRollup(Base):
+    __tablename__ = "attempt_rollups"
+    __table_args__ = (
+        UniqueConstraint("day", "quiz_set_id", "user_id", name="uq_attempt_rollups_day_quiz_set_user"),
+        Index("ix_attempt_rollups_user", "user_id"),
+        Index("ix_attempt_rollups_quiz_set", "quiz_set_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False)
+    quiz_set_id = Column(String, nullable=False)
+    user_id = Column(String, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    time_spent_sum = Column(Integer, nullable=False, default=0)
+
+
+class QuestionRollup(Base):
+    __tablename__ = "question_rollups"
+    __table_args__ = (
+        UniqueConstraint("day", "question_id", name="uq_question_rollups_day_question"),
+        Index("ix_question_rollups_quiz_set", "quiz_set_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False)
+    quiz_set_id = Column(String, nullable=False)
+    question_id = Column(String, nullable=False)
+    answered = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+
+
+class QuestionTiming(Base):
+    __tablename__ = "question_timings"
+
+    question_id = Column(String, primary_key=True)
+    quiz_set_id = Column(String, nullable=False, index=True)
+    responses = Column(Integer, nullable=False, default=0)
+    sketch = Column(LargeBinary, nullable=False)  # QuantileSketch of seconds spent, see app.core.sketch
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class QuestionOrder(Base):
+    __tablename__ = "question_orders"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    quiz_set_id = Column(String, nullable=False)
+    digest = Column(String(64), unique=True, nullable=False)
+    question_ids = Column(Text, nullable=False)  # comma-joined, shared by attempts over the same questions
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UserAbility(Base):
+    __tablename__ = "user_abilities"
+    __table_args__ = (
+        UniqueConstraint("user_id", "quiz_set_id", name="uq_user_abilities_user_quiz_set"),
+    )
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    quiz_set_id = Column(String, ForeignKey("quiz_sets.id"), nullable=False)
+    ability = Column(Float, default=0.0)  # logits, same scale as Question.difficulty_rating
+    answered = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class AdaptiveAnswer(Base):
+    __tablename__ = "adaptive_answers"
+    __table_args__ = (
+        UniqueConstraint("user_id", "quiz_set_id", "question_id", name="uq_adaptive_answers_user_question"),
+    )
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    quiz_set_id = Column(String, ForeignKey("quiz_sets.id"), nullable=False)
+    question_id = Column(String, nullable=False)  # not a foreign key: the question may be deleted later
+    answer = Column(JSON)  # Union[int, List[int]]
+    correct = Column(Boolean, nullable=False)
+    answered_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ReviewState(Base):
+    __tablename__ = "review_states"
+    __table_args__ = (
+        UniqueConstraint("user_id", "question_id", name="uq_review_states_user_question"),
+        Index("ix_review_states_user_due", "user_id", "due_at"),
+    )
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    question_id = Column(String, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+    quiz_set_id = Column(String, ForeignKey("quiz_sets.id"), nullable=False)
+    interval_days = Column(Float, default=0.0)
+    ease = Column(Float, default=2.5)
+    repetitions = Column(Integer, default=0)
+    lapses = Column(Integer, default=0)
+    due_at = Column(DateTime(timezone=True), nullable=False)
+    last_reviewed_at = Column(DateTime(timezone=True))
+
+
+class ExamSession(Base):
+    __tablename__ = "exam_sessions"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    quiz_set_id = Column(String, ForeignKey("quiz_sets.id"), nullable=False)
+    seed = Column(Integer, nullable=False)
+    question_ids = Column(Text, nullable=False)  # comma-separated, sorted; order comes from seed
+    shuffle_options = Column(Boolean, default=True)
+    status = Column(String(20), default="active")  # active, submitted
+    score = Column(Float)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    submitted_at = Column(DateTime(timezone=True))
+
+
+class JobWatermark(Base):
+    __tablename__ = "job_watermarks"
+
+    name = Column(String(100), primary_key=True)
+    watermark = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index("ix_outbox_events_pending", "failed_at", "available_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False)  # claimable after; pushed out while leased
+    last_error = Column(Text)
+    failed_at = Column(DateTime(timezone=True))  # set once retries are exhausted
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CacheInvalidation(Base):
+    __tablename__ = "cache_invalidations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(50), nullable=False)
+    entity_id = Column(String, nullable=False)
+    version = Column(Integer, nullable=False)  # publisher's time.time_ns()
+    origin = Column(String(100), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class ChangeCounter(Base):
+    __tablename__ = "change_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class Tombstone(Base):
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(50), nullable=False)  # quiz_set, question
+    entity_id = Column(String, nullable=False)
+    quiz_set_id = Column(String)
+    change_seq = Column(Integer, nullable=False, unique=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Registers the flush hook that stamps change_seq and writes tombstones
+from app.database import change_tracking  # noqa: E402,F401
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Union, Dict, Any
-from datetime import datetime
+from typing import Annotated, List, Optional, Union, Dict, Any
+from datetime import date, datetime
 from enum import Enum
 
 
@@ -83,6 +83,7 @@ class Question(QuestionBase):
     review_status: Optional[str] = "pending"
     difficulty_rating: Optional[float] = None
     success_rate: Optional[float] = None
+    change_seq: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -114,6 +115,7 @@ class QuizSet(QuizSetBase):
     total_questions: int = 0
     created_at: datetime
     updated_at: Optional[datetime] = None
+    change_seq: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -152,8 +154,35 @@ class UserProgress(UserProgressBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProgressSyncRecord(UserProgressCreate):
+    client_updated_at: datetime  # when the client last changed this record
+
+
+class ProgressSyncRequest(BaseModel):
+    records: List[ProgressSyncRecord] = Field(..., min_length=1, max_length=500)
+
+
+class ProgressSyncStatus(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    STALE = "stale"  # the server already has a newer write; its copy is kept
+    NOT_FOUND = "not_found"  # unknown or deleted quiz set
+
+
+class ProgressSyncResult(BaseModel):
+    quiz_set_id: str
+    status: ProgressSyncStatus
+    client_updated_at: Optional[datetime] = None  # the winning write's timestamp
+
+
+class ProgressSyncResponse(BaseModel):
+    results: List[ProgressSyncResult]  # in request order
+
+
 class QuizSubmission(BaseModel):
     answers: Dict[str, Union[int, List[int]]]
+    # Seconds spent on each question, keyed by question id
+    question_times: Dict[str, Annotated[float, Field(ge=0, allow_inf_nan=False)]] = {}
 
 
 class DetailedResult(BaseModel):
@@ -171,10 +200,97 @@ class QuizResults(BaseModel):
     detailed_results: List[DetailedResult]
 
 
+class PracticeAnswer(BaseModel):
+    question_id: str
+    answer: Union[int, List[int]]
+
+
+class PracticeAnswerResult(BaseModel):
+    question_id: str
+    correct: bool
+    correct_answer: Union[int, List[int]]
+    ability: float
+
+
+class NextQuestion(BaseModel):
+    ability: float
+    remaining: int
+    question: Optional[Question] = None
+
+
+class ReviewItem(BaseModel):
+    question: Question
+    due_at: datetime
+    interval_days: float
+    ease: float
+    repetitions: int
+    lapses: int
+
+
+class ExamBlueprint(BaseModel):
+    total_questions: int = Field(..., ge=1, le=500)
+    category_quotas: Dict[str, float] = {}  # category -> share of the exam
+    difficulty_quotas: Dict[DifficultyLevel, float] = {}
+    seed: Optional[int] = None
+
+
+class GeneratedExam(BaseModel):
+    quiz_set_id: str
+    seed: int
+    questions: List[Question]
+
+
+class ExamSessionCreate(BaseModel):
+    limit: Optional[int] = Field(None, ge=1)
+    blueprint: Optional[ExamBlueprint] = None
+    shuffle_options: bool = True
+    seed: Optional[int] = None
+
+
+class ExamSession(BaseModel):
+    id: str
+    user_id: str
+    quiz_set_id: str
+    seed: int
+    shuffle_options: bool
+    status: str
+    score: Optional[float] = None
+    created_at: Optional[datetime] = None
+    submitted_at: Optional[datetime] = None
+    questions: List[Question] = []
+
+
+class QuestionBatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=500)
+
+
+class QuestionBatch(BaseModel):
+    questions: List[Question]
+    missing: List[str] = []  # requested ids not found in the quiz set
+
+
+class Tombstone(BaseModel):
+    entity: str  # quiz_set, question
+    id: str
+    quiz_set_id: Optional[str] = None
+    change_seq: int
+    deleted_at: Optional[datetime] = None
+
+
+class ChangeFeed(BaseModel):
+    quiz_sets: List[QuizSet] = []
+    questions: List[Question] = []
+    tombstones: List[Tombstone] = []
+    next_since: int  # pass as ``since`` on the next call
+    has_more: bool
+
+
 class QuestionStats(BaseModel):
     question_id: str
     correct_rate: float
-    avg_time_spent: float
+    avg_time_spent: float  # seconds; 0 until timings are submitted
+    p50_time_spent: Optional[float] = None
+    p90_time_spent: Optional[float] = None
 
 
 class QuizAnalytics(BaseModel):
@@ -193,6 +309,64 @@ class UserStats(BaseModel):
     weak_categories: List[str]
 
 
+class CategoryWeekStats(BaseModel):
+    category: str
+    week_start: date  # Monday, UTC
+    attempts: int
+    pass_rate: float
+    average_score: float
+    p50_score: float
+    p90_score: float
+
+
+class CategoryPassRateReport(BaseModel):
+    weeks: int
+    pass_score: float
+    rows: List[CategoryWeekStats]
+
+
+class QuestionDiscrimination(BaseModel):
+    question_id: str
+    quiz_set_id: Optional[str] = None
+    responses: int
+    p_value: float  # proportion answered correctly
+    discrimination: Optional[float] = None  # point-biserial vs rest score; None without variance
+
+
+class DiscriminationReport(BaseModel):
+    min_responses: int
+    questions: List[QuestionDiscrimination]
+
+
+class ProfileSqlStatement(BaseModel):
+    statement: str
+    count: int
+    total_ms: float
+    max_ms: float
+
+
+class ProfileFrame(BaseModel):
+    frame: str  # module.qualname
+    self_samples: int
+    inclusive_samples: int
+
+
+class ProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    status_code: int
+    started_at: datetime
+    duration_ms: float
+    sample_interval_ms: float
+    samples: int
+    sql_queries: int
+    sql_ms: float
+    sql_statements: List[ProfileSqlStatement]  # by total time, slowest first
+    hot_frames: List[ProfileFrame]  # by self samples
+    inclusive_frames: List[ProfileFrame]  # by inclusive samples
+
+
 class UserBase(BaseModel):
     name: str
     email: str
@@ -218,6 +392,11 @@ class User(UserBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class LoginRequest(BaseModel):
+    email: str
+    password: str
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
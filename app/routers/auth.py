@@ -0,0 +1,89 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
+from app.core.auth import Principal, get_current_user
+from app.core.security import create_access_token, get_password_hash_async, verify_password_async
+from app.database.session import get_db
+from app.models.database import User as DBUser
+from app.models.schemas import User, UserCreate, UserUpdate, LoginRequest, Token
+from app.services.user_service import UserService
+
+router = APIRouter()
+
+
+async def _authenticate(service: UserService, email: str, password: str) -> Optional[DBUser]:
+    user = service.get_user_by_email(email)
+    if not user or not await verify_password_async(password, user.hashed_password):
+        return None
+    return user
+
+
+@router.post("/auth/register", response_model=User, status_code=201)
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    """Register a new user"""
+    service = UserService(db)
+    if service.get_user_by_email(user.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    
+    hashed_password = await get_password_hash_async(user.password)
+    return service.create_user(user, hashed_password)
+
+
+@router.post("/auth/login", response_model=Token)
+async def login(credentials: LoginRequest, db: Session = Depends(get_db)):
+    """Log in with email and password"""
+    user = await _authenticate(UserService(db), credentials.email, credentials.password)
+    if not user:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    return Token(access_token=create_access_token(user.id), token_type="bearer")
+
+
+@router.post("/auth/token", response_model=Token)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db)
+):
+    """OAuth2 password flow token endpoint (username is the email)"""
+    user = await _authenticate(UserService(db), form_data.username, form_data.password)
+    if not user:
+        raise HTTPException(
+            status_code=401,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return Token(access_token=create_access_token(user.id), token_type="bearer")
+
+
+@router.get("/auth/me", response_model=User)
+async def read_current_user(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the authenticated user"""
+    user = UserService(db).get_user(current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+@router.put("/auth/me", response_model=User)
+async def update_current_user(
+    user: UserUpdate,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Update the authenticated user's profile or password"""
+    service = UserService(db)
+    if user.email:
+        existing = service.get_user_by_email(user.email)
+        if existing and existing.id != current_user.id:
+            raise HTTPException(status_code=400, detail="Email already registered")
+    
+    # Users cannot change their own role
+    user = UserUpdate(**user.model_dump(exclude_unset=True, exclude={'role'}))
+    hashed_password = await get_password_hash_async(user.password) if user.password else None
+    updated_user = service.update_user(current_user.id, user, hashed_password)
+    if not updated_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return updated_user
@@ -0,0 +1,43 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Path
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.profiling import PROFILE_ID_PATTERN, profiler, valid_profile_token
+from app.models.schemas import ProfileSummary
+
+
+def require_profile_token(x_profile_token: Optional[str] = Header(None)) -> None:
+    """Profiles expose SQL and code paths, so reading them needs the profiling token"""
+    if not valid_profile_token(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+router = APIRouter(dependencies=[Depends(require_profile_token)])
+
+
+@router.get("/profiles", response_model=List[ProfileSummary])
+async def list_profiles():
+    """Stored request profiles, newest first"""
+    return await run_in_threadpool(profiler.summaries)
+
+
+@router.get("/profiles/{profile_id}", response_model=ProfileSummary)
+async def get_profile(profile_id: str = Path(..., pattern=PROFILE_ID_PATTERN)):
+    """SQL timings and hottest frames of one profile"""
+    summary = await run_in_threadpool(profiler.load_summary, profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return summary
+
+
+@router.get("/profiles/{profile_id}/collapsed")
+async def download_collapsed_stacks(profile_id: str = Path(..., pattern=PROFILE_ID_PATTERN)):
+    """Collapsed stacks for flamegraph.pl, speedscope or inferno"""
+    summary = await run_in_threadpool(profiler.load_summary, profile_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(
+        profiler.collapsed_path(profile_id),
+        media_type="text/plain",
+        filename=f"{profile_id}.collapsed"
+    )
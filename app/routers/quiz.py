@@ -1,18 +1,64 @@
-from typing import List, Optional
+import random
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, TypeVar
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.auth import get_current_user_id
 from app.database.session import get_db
-from app.services.quiz_service import QuizService
+from app.database.sharding import fan_out, get_quiz_db, quiz_session, run_on_shards, session_factories, shard_index
+from app.models.database import ExamSession as DBExamSession, generate_uuid
+from app.services.quiz_service import QuizService, quiz_reads
+from app.services.adaptive_service import AdaptiveService
+from app.services.review_service import ReviewService
+from app.services.exam_service import ExamService, ExamGenerationError
+from app.services.exam_session_service import ExamSessionService, ExamSessionError, session_quiz_set_id
 from app.models.schemas import (
     QuizSet, QuizSetCreate, QuizSetUpdate,
-    Question, QuestionCreate, QuestionUpdate,
+    Question, QuestionCreate, QuestionUpdate, QuestionBatch, QuestionBatchRequest,
     UserProgress, UserProgressCreate, UserProgressUpdate,
     QuizSubmission, QuizResults, QuizAnalytics, UserStats,
-    DifficultyLevel
+    DifficultyLevel, NextQuestion, PracticeAnswer, PracticeAnswerResult,
+    ReviewItem, ExamBlueprint, GeneratedExam, ExamSession, ExamSessionCreate, ChangeFeed,
+    ProgressSyncRequest, ProgressSyncResponse, ProgressSyncResult
 )
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+
+async def _coalesced_read(quiz_set_id: str, key: Hashable, read: Callable[[QuizService], T]) -> T:
+    """Run a read once for all concurrent identical requests.
+
+    The read gets its own session because its result is shared with requests
+    other than the one that started it.
+    """
+    def run() -> T:
+        with quiz_session(quiz_set_id) as db:
+            return read(QuizService(db))
+
+    return await quiz_reads.do(key, lambda: run_in_threadpool(run))
+
+
+def _exam_session_db(session_id: str) -> Iterator[Session]:
+    """Session on the shard that holds an exam session, found from the quiz set its id names"""
+    quiz_set_id = session_quiz_set_id(session_id)
+    factories = session_factories()
+    if quiz_set_id is not None:
+        db = quiz_session(quiz_set_id)
+    elif len(factories) == 1:
+        db = factories[0]()
+    else:
+        # Sessions created before ids named their quiz set
+        found = fan_out(lambda db: db.query(DBExamSession.id).filter(DBExamSession.id == session_id).first() is not None)
+        if True not in found:
+            raise HTTPException(status_code=404, detail="Exam session not found")
+        db = factories[found.index(True)]()
+    try:
+        yield db
+    finally:
+        db.close()
+
 
 @router.get("/quiz-sets", response_model=List[QuizSet])
 async def get_quiz_sets(
@@ -26,27 +72,32 @@ async def get_quiz_sets(
 
 
 @router.get("/quiz-sets/{quiz_set_id}", response_model=QuizSet)
-async def get_quiz_set(quiz_set_id: str, db: Session = Depends(get_db)):
+async def get_quiz_set(quiz_set_id: str):
     """Get a specific quiz set"""
-    service = QuizService(db)
-    quiz_set = service.get_quiz_set(quiz_set_id)
+    quiz_set = await _coalesced_read(
+        quiz_set_id,
+        ("quiz_set", quiz_set_id),
+        lambda service: service.get_quiz_set(quiz_set_id)
+    )
     if not quiz_set:
         raise HTTPException(status_code=404, detail="Quiz set not found")
     return quiz_set
 
 
 @router.post("/quiz-sets", response_model=QuizSet)
-async def create_quiz_set(quiz_set: QuizSetCreate, db: Session = Depends(get_db)):
+async def create_quiz_set(quiz_set: QuizSetCreate):
     """Create a new quiz set"""
-    service = QuizService(db)
-    return service.create_quiz_set(quiz_set)
+    # The id picks the shard, so it is chosen before the session is opened
+    quiz_set_id = generate_uuid()
+    with quiz_session(quiz_set_id) as db:
+        return QuizService(db).create_quiz_set(quiz_set, quiz_set_id)
 
 
 @router.put("/quiz-sets/{quiz_set_id}", response_model=QuizSet)
 async def update_quiz_set(
     quiz_set_id: str, 
     quiz_set: QuizSetUpdate, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_quiz_db)
 ):
     """Update a quiz set"""
     service = QuizService(db)
@@ -57,7 +108,7 @@ async def update_quiz_set(
 
 
 @router.delete("/quiz-sets/{quiz_set_id}")
-async def delete_quiz_set(quiz_set_id: str, db: Session = Depends(get_db)):
+async def delete_quiz_set(quiz_set_id: str, db: Session = Depends(get_quiz_db)):
     """Delete a quiz set"""
     service = QuizService(db)
     success = service.delete_quiz_set(quiz_set_id)
@@ -71,10 +122,38 @@ async def get_questions(
     quiz_set_id: str,
     shuffle: bool = Query(False),
     limit: Optional[int] = Query(None, ge=1),
-    difficulty: Optional[DifficultyLevel] = Query(None),
-    db: Session = Depends(get_db)
+    difficulty: Optional[DifficultyLevel] = Query(None)
 ):
     """Get questions for a quiz set"""
+    def read(service: QuizService) -> Optional[List[Question]]:
+        # Verify quiz set exists
+        if not service.get_quiz_set(quiz_set_id):
+            return None
+        return service.get_questions(quiz_set_id=quiz_set_id, difficulty=difficulty)
+    
+    # Shuffle and limit per request so coalesced callers share one unshuffled read
+    questions = await _coalesced_read(
+        quiz_set_id,
+        ("questions", quiz_set_id, difficulty.value if difficulty else None),
+        read
+    )
+    if questions is None:
+        raise HTTPException(status_code=404, detail="Quiz set not found")
+    
+    if shuffle:
+        questions = random.sample(questions, len(questions))
+    if limit:
+        questions = questions[:limit]
+    return questions
+
+
+@router.post("/quiz-sets/{quiz_set_id}/questions/batch", response_model=QuestionBatch)
+async def get_questions_batch(
+    quiz_set_id: str,
+    batch: QuestionBatchRequest,
+    db: Session = Depends(get_quiz_db)
+):
+    """Get many questions by id in one call; unknown ids are reported as missing"""
     service = QuizService(db)
     
     # Verify quiz set exists
@@ -82,19 +161,15 @@ async def get_questions(
     if not quiz_set:
         raise HTTPException(status_code=404, detail="Quiz set not found")
     
-    return service.get_questions(
-        quiz_set_id=quiz_set_id,
-        shuffle=shuffle,
-        limit=limit,
-        difficulty=difficulty
-    )
+    questions, missing = service.get_questions_by_ids(quiz_set_id, batch.ids)
+    return QuestionBatch(questions=questions, missing=missing)
 
 
 @router.get("/quiz-sets/{quiz_set_id}/questions/{question_id}", response_model=Question)
 async def get_question(
     quiz_set_id: str, 
     question_id: str, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_quiz_db)
 ):
     """Get a specific question"""
     service = QuizService(db)
@@ -108,7 +183,7 @@ async def get_question(
 async def create_question(
     quiz_set_id: str,
     question: QuestionCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_quiz_db)
 ):
     """Create a new question"""
     service = QuizService(db)
@@ -128,17 +203,13 @@ async def update_question(
     quiz_set_id: str,
     question_id: str,
     question: QuestionUpdate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_quiz_db)
 ):
     """Update a question"""
     service = QuizService(db)
     
-    # Verify question exists and belongs to quiz set
-    existing_question = service.get_question(question_id)
-    if not existing_question or existing_question.quiz_set_id != quiz_set_id:
-        raise HTTPException(status_code=404, detail="Question not found")
-    
-    updated_question = service.update_question(question_id, question)
+    # Scoped to the quiz set, so a question from another set is not found
+    updated_question = service.update_question(quiz_set_id, question_id, question)
     if not updated_question:
         raise HTTPException(status_code=404, detail="Question not found")
     return updated_question
@@ -148,28 +219,95 @@ async def update_question(
 async def delete_question(
     quiz_set_id: str,
     question_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_quiz_db)
 ):
     """Delete a question"""
     service = QuizService(db)
     
-    # Verify question exists and belongs to quiz set
-    existing_question = service.get_question(question_id)
-    if not existing_question or existing_question.quiz_set_id != quiz_set_id:
-        raise HTTPException(status_code=404, detail="Question not found")
-    
-    success = service.delete_question(question_id)
+    # Scoped to the quiz set, so a question from another set is not found
+    success = service.delete_question(quiz_set_id, question_id)
     if not success:
         raise HTTPException(status_code=404, detail="Question not found")
     return {"message": "Question deleted successfully"}
 
 
+@router.post("/quiz-sets/{quiz_set_id}/exams", response_model=GeneratedExam)
+async def generate_exam(
+    quiz_set_id: str,
+    blueprint: ExamBlueprint,
+    db: Session = Depends(get_quiz_db)
+):
+    """Generate a seeded exam that follows a category/difficulty blueprint"""
+    service = QuizService(db)
+    
+    # Verify quiz set exists
+    quiz_set = service.get_quiz_set(quiz_set_id)
+    if not quiz_set:
+        raise HTTPException(status_code=404, detail="Quiz set not found")
+    
+    try:
+        return ExamService(db).generate_exam(quiz_set_id, blueprint)
+    except ExamGenerationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/quiz-sets/{quiz_set_id}/sessions", response_model=ExamSession)
+async def create_exam_session(
+    quiz_set_id: str,
+    session: ExamSessionCreate,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_quiz_db)
+):
+    """Start an exam session with seeded question and option order"""
+    service = QuizService(db)
+    
+    # Verify quiz set exists
+    quiz_set = service.get_quiz_set(quiz_set_id)
+    if not quiz_set:
+        raise HTTPException(status_code=404, detail="Quiz set not found")
+    
+    try:
+        return ExamSessionService(db).create_session(user_id, quiz_set_id, session)
+    except (ExamGenerationError, ExamSessionError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/sessions/{session_id}", response_model=ExamSession)
+async def get_exam_session(
+    session_id: str,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(_exam_session_db)
+):
+    """Resume an exam session"""
+    session = ExamSessionService(db).get_session(session_id, user_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Exam session not found")
+    return session
+
+
+@router.post("/sessions/{session_id}/submit", response_model=QuizResults)
+async def submit_exam_session(
+    session_id: str,
+    submission: QuizSubmission,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(_exam_session_db)
+):
+    """Submit answers for an exam session, graded over its questions only"""
+    try:
+        results = ExamSessionService(db).submit_session(session_id, user_id, submission)
+    except ExamSessionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not results:
+        raise HTTPException(status_code=404, detail="Exam session not found")
+    return results
+
+
 @router.post("/quiz-sets/{quiz_set_id}/submit", response_model=QuizResults)
 async def submit_quiz(
     quiz_set_id: str,
     submission: QuizSubmission,
-    user_id: str = Query("anonymous"),  # TODO: Get from authentication
-    db: Session = Depends(get_db)
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_quiz_db)
 ):
     """Submit quiz answers and get results"""
     service = QuizService(db)
@@ -182,22 +320,74 @@ async def submit_quiz(
     return service.submit_quiz(user_id, quiz_set_id, submission)
 
 
+@router.get("/quiz-sets/{quiz_set_id}/next-question", response_model=NextQuestion)
+async def get_next_question(
+    quiz_set_id: str,
+    exclude: Optional[List[str]] = Query(None),
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_quiz_db)
+):
+    """Get the unanswered question closest to the user's estimated ability"""
+    service = QuizService(db)
+    
+    # Verify quiz set exists
+    quiz_set = service.get_quiz_set(quiz_set_id)
+    if not quiz_set:
+        raise HTTPException(status_code=404, detail="Quiz set not found")
+    
+    return AdaptiveService(db).next_question(user_id, quiz_set_id, exclude=exclude or [])
+
+
+@router.post("/quiz-sets/{quiz_set_id}/practice/answers", response_model=PracticeAnswerResult)
+async def answer_practice_question(
+    quiz_set_id: str,
+    answer: PracticeAnswer,
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_quiz_db)
+):
+    """Answer a practice question and update the user's ability estimate"""
+    result = AdaptiveService(db).record_answer(user_id, quiz_set_id, answer)
+    if not result:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return result
+
+
 @router.post("/progress", response_model=UserProgress)
 async def save_progress(
     progress: UserProgressCreate,
-    user_id: str = Query("anonymous"),  # TODO: Get from authentication
-    db: Session = Depends(get_db)
+    user_id: str = Depends(get_current_user_id)
 ):
     """Save user progress"""
-    service = QuizService(db)
-    return service.save_progress(user_id, progress)
+    with quiz_session(progress.quiz_set_id) as db:
+        return QuizService(db).save_progress(user_id, progress)
+
+
+@router.post("/progress/sync", response_model=ProgressSyncResponse)
+async def sync_progress(
+    sync: ProgressSyncRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """Apply many offline progress records at once; per quiz set, the latest client_updated_at wins"""
+    # One transaction per shard the records fall on, run in parallel
+    shards: Dict[int, List[int]] = {}
+    for i, record in enumerate(sync.records):
+        shards.setdefault(shard_index(record.quiz_set_id), []).append(i)
+    outcomes = run_on_shards({
+        shard: lambda db, indices=indices: QuizService(db).sync_progress(user_id, [sync.records[i] for i in indices])
+        for shard, indices in shards.items()
+    })
+    results: List[Optional[ProgressSyncResult]] = [None] * len(sync.records)
+    for shard, indices in shards.items():
+        for i, outcome in zip(indices, outcomes[shard]):
+            results[i] = outcome
+    return ProgressSyncResponse(results=results)
 
 
 @router.get("/progress/{quiz_set_id}", response_model=UserProgress)
 async def get_progress(
     quiz_set_id: str,
-    user_id: str = Query("anonymous"),  # TODO: Get from authentication
-    db: Session = Depends(get_db)
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_quiz_db)
 ):
     """Get user progress for a quiz set"""
     service = QuizService(db)
@@ -207,8 +397,32 @@ async def get_progress(
     return progress
 
 
+@router.get("/reviews/due", response_model=List[ReviewItem])
+async def get_due_reviews(
+    limit: int = Query(20, ge=1, le=100),
+    user_id: str = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """Get the user's next due review questions"""
+    # Each shard's earliest ``limit`` are enough to find the earliest overall
+    due = fan_out(lambda shard_db: ReviewService(shard_db).get_due_reviews(user_id, limit=limit), db)
+    return sorted((item for items in due for item in items), key=lambda item: item.due_at)[:limit]
+
+
+@router.get("/changes", response_model=ChangeFeed)
+async def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    quiz_set_id: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Get quiz sets, questions and deletions changed after the ``since`` sequence"""
+    service = QuizService(db)
+    return service.get_changes(since=since, limit=limit, quiz_set_id=quiz_set_id)
+
+
 @router.get("/quiz-sets/{quiz_set_id}/analytics", response_model=QuizAnalytics)
-async def get_quiz_analytics(quiz_set_id: str, db: Session = Depends(get_db)):
+async def get_quiz_analytics(quiz_set_id: str, db: Session = Depends(get_quiz_db)):
     """Get analytics for a quiz set"""
     service = QuizService(db)
     
@@ -222,7 +436,7 @@ async def get_quiz_analytics(quiz_set_id: str, db: Session = Depends(get_db)):
 
 @router.get("/users/stats", response_model=UserStats)
 async def get_user_stats(
-    user_id: str = Query("anonymous"),  # TODO: Get from authentication
+    user_id: str = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
     """Get user statistics"""
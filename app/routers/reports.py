@@ -0,0 +1,42 @@
+import time
+from fastapi import APIRouter, Query
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.models.schemas import CategoryPassRateReport, DiscriminationReport
+
+router = APIRouter()
+
+# The analytics engine imports NumPy, so it is loaded on the first report
+# request rather than at startup.
+
+
+@router.get("/reports/category-pass-rates", response_model=CategoryPassRateReport)
+async def get_category_pass_rates(weeks: int = Query(12, ge=1, le=52)):
+    """Pass rate and score percentiles per category and week across all quiz sets"""
+    from app.services import analytics_engine
+
+    columns, quiz_set_categories, _ = await run_in_threadpool(analytics_engine.load_snapshot)
+    since = time.time() - weeks * analytics_engine.WEEK_SECONDS
+    rows = await analytics_engine.run_report(
+        columns, analytics_engine.category_pass_rates,
+        quiz_set_categories, since, settings.ANALYTICS_PASS_SCORE
+    )
+    return CategoryPassRateReport(weeks=weeks, pass_score=settings.ANALYTICS_PASS_SCORE, rows=rows)
+
+
+@router.get("/reports/question-discrimination", response_model=DiscriminationReport)
+async def get_question_discrimination(
+    quiz_set_id: str = Query(None),
+    min_responses: int = Query(20, ge=1)
+):
+    """Difficulty and point-biserial discrimination per question, least discriminating first"""
+    from app.services import analytics_engine
+
+    columns, _, question_quiz_sets = await run_in_threadpool(analytics_engine.load_snapshot)
+    questions = await analytics_engine.run_report(
+        columns, analytics_engine.question_discrimination, question_quiz_sets, min_responses
+    )
+    if quiz_set_id:
+        # Rest scores span the whole attempt, so filter after computing
+        questions = [question for question in questions if question["quiz_set_id"] == quiz_set_id]
+    return DiscriminationReport(min_responses=min_responses, questions=questions)
@@ -0,0 +1,109 @@
+import math
+from typing import Iterable, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import AdaptiveAnswer, Question as DBQuestion, UserAbility, generate_uuid
+from app.models.schemas import NextQuestion, PracticeAnswer, PracticeAnswerResult
+from app.services.difficulty_index import get_difficulty_index, question_difficulty
+from app.services.quiz_service import UPSERT_INSERTS, QuizService, grade_answer
+
+
+class AdaptiveService:
+    """Picks practice questions close to the learner's estimated ability"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_ability(self, user_id: str, quiz_set_id: str) -> float:
+        ability = self._get_user_ability(user_id, quiz_set_id)
+        return ability.ability if ability else 0.0
+
+    def next_question(
+        self,
+        user_id: str,
+        quiz_set_id: str,
+        exclude: Iterable[str] = ()
+    ) -> NextQuestion:
+        ability = self.get_ability(user_id, quiz_set_id)
+        answered = self._answered_question_ids(user_id, quiz_set_id)
+        answered.update(exclude)
+
+        index = get_difficulty_index(self.db, quiz_set_id)
+        question_id = index.closest(ability, exclude=answered)
+
+        question = None
+        if question_id:
+            db_question = self.db.get(DBQuestion, question_id)
+            if db_question:
+                question = QuizService(self.db)._convert_question(db_question)
+
+        return NextQuestion(
+            ability=ability,
+            remaining=len(index) - len(answered & index.id_set),
+            question=question
+        )
+
+    def record_answer(
+        self,
+        user_id: str,
+        quiz_set_id: str,
+        answer: PracticeAnswer
+    ) -> Optional[PracticeAnswerResult]:
+        question = self.db.get(DBQuestion, answer.question_id)
+        if not question or question.quiz_set_id != quiz_set_id:
+            return None
+
+        correct = grade_answer(answer.answer, question.correct_answer)
+
+        upsert = UPSERT_INSERTS[self.db.get_bind().dialect.name]
+        # Concurrent first answers both insert; the loser's insert is a no-op
+        self.db.execute(
+            upsert(UserAbility)
+            .values(id=generate_uuid(), user_id=user_id, quiz_set_id=quiz_set_id, ability=0.0, answered=0)
+            .on_conflict_do_nothing(index_elements=[UserAbility.user_id, UserAbility.quiz_set_id])
+        )
+        # Elo update on the logit scale shared with Question.difficulty_rating;
+        # the row lock serialises concurrent answers (Postgres)
+        ability = self._get_user_ability(user_id, quiz_set_id, for_update=True)
+        difficulty = question_difficulty(question.difficulty_rating, question.difficulty)
+        expected = 1.0 / (1.0 + math.exp(difficulty - ability.ability))
+        ability.ability += settings.ADAPTIVE_ELO_K * ((1.0 if correct else 0.0) - expected)
+        ability.answered = (ability.answered or 0) + 1
+
+        # Practice answers have their own rows, apart from the quiz progress record
+        statement = upsert(AdaptiveAnswer).values(
+            id=generate_uuid(), user_id=user_id, quiz_set_id=quiz_set_id,
+            question_id=question.id, answer=answer.answer, correct=correct
+        )
+        self.db.execute(statement.on_conflict_do_update(
+            index_elements=[AdaptiveAnswer.user_id, AdaptiveAnswer.quiz_set_id, AdaptiveAnswer.question_id],
+            set_={"answer": statement.excluded.answer, "correct": statement.excluded.correct, "answered_at": func.now()}
+        ))
+
+        self.db.commit()
+
+        return PracticeAnswerResult(
+            question_id=question.id,
+            correct=correct,
+            correct_answer=question.correct_answer,
+            ability=ability.ability
+        )
+
+    def _get_user_ability(self, user_id: str, quiz_set_id: str, for_update: bool = False) -> Optional[UserAbility]:
+        query = self.db.query(UserAbility).filter(
+            UserAbility.user_id == user_id,
+            UserAbility.quiz_set_id == quiz_set_id
+        )
+        if for_update:
+            query = query.with_for_update().populate_existing()
+        return query.first()
+
+    def _answered_question_ids(self, user_id: str, quiz_set_id: str) -> Set[str]:
+        return {
+            question_id for (question_id,) in
+            self.db.query(AdaptiveAnswer.question_id)
+            .filter(AdaptiveAnswer.user_id == user_id, AdaptiveAnswer.quiz_set_id == quiz_set_id)
+        }
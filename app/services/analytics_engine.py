@@ -0,0 +1,425 @@
+"""Columnar in-memory analytics over recent quiz attempts.
+
+Attempts are streamed from ``quiz_attempts`` into NumPy column arrays: one
+row per attempt and one row per answered question ("responses"). The store
+refreshes incrementally, appending attempts that completed since its last
+watermark, and drops attempts older than ``ATTEMPT_HOT_DAYS`` (those live
+on as rollups, see compaction_service). Reports are pure functions over a
+snapshot so large ones can run in a process pool.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.database.sharding import session_factories
+from app.models.database import QuizAttempt, QuizSet as DBQuizSet, Question as DBQuestion
+from app.services.attempt_codec import HEADER, load_question_orders
+
+WEEK_SECONDS = 7 * 86400
+# The Unix epoch is a Thursday; shift so weeks start on Monday
+WEEK_OFFSET_SECONDS = 3 * 86400
+
+
+@dataclass(frozen=True)
+class AttemptColumns:
+    completed_at: np.ndarray  # float64 epoch seconds, per attempt
+    quiz_set: np.ndarray  # int32 code into quiz_set_ids, per attempt
+    user: np.ndarray  # int32 code into user_ids, per attempt
+    score: np.ndarray  # float64, per attempt
+    response_attempt: np.ndarray  # int64 attempt row, per response
+    response_question: np.ndarray  # int32 code into question_ids, per response
+    response_correct: np.ndarray  # bool, per response
+    quiz_set_ids: Tuple[str, ...]
+    user_ids: Tuple[str, ...]
+    question_ids: Tuple[str, ...]
+
+    @property
+    def responses(self) -> int:
+        return len(self.response_attempt)
+
+
+def _empty_columns() -> AttemptColumns:
+    return AttemptColumns(
+        completed_at=np.array([], dtype=np.float64),
+        quiz_set=np.array([], dtype=np.int32),
+        user=np.array([], dtype=np.int32),
+        score=np.array([], dtype=np.float64),
+        response_attempt=np.array([], dtype=np.int64),
+        response_question=np.array([], dtype=np.int32),
+        response_correct=np.array([], dtype=bool),
+        quiz_set_ids=(),
+        user_ids=(),
+        question_ids=(),
+    )
+
+
+def _epoch(value: datetime) -> float:
+    # SQLite returns naive datetimes, Postgres aware ones; both hold UTC. A naive
+    # value's timestamp() would be read as local time.
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+class _Codes:
+    """Assigns dense integer codes to string ids"""
+
+    def __init__(self, ids: Tuple[str, ...] = ()):
+        self.ids = list(ids)
+        self.codes = {value: i for i, value in enumerate(self.ids)}
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.ids)
+            self.ids.append(value)
+        return code
+
+
+class AttemptColumnStore:
+    """Incrementally refreshed column snapshot of attempts in the hot window.
+
+    Each refresh also reloads the live quiz set categories and question quiz
+    sets the reports look attempts up in.
+    """
+
+    def __init__(self, chunk_size: int = 5000):
+        self.chunk_size = chunk_size
+        self.columns = _empty_columns()
+        self.quiz_set_categories: Dict[str, str] = {}
+        self.question_quiz_sets: Dict[str, str] = {}
+        self.watermark: Optional[datetime] = None
+        self.refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self, *sessions: Session, max_age_seconds: Optional[float] = None) -> AttemptColumns:
+        """Current columns, refreshed first if older than ``max_age_seconds``"""
+        max_age = settings.ANALYTICS_REFRESH_SECONDS if max_age_seconds is None else max_age_seconds
+        if time.monotonic() - self.refreshed_at >= max_age:
+            with self._lock:
+                if time.monotonic() - self.refreshed_at >= max_age:
+                    self.refresh(*sessions)
+        return self.columns
+
+    def refresh(self, *sessions: Session) -> int:
+        """Append attempts completed since the watermark; returns the number added.
+
+        With sharding, pass one session per shard; they share the watermark.
+        """
+        # Same settle window as the rating job, so late commits are not skipped
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.RATING_RECALC_SETTLE_SECONDS)
+        hot_start = datetime.utcnow() - timedelta(days=settings.ATTEMPT_HOT_DAYS)
+
+        columns = self.columns
+        quiz_sets = _Codes(columns.quiz_set_ids)
+        users = _Codes(columns.user_ids)
+        questions = _Codes(columns.question_ids)
+        parts = []
+        offset = len(columns.score)
+        for db in sessions:
+            query = (
+                db.query(
+                    QuizAttempt.completed_at, QuizAttempt.quiz_set_id, QuizAttempt.user_id, QuizAttempt.score,
+                    QuizAttempt.detailed_results, QuizAttempt.question_order_id, QuizAttempt.results_blob
+                )
+                .filter(QuizAttempt.completed_at <= cutoff, QuizAttempt.completed_at >= hot_start)
+            )
+            if self.watermark is not None:
+                query = query.filter(QuizAttempt.completed_at > self.watermark)
+            chunk = []
+            for row in query.yield_per(self.chunk_size):
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    parts.append(self._load_chunk(db, chunk, offset, quiz_sets, users, questions))
+                    offset += len(chunk)
+                    chunk = []
+            if chunk:
+                parts.append(self._load_chunk(db, chunk, offset, quiz_sets, users, questions))
+                offset += len(chunk)
+        added = sum(len(part[0]) for part in parts)
+
+        if parts:
+            columns = AttemptColumns(
+                completed_at=np.concatenate([columns.completed_at] + [part[0] for part in parts]),
+                quiz_set=np.concatenate([columns.quiz_set] + [part[1] for part in parts]),
+                user=np.concatenate([columns.user] + [part[2] for part in parts]),
+                score=np.concatenate([columns.score] + [part[3] for part in parts]),
+                response_attempt=np.concatenate([columns.response_attempt] + [part[4] for part in parts]),
+                response_question=np.concatenate([columns.response_question] + [part[5] for part in parts]),
+                response_correct=np.concatenate([columns.response_correct] + [part[6] for part in parts]),
+                quiz_set_ids=tuple(quiz_sets.ids),
+                user_ids=tuple(users.ids),
+                question_ids=tuple(questions.ids),
+            )
+        self.columns = _trim(columns, _epoch(hot_start))
+        self.quiz_set_categories, self.question_quiz_sets = _live_mappings(sessions)
+        self.watermark = cutoff
+        self.refreshed_at = time.monotonic()
+        return added
+
+    def clear(self) -> None:
+        with self._lock:
+            self.columns = _empty_columns()
+            self.quiz_set_categories = {}
+            self.question_quiz_sets = {}
+            self.watermark = None
+            self.refreshed_at = 0.0
+
+    @staticmethod
+    def _load_chunk(db: Session, rows: list, offset: int, quiz_sets: _Codes, users: _Codes, questions: _Codes):
+        completed_at = np.array([_epoch(row.completed_at) for row in rows], dtype=np.float64)
+        quiz_set = np.array([quiz_sets.code(row.quiz_set_id) for row in rows], dtype=np.int32)
+        user = np.array([users.code(row.user_id) for row in rows], dtype=np.int32)
+        score = np.array([row.score for row in rows], dtype=np.float64)
+
+        response_attempt = []
+        response_question = []
+        response_correct = []
+
+        # Compact rows: unpack the bitmaps of each question order as a matrix
+        by_order: Dict[int, List[int]] = {}
+        for i, row in enumerate(rows):
+            if row.results_blob is not None:
+                by_order.setdefault(row.question_order_id, []).append(i)
+        orders = load_question_orders(db, by_order)
+        for order_id, indices in by_order.items():
+            order = orders.get(order_id)
+            if not order:
+                continue
+            n = len(order)
+            size = (n + 7) // 8
+            matrix = np.frombuffer(
+                b"".join(rows[i].results_blob[HEADER.size:HEADER.size + 2 * size] for i in indices),
+                dtype=np.uint8
+            ).reshape(len(indices), 2 * size)
+            answered = np.unpackbits(matrix[:, :size], axis=1, bitorder="little")[:, :n].astype(bool)
+            correct = np.unpackbits(matrix[:, size:], axis=1, bitorder="little")[:, :n].astype(bool)
+            row_index, position = np.nonzero(answered)
+            codes = np.array([questions.code(question_id) for question_id in order], dtype=np.int32)
+            response_attempt.append(np.asarray(indices, dtype=np.int64)[row_index] + offset)
+            response_question.append(codes[position])
+            response_correct.append(correct[row_index, position])
+
+        # Legacy rows stored as JSON
+        legacy_attempt = []
+        legacy_question = []
+        legacy_correct = []
+        for i, row in enumerate(rows):
+            if row.results_blob is None:
+                for result in row.detailed_results or []:
+                    legacy_attempt.append(offset + i)
+                    legacy_question.append(questions.code(result.get("question_id")))
+                    legacy_correct.append(bool(result.get("correct")))
+        response_attempt.append(np.array(legacy_attempt, dtype=np.int64))
+        response_question.append(np.array(legacy_question, dtype=np.int32))
+        response_correct.append(np.array(legacy_correct, dtype=bool))
+
+        return (
+            completed_at, quiz_set, user, score,
+            np.concatenate(response_attempt),
+            np.concatenate(response_question),
+            np.concatenate(response_correct),
+        )
+
+
+def _live_mappings(sessions) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Categories of live quiz sets and quiz sets of their questions, across the given sessions"""
+    quiz_set_categories: Dict[str, str] = {}
+    question_quiz_sets: Dict[str, str] = {}
+    for db in sessions:
+        quiz_set_categories.update(
+            db.query(DBQuizSet.id, DBQuizSet.category).filter(DBQuizSet.deleted_at.is_(None)).all()
+        )
+        question_quiz_sets.update(
+            db.query(DBQuestion.id, DBQuestion.quiz_set_id)
+            .join(DBQuizSet, DBQuizSet.id == DBQuestion.quiz_set_id)
+            .filter(DBQuizSet.deleted_at.is_(None))
+            .all()
+        )
+    return quiz_set_categories, question_quiz_sets
+
+
+def _trim(columns: AttemptColumns, since: float) -> AttemptColumns:
+    """Drop attempts completed before ``since`` and their responses"""
+    keep = columns.completed_at >= since
+    if keep.all():
+        return columns
+    new_index = np.cumsum(keep) - 1
+    keep_responses = keep[columns.response_attempt]
+    return replace(
+        columns,
+        completed_at=columns.completed_at[keep],
+        quiz_set=columns.quiz_set[keep],
+        user=columns.user[keep],
+        score=columns.score[keep],
+        response_attempt=new_index[columns.response_attempt[keep_responses]],
+        response_question=columns.response_question[keep_responses],
+        response_correct=columns.response_correct[keep_responses],
+    )
+
+
+attempt_store = AttemptColumnStore()
+
+
+def grouped_percentiles(groups: np.ndarray, values: np.ndarray, percentiles: List[float]) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """Nearest-rank percentiles of ``values`` within each group, vectorized"""
+    order = np.lexsort((values, groups))
+    sorted_groups = groups[order]
+    sorted_values = values[order]
+    unique_groups, starts, counts = np.unique(sorted_groups, return_index=True, return_counts=True)
+    results = []
+    for percentile in percentiles:
+        index = starts + np.floor(percentile / 100 * (counts - 1)).astype(np.int64)
+        results.append(sorted_values[index])
+    return unique_groups, results
+
+
+def category_pass_rates(
+    columns: AttemptColumns,
+    quiz_set_categories: Dict[str, str],
+    since: float,
+    pass_score: float
+) -> List[dict]:
+    """Attempts, pass rate and score percentiles per (category, week)"""
+    categories = sorted(set(quiz_set_categories.values()))
+    category_codes = {category: i for i, category in enumerate(categories)}
+    # Quiz set code -> category code; -1 for quiz sets that were deleted or purged
+    quiz_set_category = np.array(
+        [category_codes.get(quiz_set_categories.get(quiz_set_id), -1) for quiz_set_id in columns.quiz_set_ids],
+        dtype=np.int64
+    )
+
+    mask = columns.completed_at >= since
+    if not mask.any() or not len(quiz_set_category):
+        return []
+    category = quiz_set_category[columns.quiz_set[mask]]
+    week = ((columns.completed_at[mask] + WEEK_OFFSET_SECONDS) // WEEK_SECONDS).astype(np.int64)
+    score = columns.score[mask]
+    known = category >= 0
+    category, week, score = category[known], week[known], score[known]
+    if not len(score):
+        return []
+
+    first_week = week.min()
+    group = category * (week.max() - first_week + 1) + (week - first_week)
+    groups, (p50, p90) = grouped_percentiles(group, score, [50, 90])
+    inverse = np.searchsorted(groups, group)
+    attempts = np.bincount(inverse, minlength=len(groups))
+    passed = np.bincount(inverse, weights=(score >= pass_score).astype(np.float64), minlength=len(groups))
+    score_sum = np.bincount(inverse, weights=score, minlength=len(groups))
+
+    weeks_span = week.max() - first_week + 1
+    rows = []
+    for i, key in enumerate(groups):
+        week_index = first_week + key % weeks_span
+        rows.append({
+            "category": categories[int(key // weeks_span)],
+            "week_start": datetime.utcfromtimestamp(int(week_index) * WEEK_SECONDS - WEEK_OFFSET_SECONDS).date(),
+            "attempts": int(attempts[i]),
+            "pass_rate": float(passed[i] / attempts[i]),
+            "average_score": float(score_sum[i] / attempts[i]),
+            "p50_score": float(p50[i]),
+            "p90_score": float(p90[i]),
+        })
+    return rows
+
+
+def question_discrimination(
+    columns: AttemptColumns,
+    question_quiz_sets: Dict[str, str],
+    min_responses: int
+) -> List[dict]:
+    """Proportion correct and point-biserial discrimination per question.
+
+    The criterion is the attempt's rest score (correct answers excluding the
+    item itself), so an item does not correlate with itself. Questions missing
+    from ``question_quiz_sets`` (deleted, or in a deleted quiz set) are left out.
+    """
+    if not columns.responses:
+        return []
+    correct = columns.response_correct.astype(np.float64)
+    attempt_correct = np.bincount(columns.response_attempt, weights=correct, minlength=len(columns.score))
+    rest = attempt_correct[columns.response_attempt] - correct
+
+    question = columns.response_question
+    size = len(columns.question_ids)
+    n = np.bincount(question, minlength=size).astype(np.float64)
+    n1 = np.bincount(question, weights=correct, minlength=size)
+    sum_y = np.bincount(question, weights=rest, minlength=size)
+    sum_y2 = np.bincount(question, weights=rest * rest, minlength=size)
+    sum_xy = np.bincount(question, weights=correct * rest, minlength=size)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n0 = n - n1
+        mean_1 = sum_xy / n1
+        mean_0 = (sum_y - sum_xy) / n0
+        std = np.sqrt(np.maximum(sum_y2 / n - (sum_y / n) ** 2, 0))
+        p = n1 / n
+        r_pb = (mean_1 - mean_0) / std * np.sqrt(p * (1 - p))
+
+    rows = []
+    for code in np.nonzero(n >= max(min_responses, 1))[0]:
+        question_id = columns.question_ids[code]
+        if question_id not in question_quiz_sets:
+            continue
+        discrimination = r_pb[code]
+        rows.append({
+            "question_id": question_id,
+            "quiz_set_id": question_quiz_sets.get(question_id),
+            "responses": int(n[code]),
+            "p_value": float(p[code]),
+            "discrimination": float(discrimination) if np.isfinite(discrimination) else None,
+        })
+    rows.sort(key=lambda row: (row["discrimination"] is None, row["discrimination"] or 0.0))
+    return rows
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=settings.ANALYTICS_PROCESS_WORKERS)
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(cancel_futures=True)
+            _process_pool = None
+
+
+async def run_report(columns: AttemptColumns, report, *args):
+    """Run a report function in the process pool when the snapshot is large"""
+    if settings.ANALYTICS_PROCESS_WORKERS > 0 and columns.responses >= settings.ANALYTICS_PROCESS_MIN_RESPONSES:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_process_pool(), report, columns, *args)
+    return await run_in_threadpool(report, columns, *args)
+
+
+def load_snapshot() -> Tuple[AttemptColumns, Dict[str, str], Dict[str, str]]:
+    """Refreshed columns plus live quiz set categories and question quiz sets, across all shards.
+
+    The mappings are reloaded with the columns, not per report. The store only
+    appends, so attempts of quiz sets deleted since they were loaded stay in
+    the columns; reports drop them by these mappings.
+    """
+    sessions = [factory() for factory in session_factories()]
+    try:
+        columns = attempt_store.snapshot(*sessions)
+        return columns, attempt_store.quiz_set_categories, attempt_store.question_quiz_sets
+    finally:
+        for db in sessions:
+            db.close()
@@ -0,0 +1,227 @@
+"""Compact binary encoding of a quiz attempt's answers and results.
+
+An attempt is stored as a reference to a shared ``QuestionOrder`` row plus
+a blob, with ``n`` questions in order::
+
+    version      uint8   (1)
+    n            uint16 LE
+    answered     ceil(n / 8) bytes, bit i set if question i was answered
+    correct      ceil(n / 8) bytes, bit i set if answered correctly
+    multi        ceil(n / 8) bytes, bit i set if the answer was a list
+    answers      n x uint16 LE: the option index, or a bitmask of option
+                 indices for list answers; 0 when unanswered
+
+Bits are little-endian within each byte (``np.unpackbits(bitorder="little")``).
+Correct answers are not stored; decoding takes them from the question table.
+List answers round-trip in ascending order. Attempts whose answers do not
+fit (duplicates in a list, indices outside the mask) stay in JSON.
+"""
+import hashlib
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.database import QuestionOrder, QuizAttempt
+
+VERSION = 1
+HEADER = struct.Struct("<BH")
+MAX_QUESTIONS = 0xFFFF
+MAX_INDEX = 0xFFFF
+MASK_BITS = 16
+
+Answer = Union[int, List[int]]
+
+# (database URL, digest) -> QuestionOrder.id; rows are immutable, so entries never
+# go stale. Ids are per database, and a process may write to several shards.
+_order_ids: Dict[Tuple[str, str], int] = {}
+_ORDER_CACHE_SIZE = 10000
+
+
+def _bitmap(flags: List[bool]) -> bytes:
+    value = 0
+    for i, flag in enumerate(flags):
+        if flag:
+            value |= 1 << i
+    return value.to_bytes((len(flags) + 7) // 8, "little")
+
+
+def _bits(data: bytes, n: int) -> List[bool]:
+    value = int.from_bytes(data, "little")
+    return [bool(value >> i & 1) for i in range(n)]
+
+
+def _pack_answer(answer: Answer) -> Optional[Tuple[bool, int]]:
+    """(is_list, uint16 value), or None when the answer cannot be packed exactly"""
+    if isinstance(answer, list):
+        if len(set(answer)) != len(answer):
+            return None
+        mask = 0
+        for index in answer:
+            if not isinstance(index, int) or not 0 <= index < MASK_BITS:
+                return None
+            mask |= 1 << index
+        return True, mask
+    if isinstance(answer, int) and not isinstance(answer, bool) and 0 <= answer <= MAX_INDEX:
+        return False, answer
+    return None
+
+
+def encode_attempt(
+    question_ids: List[str],
+    answers: Dict[str, Answer],
+    correct: Dict[str, bool]
+) -> Optional[bytes]:
+    """Encode answers and per-question correctness, or None if they do not fit"""
+    n = len(question_ids)
+    if n > MAX_QUESTIONS:
+        return None
+
+    answered_flags = []
+    multi_flags = []
+    values = []
+    for question_id in question_ids:
+        answer = answers.get(question_id)
+        if answer is None:
+            answered_flags.append(False)
+            multi_flags.append(False)
+            values.append(0)
+            continue
+        packed = _pack_answer(answer)
+        if packed is None:
+            return None
+        answered_flags.append(True)
+        multi_flags.append(packed[0])
+        values.append(packed[1])
+
+    correct_flags = [bool(correct.get(question_id)) for question_id in question_ids]
+    return b"".join((
+        HEADER.pack(VERSION, n),
+        _bitmap(answered_flags),
+        _bitmap(correct_flags),
+        _bitmap(multi_flags),
+        struct.pack(f"<{n}H", *values),
+    ))
+
+
+def _split(blob: bytes) -> Tuple[int, bytes, bytes, bytes, bytes]:
+    version, n = HEADER.unpack_from(blob)
+    if version != VERSION:
+        raise ValueError(f"Unsupported attempt encoding version {version}")
+    size = (n + 7) // 8
+    offset = HEADER.size
+    answered = blob[offset:offset + size]
+    correct = blob[offset + size:offset + 2 * size]
+    multi = blob[offset + 2 * size:offset + 3 * size]
+    values = blob[offset + 3 * size:offset + 3 * size + 2 * n]
+    return n, answered, correct, multi, values
+
+
+def decode_outcomes(blob: bytes) -> Tuple[List[bool], List[bool]]:
+    """Per-position (answered, correct) flags"""
+    n, answered, correct, _, _ = _split(blob)
+    return _bits(answered, n), _bits(correct, n)
+
+
+def decode_attempt(
+    blob: bytes,
+    question_ids: List[str],
+    answer_keys: Dict[str, Answer]
+) -> Tuple[Dict[str, Answer], List[Dict[str, Any]]]:
+    """Rebuild the JSON ``answers`` and ``detailed_results`` of an attempt"""
+    n, answered, correct, multi, values = _split(blob)
+    answered_flags = _bits(answered, n)
+    correct_flags = _bits(correct, n)
+    multi_flags = _bits(multi, n)
+    packed = struct.unpack(f"<{n}H", values)
+
+    answers: Dict[str, Answer] = {}
+    detailed_results = []
+    for i, question_id in enumerate(question_ids[:n]):
+        if not answered_flags[i]:
+            continue
+        if multi_flags[i]:
+            answer: Answer = [bit for bit in range(MASK_BITS) if packed[i] >> bit & 1]
+        else:
+            answer = packed[i]
+        answers[question_id] = answer
+        detailed_results.append({
+            "question_id": question_id,
+            "correct": correct_flags[i],
+            "user_answer": answer,
+            "correct_answer": answer_keys.get(question_id),
+        })
+    return answers, detailed_results
+
+
+def count_outcomes(blobs: List[bytes]) -> Tuple[Any, Any]:
+    """Answered and correct counts per position over blobs sharing one question order"""
+    import numpy as np
+
+    n = HEADER.unpack_from(blobs[0])[1]
+    size = (n + 7) // 8
+    start = HEADER.size
+    # Answered and correct bitmaps are adjacent, so slice both at once
+    matrix = np.frombuffer(
+        b"".join(blob[start:start + 2 * size] for blob in blobs), dtype=np.uint8
+    ).reshape(len(blobs), 2 * size)
+    answered = np.unpackbits(matrix[:, :size], axis=1, bitorder="little")[:, :n]
+    correct = np.unpackbits(matrix[:, size:], axis=1, bitorder="little")[:, :n]
+    return answered.sum(axis=0, dtype=np.int64), correct.sum(axis=0, dtype=np.int64)
+
+
+def order_digest(question_ids: List[str]) -> str:
+    return hashlib.sha256("\n".join(question_ids).encode()).hexdigest()
+
+
+def get_question_order_id(db: Session, quiz_set_id: str, question_ids: List[str]) -> int:
+    """Id of the shared QuestionOrder row for this question list, creating it if needed"""
+    digest = order_digest(question_ids)
+    key = (str(db.get_bind().url), digest)
+    order_id = _order_ids.get(key)
+    if order_id is not None:
+        return order_id
+
+    order_id = db.query(QuestionOrder.id).filter(QuestionOrder.digest == digest).scalar()
+    if order_id is None:
+        # Committed on its own so a unique conflict cannot abort the caller's transaction
+        with Session(bind=db.get_bind()) as order_db:
+            order = QuestionOrder(quiz_set_id=quiz_set_id, digest=digest, question_ids=",".join(question_ids))
+            order_db.add(order)
+            try:
+                order_db.commit()
+                order_id = order.id
+            except IntegrityError:
+                # Another worker inserted the same order first
+                order_db.rollback()
+                order_id = order_db.query(QuestionOrder.id).filter(QuestionOrder.digest == digest).scalar()
+
+    if len(_order_ids) >= _ORDER_CACHE_SIZE:
+        _order_ids.clear()
+    _order_ids[key] = order_id
+    return order_id
+
+
+def load_question_orders(db: Session, order_ids: Iterable[int]) -> Dict[int, List[str]]:
+    order_ids = {order_id for order_id in order_ids if order_id is not None}
+    if not order_ids:
+        return {}
+    rows = db.query(QuestionOrder.id, QuestionOrder.question_ids).filter(QuestionOrder.id.in_(order_ids)).all()
+    return {row.id: row.question_ids.split(",") if row.question_ids else [] for row in rows}
+
+
+def attempt_outcomes(attempt: QuizAttempt, orders: Dict[int, List[str]]) -> List[Tuple[str, bool]]:
+    """(question_id, correct) for each answered question, in either storage format"""
+    if attempt.results_blob is None:
+        return [
+            (result.get("question_id"), bool(result.get("correct")))
+            for result in attempt.detailed_results or []
+        ]
+    question_ids = orders.get(attempt.question_order_id, [])
+    answered, correct = decode_outcomes(attempt.results_blob)
+    return [
+        (question_id, correct[i])
+        for i, question_id in enumerate(question_ids)
+        if answered[i]
+    ]
@@ -0,0 +1,217 @@
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.database.sharding import session_factories
+from app.models.database import QuizAttempt, AttemptRollup, QuestionRollup, JobWatermark
+from app.services.attempt_codec import attempt_outcomes, load_question_orders
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_JOB_NAME = "attempt_compaction"
+
+
+@dataclass
+class CompactionResult:
+    days_compacted: int = 0
+    attempts_archived: int = 0
+    archive_files: List[str] = field(default_factory=list)
+
+
+class AttemptCompactionService:
+    """Rolls attempts older than ``ATTEMPT_HOT_DAYS`` into per-day aggregates.
+
+    Each day is handled in one transaction: its raw rows are written to a
+    gzip JSON-lines archive file, added to ``attempt_rollups`` and
+    ``question_rollups``, and deleted from ``quiz_attempts``. Readers combine
+    the rollups with the remaining raw rows, which never overlap.
+    """
+
+    def __init__(self, db: Session, archive_dir: Optional[str] = None, chunk_size: int = 1000):
+        self.db = db
+        self.archive_dir = archive_dir or settings.ATTEMPT_ARCHIVE_DIR
+        self.chunk_size = chunk_size
+
+    def compact(self, hot_days: Optional[int] = None) -> CompactionResult:
+        hot_days = settings.ATTEMPT_HOT_DAYS if hot_days is None else hot_days
+        cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=hot_days), time.min)
+
+        result = CompactionResult()
+        while True:
+            oldest = (
+                self.db.query(func.min(QuizAttempt.completed_at))
+                .filter(QuizAttempt.completed_at < cutoff)
+                .scalar()
+            )
+            if oldest is None:
+                break
+            archived, path = self.compact_day(oldest.date())
+            if archived:
+                result.days_compacted += 1
+                result.attempts_archived += archived
+                result.archive_files.append(path)
+        return result
+
+    def compact_day(self, day: date) -> Tuple[int, str]:
+        start = datetime.combine(day, time.min)
+        end = start + timedelta(days=1)
+        in_day = (QuizAttempt.completed_at >= start, QuizAttempt.completed_at < end)
+
+        attempt_totals: Dict[Tuple[str, str], List[float]] = {}
+        question_totals: Dict[Tuple[str, str], List[int]] = {}
+        path = self._archive_path(day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        archived = 0
+        try:
+            # Row lock serialises concurrent runs from several workers (Postgres)
+            watermark = self.db.get(JobWatermark, COMPACTION_JOB_NAME, with_for_update=True)
+            if not watermark:
+                watermark = JobWatermark(name=COMPACTION_JOB_NAME)
+                self.db.add(watermark)
+                self.db.flush()
+            with gzip.open(path, "wt", encoding="utf-8") as archive:
+                last_id = ""
+                while True:
+                    attempts = (
+                        self.db.query(QuizAttempt)
+                        .filter(*in_day, QuizAttempt.id > last_id)
+                        .order_by(QuizAttempt.id)
+                        .limit(self.chunk_size)
+                        .all()
+                    )
+                    if not attempts:
+                        break
+                    last_id = attempts[-1].id
+                    orders = load_question_orders(self.db, (attempt.question_order_id for attempt in attempts))
+                    for attempt in attempts:
+                        archive.write(json.dumps(self._archive_record(attempt, orders)) + "\n")
+                        totals = attempt_totals.setdefault((attempt.quiz_set_id, attempt.user_id), [0, 0, 0.0, 0])
+                        totals[0] += 1
+                        totals[1] += 1 if attempt.completed_at else 0
+                        totals[2] += attempt.score or 0.0
+                        totals[3] += attempt.time_spent or 0
+                        for question_id, correct in attempt_outcomes(attempt, orders):
+                            counts = question_totals.setdefault((attempt.quiz_set_id, question_id), [0, 0])
+                            counts[0] += 1
+                            counts[1] += 1 if correct else 0
+                    archived += len(attempts)
+                    self.db.expunge_all()
+
+            if not archived:
+                # Another worker compacted this day while we waited for the lock
+                self.db.rollback()
+                os.remove(path)
+                return 0, ""
+
+            self._add_rollups(day, attempt_totals, question_totals)
+            self.db.query(QuizAttempt).filter(*in_day).delete(synchronize_session=False)
+            # Days are compacted oldest first, so the end of this one is the watermark
+            self.db.get(JobWatermark, COMPACTION_JOB_NAME).watermark = end
+            self.db.commit()
+        except BaseException:
+            self.db.rollback()
+            # Nothing was removed from quiz_attempts; drop the partial archive
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+
+        logger.info("Compacted %s attempts from %s into %s", archived, day, path)
+        return archived, path
+
+    def _add_rollups(
+        self,
+        day: date,
+        attempt_totals: Dict[Tuple[str, str], List[float]],
+        question_totals: Dict[Tuple[str, str], List[int]]
+    ) -> None:
+        # Merge with rows from an earlier run for the same day, if any
+        existing_attempts = {
+            (row.quiz_set_id, row.user_id): row
+            for row in self.db.query(AttemptRollup).filter(AttemptRollup.day == day)
+        }
+        for (quiz_set_id, user_id), (attempts, completed, score_sum, time_spent_sum) in attempt_totals.items():
+            row = existing_attempts.get((quiz_set_id, user_id))
+            if row is None:
+                row = AttemptRollup(
+                    day=day, quiz_set_id=quiz_set_id, user_id=user_id,
+                    attempts=0, completed=0, score_sum=0.0, time_spent_sum=0
+                )
+                self.db.add(row)
+            row.attempts += attempts
+            row.completed += completed
+            row.score_sum += score_sum
+            row.time_spent_sum += time_spent_sum
+
+        existing_questions = {
+            row.question_id: row
+            for row in self.db.query(QuestionRollup).filter(QuestionRollup.day == day)
+        }
+        for (quiz_set_id, question_id), (answered, correct) in question_totals.items():
+            row = existing_questions.get(question_id)
+            if row is None:
+                row = QuestionRollup(day=day, quiz_set_id=quiz_set_id, question_id=question_id, answered=0, correct=0)
+                self.db.add(row)
+                existing_questions[question_id] = row
+            row.answered += answered
+            row.correct += correct
+
+    def _archive_path(self, day: date) -> str:
+        # A run id keeps a re-run from overwriting an earlier archive of the same day
+        name = f"attempts-{day.isoformat()}-{uuid.uuid4().hex[:8]}.jsonl.gz"
+        return os.path.join(self.archive_dir, f"{day.year:04d}", f"{day.month:02d}", name)
+
+    @staticmethod
+    def _archive_record(attempt: QuizAttempt, orders: Dict[int, List[str]]) -> dict:
+        return {
+            "id": attempt.id,
+            "user_id": attempt.user_id,
+            "quiz_set_id": attempt.quiz_set_id,
+            "answers": attempt.answers,
+            "score": attempt.score,
+            "correct_answers": attempt.correct_answers,
+            "total_questions": attempt.total_questions,
+            "time_spent": attempt.time_spent,
+            "detailed_results": attempt.detailed_results,
+            "question_ids": orders.get(attempt.question_order_id),
+            "results_blob": base64.b64encode(attempt.results_blob).decode() if attempt.results_blob else None,
+            "completed_at": attempt.completed_at.isoformat() if attempt.completed_at else None,
+        }
+
+
+def run_attempt_compaction(hot_days: Optional[int] = None) -> CompactionResult:
+    """Run one compaction pass on every shard, with their own database sessions"""
+    result = CompactionResult()
+    for factory in session_factories():
+        with factory() as db:
+            shard = AttemptCompactionService(db).compact(hot_days=hot_days)
+        result.days_compacted += shard.days_compacted
+        result.attempts_archived += shard.attempts_archived
+        result.archive_files.extend(shard.archive_files)
+    return result
+
+
+async def attempt_compaction_loop(interval_seconds: int) -> None:
+    """Periodically compact old attempts until cancelled"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await run_in_threadpool(run_attempt_compaction)
+            if result.days_compacted:
+                logger.info(
+                    "Attempt compaction: %s days, %s attempts archived",
+                    result.days_compacted, result.attempts_archived
+                )
+        except Exception:
+            logger.exception("Attempt compaction failed")
@@ -0,0 +1,96 @@
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Container, Dict, FrozenSet, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import Question as DBQuestion
+
+# Logit difficulty assumed for questions that have no computed rating yet
+DIFFICULTY_PRIORS = {
+    "easy": -1.0,
+    "medium": 0.0,
+    "hard": 1.0,
+}
+
+
+@dataclass
+class DifficultyIndex:
+    """Questions of one quiz set sorted by difficulty"""
+    difficulties: List[float]
+    question_ids: List[str]
+    id_set: FrozenSet[str] = frozenset()
+    built_at: float = field(default_factory=time.monotonic)
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+    def closest(self, target: float, exclude: Container[str] = ()) -> Optional[str]:
+        """Return the question closest to ``target`` that is not excluded"""
+        right = bisect_left(self.difficulties, target)
+        left = right - 1
+        size = len(self.difficulties)
+
+        while left >= 0 or right < size:
+            if right >= size or (
+                left >= 0 and target - self.difficulties[left] <= self.difficulties[right] - target
+            ):
+                candidate = self.question_ids[left]
+                left -= 1
+            else:
+                candidate = self.question_ids[right]
+                right += 1
+            if candidate not in exclude:
+                return candidate
+        return None
+
+
+_indexes: Dict[str, DifficultyIndex] = {}
+_lock = threading.Lock()
+
+
+def question_difficulty(rating: Optional[float], label: Optional[str]) -> float:
+    if rating is not None:
+        return rating
+    return DIFFICULTY_PRIORS.get(label or "medium", 0.0)
+
+
+def build_difficulty_index(db: Session, quiz_set_id: str) -> DifficultyIndex:
+    rows = (
+        db.query(DBQuestion.id, DBQuestion.difficulty_rating, DBQuestion.difficulty)
+        .filter(DBQuestion.quiz_set_id == quiz_set_id)
+        .all()
+    )
+    entries = sorted(
+        (question_difficulty(row.difficulty_rating, row.difficulty), row.id)
+        for row in rows
+    )
+    return DifficultyIndex(
+        difficulties=[difficulty for difficulty, _ in entries],
+        question_ids=[question_id for _, question_id in entries],
+        id_set=frozenset(row.id for row in rows)
+    )
+
+
+def get_difficulty_index(db: Session, quiz_set_id: str) -> DifficultyIndex:
+    """Return the cached index for a quiz set, rebuilding it when stale"""
+    index = _indexes.get(quiz_set_id)
+    if index is not None and time.monotonic() - index.built_at < settings.ADAPTIVE_INDEX_TTL_SECONDS:
+        return index
+
+    index = build_difficulty_index(db, quiz_set_id)
+    with _lock:
+        _indexes[quiz_set_id] = index
+    return index
+
+
+def invalidate_difficulty_index(quiz_set_id: Optional[str] = None) -> None:
+    """Drop the cached index for a quiz set, or all of them"""
+    with _lock:
+        if quiz_set_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(quiz_set_id, None)
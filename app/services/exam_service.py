@@ -0,0 +1,134 @@
+import random
+from bisect import bisect_right
+from typing import Dict, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.database import Question as DBQuestion
+from app.models.schemas import ExamBlueprint, GeneratedExam
+from app.services.quiz_service import QuizService
+from app.services.stratum_pool import get_stratum_pool
+
+# Bucket for categories/difficulties not named in a blueprint's quotas
+OTHER = "__other__"
+
+
+class ExamGenerationError(ValueError):
+    pass
+
+
+class ExamService:
+    """Generates seeded exams that follow a category/difficulty blueprint"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def select_question_ids(self, quiz_set_id: str, blueprint: ExamBlueprint, seed: int) -> List[str]:
+        """Sample question ids per stratum from the cached pool"""
+        pool = get_stratum_pool(self.db, quiz_set_id)
+        if pool.size < blueprint.total_questions:
+            raise ExamGenerationError(
+                f"Quiz set has {pool.size} questions, {blueprint.total_questions} requested"
+            )
+
+        category_weights = self._bucket_weights(blueprint.category_quotas)
+        difficulty_weights = self._bucket_weights(
+            {level.value: share for level, share in blueprint.difficulty_quotas.items()}
+        )
+
+        # Lay the strata out in one index space, contiguous per joint
+        # (category, difficulty) bucket, so sampling never copies id lists.
+        segments: List[Tuple[Tuple[str, str], List[str]]] = []
+        for (category, difficulty), ids in pool.strata.items():
+            key = (
+                self._bucket(category, category_weights),
+                self._bucket(difficulty, difficulty_weights),
+            )
+            if key[0] in category_weights and key[1] in difficulty_weights:
+                segments.append((key, ids))
+        segments.sort(key=lambda segment: (segment[0], segment[1][0]))
+
+        offsets: List[int] = []
+        ranges: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        size = 0
+        for key, ids in segments:
+            offsets.append(size)
+            low, _ = ranges.get(key, (size, size))
+            size += len(ids)
+            ranges[key] = (low, size)
+
+        weights = {
+            key: category_weights[key[0]] * difficulty_weights[key[1]]
+            for key in ranges
+        }
+        targets = self._allocate(weights, blueprint.total_questions)
+
+        rng = random.Random(seed)
+        chosen: List[int] = []
+        for key in sorted(ranges):
+            low, high = ranges[key]
+            chosen.extend(rng.sample(range(low, high), min(targets.get(key, 0), high - low)))
+
+        # Strata smaller than their quota are topped up from the rest of the blueprint
+        shortfall = blueprint.total_questions - len(chosen)
+        if shortfall > size - len(chosen):
+            raise ExamGenerationError("Not enough questions match the blueprint")
+        if shortfall:
+            taken = set(chosen)
+            candidates = rng.sample(range(size), min(size, shortfall + len(taken)))
+            chosen.extend([index for index in candidates if index not in taken][:shortfall])
+
+        rng.shuffle(chosen)
+        selected = []
+        for index in chosen:
+            segment = bisect_right(offsets, index) - 1
+            selected.append(segments[segment][1][index - offsets[segment]])
+        return selected
+
+    def generate_exam(self, quiz_set_id: str, blueprint: ExamBlueprint) -> GeneratedExam:
+        seed = blueprint.seed if blueprint.seed is not None else random.SystemRandom().randrange(2 ** 31)
+        question_ids = self.select_question_ids(quiz_set_id, blueprint, seed)
+
+        questions = {
+            question.id: question
+            for question in self.db.query(DBQuestion).filter(DBQuestion.id.in_(question_ids)).all()
+        }
+        quiz_service = QuizService(self.db)
+        return GeneratedExam(
+            quiz_set_id=quiz_set_id,
+            seed=seed,
+            questions=[
+                quiz_service._convert_question(questions[question_id])
+                for question_id in question_ids
+                if question_id in questions
+            ]
+        )
+
+    @staticmethod
+    def _bucket_weights(quotas: Dict[str, float]) -> Dict[str, float]:
+        if not quotas:
+            return {OTHER: 1.0}
+        total = sum(quotas.values())
+        if total > 1.0 + 1e-9:
+            raise ExamGenerationError("Quotas must not add up to more than 1")
+        weights = {key: share for key, share in quotas.items() if share > 0}
+        if total < 1.0 - 1e-9:
+            weights[OTHER] = 1.0 - total
+        return weights
+
+    @staticmethod
+    def _bucket(value: str, weights: Dict[str, float]) -> str:
+        return value if value in weights and value != OTHER else OTHER
+
+    @staticmethod
+    def _allocate(weights: Dict[Tuple[str, str], float], total: int) -> Dict[Tuple[str, str], int]:
+        """Largest-remainder apportionment of ``total`` over the bucket weights"""
+        weight_sum = sum(weights.values())
+        if weight_sum <= 0:
+            return {}
+        exact = {key: total * weight / weight_sum for key, weight in weights.items()}
+        targets = {key: int(share) for key, share in exact.items()}
+        remainder = total - sum(targets.values())
+        for key in sorted(exact, key=lambda k: (targets[k] - exact[k], k))[:remainder]:
+            targets[key] += 1
+        return targets
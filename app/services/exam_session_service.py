@@ -0,0 +1,295 @@
+import random
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import ExamSession as DBExamSession, Question as DBQuestion, generate_uuid
+from app.models.schemas import (
+    ExamBlueprint, ExamSession, ExamSessionCreate,
+    Question, QuizResults, QuizSubmission, DetailedResult
+)
+from app.services.attempt_codec import get_question_order_id
+from app.services.exam_service import ExamService
+from app.services.quiz_service import QuizService
+from app.services.stratum_pool import get_stratum_pool
+
+Answer = Union[int, List[int]]
+
+
+@dataclass(frozen=True)
+class SessionRecord:
+    id: str
+    user_id: str
+    quiz_set_id: str
+    seed: int
+    question_ids: Tuple[str, ...]
+    shuffle_options: bool
+    status: str
+    score: Optional[float]
+    created_at: Optional[datetime]
+    submitted_at: Optional[datetime]
+
+    @classmethod
+    def from_db(cls, db_session: DBExamSession) -> "SessionRecord":
+        return cls(
+            id=db_session.id,
+            user_id=db_session.user_id,
+            quiz_set_id=db_session.quiz_set_id,
+            seed=db_session.seed,
+            question_ids=tuple(db_session.question_ids.split(",")) if db_session.question_ids else (),
+            shuffle_options=db_session.shuffle_options,
+            status=db_session.status,
+            score=db_session.score,
+            created_at=db_session.created_at,
+            submitted_at=db_session.submitted_at
+        )
+
+    def question_order(self) -> List[str]:
+        order = list(self.question_ids)
+        random.Random(self.seed).shuffle(order)
+        return order
+
+    def option_permutation(self, question_id: str, option_count: int) -> List[int]:
+        """Presented position -> original option index for one question"""
+        permutation = list(range(option_count))
+        if self.shuffle_options:
+            random.Random(f"{self.seed}:{question_id}").shuffle(permutation)
+        return permutation
+
+
+class SessionCache:
+    """Bounded LRU of session records shared by the requests of one worker"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._records: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[SessionRecord]:
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is not None:
+                self._records.move_to_end(session_id)
+            return record
+
+    def put(self, record: SessionRecord) -> None:
+        with self._lock:
+            self._records[record.id] = record
+            self._records.move_to_end(record.id)
+            while len(self._records) > self.max_size:
+                self._records.popitem(last=False)
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            self._records.pop(session_id, None)
+
+
+session_cache = SessionCache(settings.EXAM_SESSION_CACHE_SIZE)
+
+
+class ExamSessionError(ValueError):
+    pass
+
+
+def make_session_id(quiz_set_id: str) -> str:
+    """Session ids name their quiz set, so requests can be routed to its shard"""
+    return f"{generate_uuid()}~{quiz_set_id}"
+
+
+def session_quiz_set_id(session_id: str) -> Optional[str]:
+    """Quiz set named by a session id; None for ids created before they carried one"""
+    _, separator, quiz_set_id = session_id.partition("~")
+    return quiz_set_id if separator and quiz_set_id else None
+
+
+class ExamSessionService:
+    """Server-side exam sessions with seed-derived question and option order"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_session(self, user_id: str, quiz_set_id: str, session_data: ExamSessionCreate) -> ExamSession:
+        seed = session_data.seed if session_data.seed is not None else random.SystemRandom().randrange(2 ** 31)
+
+        blueprint = session_data.blueprint
+        if blueprint is None:
+            pool_size = get_stratum_pool(self.db, quiz_set_id).size
+            blueprint = ExamBlueprint.model_construct(
+                total_questions=min(session_data.limit or pool_size, pool_size),
+                category_quotas={},
+                difficulty_quotas={},
+                seed=seed
+            )
+        if blueprint.total_questions < 1:
+            raise ExamSessionError("Quiz set has no questions")
+        question_ids = sorted(ExamService(self.db).select_question_ids(quiz_set_id, blueprint, seed))
+
+        db_session = DBExamSession(
+            id=make_session_id(quiz_set_id),
+            user_id=user_id,
+            quiz_set_id=quiz_set_id,
+            seed=seed,
+            question_ids=",".join(question_ids),
+            shuffle_options=session_data.shuffle_options,
+            status="active"
+        )
+        self.db.add(db_session)
+        self.db.commit()
+        self.db.refresh(db_session)
+
+        record = SessionRecord.from_db(db_session)
+        session_cache.put(record)
+        return self._present(record)
+
+    def get_session(self, session_id: str, user_id: str) -> Optional[ExamSession]:
+        record = self._get_record(session_id, user_id)
+        if not record:
+            return None
+        return self._present(record)
+
+    def submit_session(
+        self,
+        session_id: str,
+        user_id: str,
+        submission: QuizSubmission
+    ) -> Optional[QuizResults]:
+        record = self._get_record(session_id, user_id)
+        if not record:
+            return None
+
+        questions = self._load_questions(record)
+        if settings.ATTEMPT_COMPACT_ENCODING:
+            # Created on its own connection, so do it before the claim below takes write locks
+            get_question_order_id(self.db, record.quiz_set_id, [question.id for question in questions])
+
+        # Claim the session in the grading transaction; a concurrent submit matches no row
+        submitted_at = datetime.utcnow()
+        claimed = self.db.execute(
+            update(DBExamSession)
+            .where(
+                DBExamSession.id == session_id,
+                DBExamSession.user_id == user_id,
+                DBExamSession.status == "active"
+            )
+            .values(status="submitted", submitted_at=submitted_at)
+            .returning(DBExamSession.id)
+        ).first()
+        if claimed is None:
+            self.db.rollback()
+            session_cache.discard(session_id)
+            raise ExamSessionError("Exam session already submitted")
+
+        # Map presented option positions back to the original option indices
+        answers: Dict[str, Answer] = {}
+        for question in questions:
+            answer = submission.answers.get(question.id)
+            if answer is None:
+                continue
+            permutation = record.option_permutation(question.id, len(question.options))
+            answers[question.id] = self._map_answer(answer, permutation)
+
+        results = QuizService(self.db).grade_submission(
+            user_id, record.quiz_set_id, questions, answers, submission.question_times
+        )
+        self.db.execute(
+            update(DBExamSession)
+            .where(DBExamSession.id == session_id)
+            .values(score=results.score)
+        )
+        self.db.commit()
+
+        session_cache.put(replace(
+            record,
+            status="submitted",
+            score=results.score,
+            submitted_at=submitted_at
+        ))
+
+        # Report results in the order and option layout the user saw
+        question_by_id = {question.id: question for question in questions}
+        position = {question_id: i for i, question_id in enumerate(record.question_order())}
+        detailed_results = []
+        for result in sorted(results.detailed_results, key=lambda r: position.get(r.question_id, 0)):
+            permutation = record.option_permutation(
+                result.question_id, len(question_by_id[result.question_id].options)
+            )
+            inverse = self._inverse(permutation)
+            detailed_results.append(DetailedResult(
+                question_id=result.question_id,
+                correct=result.correct,
+                user_answer=self._map_answer(result.user_answer, inverse),
+                correct_answer=self._map_answer(result.correct_answer, inverse)
+            ))
+        return results.model_copy(update={"detailed_results": detailed_results})
+
+    def _get_record(self, session_id: str, user_id: str) -> Optional[SessionRecord]:
+        record = session_cache.get(session_id)
+        if record is None:
+            db_session = self.db.get(DBExamSession, session_id)
+            if not db_session:
+                return None
+            record = SessionRecord.from_db(db_session)
+            session_cache.put(record)
+        if record.user_id != user_id:
+            return None
+        return record
+
+    def _load_questions(self, record: SessionRecord) -> List[DBQuestion]:
+        if not record.question_ids:
+            return []
+        return (
+            self.db.query(DBQuestion)
+            .filter(DBQuestion.id.in_(record.question_ids))
+            .all()
+        )
+
+    def _present(self, record: SessionRecord) -> ExamSession:
+        questions = {question.id: question for question in self._load_questions(record)}
+        quiz_service = QuizService(self.db)
+
+        presented: List[Question] = []
+        for question_id in record.question_order():
+            db_question = questions.get(question_id)
+            if not db_question:
+                continue
+            question = quiz_service._convert_question(db_question)
+            permutation = record.option_permutation(question_id, len(question.options))
+            presented.append(question.model_copy(update={
+                "options": [question.options[i] for i in permutation],
+                "correct_answer": self._map_answer(question.correct_answer, self._inverse(permutation))
+            }))
+
+        return ExamSession(
+            id=record.id,
+            user_id=record.user_id,
+            quiz_set_id=record.quiz_set_id,
+            seed=record.seed,
+            shuffle_options=record.shuffle_options,
+            status=record.status,
+            score=record.score,
+            created_at=record.created_at,
+            submitted_at=record.submitted_at,
+            questions=presented
+        )
+
+    @staticmethod
+    def _inverse(permutation: List[int]) -> List[int]:
+        inverse = [0] * len(permutation)
+        for position, original in enumerate(permutation):
+            inverse[original] = position
+        return inverse
+
+    @staticmethod
+    def _map_answer(answer: Answer, mapping: List[int]) -> Answer:
+        def map_index(index: int) -> int:
+            return mapping[index] if 0 <= index < len(mapping) else index
+
+        if isinstance(answer, list):
+            return sorted(map_index(index) for index in answer)
+        return map_index(answer)
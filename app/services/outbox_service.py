@@ -0,0 +1,229 @@
+"""Transactional outbox for side effects of a quiz submission.
+
+``enqueue`` adds an ``outbox_events`` row in the caller's transaction, so a
+side effect is recorded if and only if the attempt is. ``OutboxWorker``
+claims due rows in batches, runs their handlers with bounded concurrency
+and deletes each row in the same transaction as its handler's writes
+(a chunk of events shares one transaction; if it fails, they are retried
+one by one so a bad event cannot hold back the rest).
+Failed events are retried with exponential backoff until
+``OUTBOX_MAX_ATTEMPTS``; a worker that dies mid-batch leaves its events to
+be claimed again once their lease runs out, so delivery is at-least-once.
+With sharding each shard has its own outbox table, polled side by side.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.database.session import SessionLocal
+from app.database.sharding import session_factories
+from app.models.database import OutboxEvent, UserProgress as DBUserProgress
+from app.models.schemas import DetailedResult
+from app.services.review_service import ReviewService
+
+logger = logging.getLogger(__name__)
+
+OutboxHandler = Callable[[Session, dict], None]
+
+_handlers: Dict[str, OutboxHandler] = {}
+
+
+def outbox_handler(kind: str) -> Callable[[OutboxHandler], OutboxHandler]:
+    """Register the handler for an event kind; handlers write through the session but do not commit"""
+    def register(handler: OutboxHandler) -> OutboxHandler:
+        _handlers[kind] = handler
+        return handler
+    return register
+
+
+def enqueue(db: Session, kind: str, payload: dict) -> None:
+    """Record a side effect in the caller's transaction, or run it inline when the worker is disabled"""
+    if settings.OUTBOX_POLL_INTERVAL_SECONDS <= 0:
+        _handlers[kind](db, payload)
+        return
+    db.add(OutboxEvent(kind=kind, payload=payload, attempts=0, available_at=datetime.utcnow()))
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite returns naive datetimes, Postgres aware ones; both hold UTC
+    return value.replace(tzinfo=None) if value is not None and value.tzinfo else value
+
+
+@outbox_handler("progress_completed")
+def complete_progress(db: Session, payload: dict) -> None:
+    progress = (
+        db.query(DBUserProgress)
+        .filter(
+            DBUserProgress.user_id == payload["user_id"],
+            DBUserProgress.quiz_set_id == payload["quiz_set_id"]
+        )
+        .first()
+    )
+    if not progress:
+        return
+    completed_at = datetime.fromisoformat(payload["completed_at"])
+    # Events may be handled out of order; keep the latest attempt's result
+    if progress.completed_at is None or _naive_utc(progress.completed_at) <= completed_at:
+        progress.completed_at = completed_at
+        progress.score = payload["score"]
+
+
+@outbox_handler("review_results")
+def schedule_reviews(db: Session, payload: dict) -> None:
+    results = [
+        DetailedResult(question_id=question_id, correct=correct, user_answer=0, correct_answer=0)
+        for question_id, correct in payload["results"]
+    ]
+    ReviewService(db).record_results(
+        payload["user_id"], payload["quiz_set_id"], results,
+        now=datetime.fromisoformat(payload["completed_at"])
+    )
+
+
+class OutboxWorker:
+    """In-process consumer of the outbox table"""
+
+    def __init__(self):
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def notify(self) -> None:
+        """Wake the worker after a commit instead of waiting for the next poll; safe from any thread"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def claim(self, limit: int, factory: sessionmaker = SessionLocal) -> List[Tuple[int, str, dict]]:
+        """Lease up to ``limit`` due events in one shard's outbox to this worker"""
+        db = factory()
+        try:
+            now = datetime.utcnow()
+            events = (
+                db.query(OutboxEvent)
+                .filter(OutboxEvent.failed_at.is_(None), OutboxEvent.available_at <= now)
+                .order_by(OutboxEvent.available_at, OutboxEvent.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            lease_until = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+            claimed = []
+            for event in events:
+                event.available_at = lease_until
+                claimed.append((event.id, event.kind, event.payload))
+            db.commit()
+            return claimed
+        finally:
+            db.close()
+
+    def process_batch(self, events: List[Tuple[int, str, dict]], factory: sessionmaker = SessionLocal) -> None:
+        """Run several events in one transaction, falling back to one at a time if any fails"""
+        if len(events) > 1:
+            db = factory()
+            try:
+                for _, kind, payload in events:
+                    _handlers[kind](db, payload)
+                ids = [event_id for event_id, _, _ in events]
+                deleted = db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids))).rowcount
+                if deleted == len(ids):
+                    db.commit()
+                    self.processed += len(ids)
+                    return
+                db.rollback()
+            except Exception:
+                db.rollback()
+            finally:
+                db.close()
+        for event in events:
+            self.process(*event, factory=factory)
+
+    def process(self, event_id: int, kind: str, payload: dict, factory: sessionmaker = SessionLocal) -> bool:
+        """Run one event's handler and remove the event in a single transaction"""
+        db = factory()
+        try:
+            _handlers[kind](db, payload)
+            # Zero rows means another worker finished it after our lease expired
+            if db.execute(delete(OutboxEvent).where(OutboxEvent.id == event_id)).rowcount == 0:
+                db.rollback()
+                return False
+            db.commit()
+            self.processed += 1
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.warning("Outbox event %s (%s) failed: %r", event_id, kind, e)
+            self._record_failure(db, event_id, e)
+            return False
+        finally:
+            db.close()
+
+    def _record_failure(self, db: Session, event_id: int, error: Exception) -> None:
+        event = db.get(OutboxEvent, event_id)
+        if event is None:
+            return
+        event.attempts += 1
+        event.last_error = repr(error)[:2000]
+        if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            event.failed_at = datetime.utcnow()
+            self.failed += 1
+            logger.error("Outbox event %s (%s) failed %s times; giving up", event_id, event.kind, event.attempts)
+        else:
+            delay = settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (event.attempts - 1)
+            event.available_at = datetime.utcnow() + timedelta(seconds=delay)
+            self.retried += 1
+        db.commit()
+
+    def stats(self) -> dict:
+        return {"processed": self.processed, "retried": self.retried, "failed": self.failed}
+
+    async def run(self, poll_interval: float) -> None:
+        """Claim and process events until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(settings.OUTBOX_CONCURRENCY)
+
+        factories = session_factories()
+
+        async def handle(chunk: List[Tuple[int, str, dict]], factory: sessionmaker) -> None:
+            async with semaphore:
+                await run_in_threadpool(self.process_batch, chunk, factory)
+
+        try:
+            while True:
+                self._wakeup.clear()
+                try:
+                    batches = await asyncio.gather(*(
+                        run_in_threadpool(self.claim, settings.OUTBOX_BATCH_SIZE, factory) for factory in factories
+                    ))
+                    # One transaction per chunk, one chunk per concurrent slot
+                    chunks = []
+                    for factory, events in zip(factories, batches):
+                        size = max(1, -(-len(events) // settings.OUTBOX_CONCURRENCY))
+                        chunks.extend((events[start:start + size], factory) for start in range(0, len(events), size))
+                    await asyncio.gather(*(handle(chunk, factory) for chunk, factory in chunks))
+                except Exception:
+                    logger.exception("Outbox processing failed")
+                    batches = []
+                if any(len(events) == settings.OUTBOX_BATCH_SIZE for events in batches):
+                    # A full batch suggests a backlog; claim again right away
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), poll_interval)
+                    # Gather the submits that land right after this one into the same batch
+                    await asyncio.sleep(settings.OUTBOX_BATCH_DELAY_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._loop = None
+            self._wakeup = None
+
+
+outbox_worker = OutboxWorker()
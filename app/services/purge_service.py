@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+
+from sqlalchemy import delete, insert, inspect, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.database.change_tracking import reserve_change_seqs
+from app.database.sharding import session_factories
+from app.models.database import (
+    QuizSet as DBQuizSet, Question as DBQuestion, UserProgress, QuizAttempt, AttemptRollup,
+    QuestionRollup, QuestionTiming, QuestionOrder, UserAbility, AdaptiveAnswer, ReviewState, ExamSession, Tombstone
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows that belong to a quiz set, in an order that satisfies foreign keys:
+# review states reference questions, attempts reference question orders.
+DEPENDENT_MODELS = (
+    ReviewState, UserAbility, AdaptiveAnswer, ExamSession, UserProgress, QuizAttempt,
+    AttemptRollup, QuestionRollup, QuestionTiming, QuestionOrder,
+)
+
+
+@dataclass
+class PurgeResult:
+    quiz_sets: int = 0
+    rows_deleted: int = 0
+
+
+class QuizSetPurgeService:
+    """Deletes soft-deleted quiz sets and everything that references them.
+
+    Each chunk is one ``DELETE ... WHERE pk IN (SELECT pk ... LIMIT n)``
+    committed on its own, so no transaction holds locks for long and no
+    rows are loaded into the session. Deleted questions get tombstones for
+    the delta-sync feed. Safe to run concurrently and to resume.
+    """
+
+    def __init__(self, db: Session, chunk_size: Optional[int] = None):
+        self.db = db
+        self.chunk_size = chunk_size or settings.QUIZ_SET_PURGE_CHUNK_SIZE
+
+    def purge_deleted(self) -> PurgeResult:
+        quiz_set_ids = [
+            quiz_set_id for (quiz_set_id,) in
+            self.db.query(DBQuizSet.id).filter(DBQuizSet.deleted_at.isnot(None)).order_by(DBQuizSet.deleted_at)
+        ]
+        self.db.commit()
+        result = PurgeResult()
+        for quiz_set_id in quiz_set_ids:
+            result.rows_deleted += self.purge(quiz_set_id)
+            result.quiz_sets += 1
+        return result
+
+    def purge(self, quiz_set_id: str) -> int:
+        """Delete a soft-deleted quiz set and its rows; returns the number of rows deleted"""
+        deleted = 0
+        for model in DEPENDENT_MODELS:
+            deleted += self._delete_chunks(model, quiz_set_id)
+        deleted += self._delete_questions(quiz_set_id)
+        deleted += self.db.execute(
+            delete(DBQuizSet)
+            .where(DBQuizSet.id == quiz_set_id, DBQuizSet.deleted_at.isnot(None))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.db.commit()
+        logger.info("Purged quiz set %s (%s rows)", quiz_set_id, deleted)
+        return deleted
+
+    def _delete_chunks(self, model, quiz_set_id: str) -> int:
+        primary_key = inspect(model).primary_key[0]
+        chunk = select(primary_key).where(model.quiz_set_id == quiz_set_id).limit(self.chunk_size)
+        total = 0
+        while True:
+            count = self.db.execute(
+                delete(model).where(primary_key.in_(chunk)).execution_options(synchronize_session=False)
+            ).rowcount
+            self.db.commit()
+            total += count
+            if count < self.chunk_size:
+                return total
+
+    def _delete_questions(self, quiz_set_id: str) -> int:
+        chunk = select(DBQuestion.id).where(DBQuestion.quiz_set_id == quiz_set_id).limit(self.chunk_size)
+        total = 0
+        while True:
+            # RETURNING hands each id to exactly one purger, so tombstones are not duplicated
+            question_ids: List[str] = list(self.db.execute(
+                delete(DBQuestion)
+                .where(DBQuestion.id.in_(chunk))
+                .returning(DBQuestion.id)
+                .execution_options(synchronize_session=False)
+            ).scalars())
+            if question_ids:
+                seq = reserve_change_seqs(self.db, len(question_ids))
+                self.db.execute(insert(Tombstone), [
+                    {"entity": "question", "entity_id": question_id, "quiz_set_id": quiz_set_id, "change_seq": seq + i}
+                    for i, question_id in enumerate(question_ids)
+                ])
+            self.db.commit()
+            total += len(question_ids)
+            if len(question_ids) < self.chunk_size:
+                return total
+
+
+def run_quiz_set_purge() -> PurgeResult:
+    """Purge all soft-deleted quiz sets on every shard, with their own database sessions"""
+    result = PurgeResult()
+    for factory in session_factories():
+        with factory() as db:
+            shard = QuizSetPurgeService(db).purge_deleted()
+        result.quiz_sets += shard.quiz_sets
+        result.rows_deleted += shard.rows_deleted
+    return result
+
+
+async def quiz_set_purge_loop(interval_seconds: int) -> None:
+    """Periodically purge soft-deleted quiz sets until cancelled"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await run_in_threadpool(run_quiz_set_purge)
+            if result.quiz_sets:
+                logger.info("Quiz set purge: %s sets, %s rows", result.quiz_sets, result.rows_deleted)
+        except Exception:
+            logger.exception("Quiz set purge failed")
@@ -1,47 +1,175 @@
-from typing import List, Optional, Dict, Union
+from typing import List, Optional, Dict, Tuple, Union
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import delete, func, desc, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from app.models.database import QuizSet as DBQuizSet, Question as DBQuestion, UserProgress as DBUserProgress, QuizAttempt
+from app.models.database import generate_uuid
+from app.models.database import Tombstone as DBTombstone, AttemptRollup, QuestionRollup, QuestionTiming, ReviewState
 from app.models.schemas import (
     QuizSetCreate, QuizSetUpdate, QuizSet,
     QuestionCreate, QuestionUpdate, Question,
     UserProgressCreate, UserProgressUpdate, UserProgress,
     QuizSubmission, QuizResults, DetailedResult,
-    QuizAnalytics, QuestionStats, UserStats, DifficultyLevel
+    QuizAnalytics, QuestionStats, UserStats, DifficultyLevel,
+    ChangeFeed, Tombstone, ProgressSyncRecord, ProgressSyncResult, ProgressSyncStatus
 )
-from datetime import datetime
+from app.core.cache import CacheBackend, FillGenerations, build_cache
+from app.core.config import settings
+from app.core.invalidation import InvalidationEvent, invalidation_bus
+from app.core.singleflight import SingleFlight
+from app.database.change_tracking import reserve_change_seqs
+from app.database.sharding import fan_out, session_factories
+from app.services.difficulty_index import invalidate_difficulty_index
+from app.services.stratum_pool import invalidate_stratum_pool
+from app.services.outbox_service import enqueue, outbox_worker
+from app.services.purge_service import QuizSetPurgeService
+from app.services.attempt_codec import (
+    attempt_outcomes, encode_attempt, get_question_order_id, load_question_orders
+)
+from app.services.timing_service import load_timing_sketches, timing_recorder
+from datetime import datetime, timezone
+import logging
 import random
 
+logger = logging.getLogger(__name__)
+
+
+# INSERT ... ON CONFLICT constructs per dialect, for multi-row upserts
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Quiz sets and question lists, invalidated by QuizService's write methods
+quiz_cache = build_cache()
+
+# Fill generations per quiz set id, plus "quiz_sets" for the list pages
+quiz_cache_generations = FillGenerations()
+
+# Coalesces concurrent identical reads that miss quiz_cache
+quiz_reads = SingleFlight()
+
+
+def apply_invalidation(event: InvalidationEvent, cache: Optional[CacheBackend] = None) -> None:
+    """Evict cached reads affected by a write.
+
+    ``quiz_set`` events cover quiz set metadata; ``questions`` events cover a
+    quiz set's question bank, which also changes its question count.
+    """
+    cache = cache if cache is not None else quiz_cache
+    if event.entity in ("quiz_set", "questions"):
+        # Before the deletes, so fills that raced the write are refused
+        quiz_cache_generations.bump(event.entity_id, "quiz_sets")
+    if event.entity == "quiz_set":
+        cache.delete(f"quiz_set:{event.entity_id}")
+        cache.delete_prefix("quiz_sets:")
+    elif event.entity == "questions":
+        cache.delete(f"quiz_set:{event.entity_id}")
+        cache.delete_prefix("quiz_sets:")
+        cache.delete_prefix(f"questions:{event.entity_id}:")
+        cache.delete_prefix(f"question:{event.entity_id}:")
+        invalidate_difficulty_index(event.entity_id)
+        invalidate_stratum_pool(event.entity_id)
+
+
+invalidation_bus.subscribe(apply_invalidation)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # Stored datetimes are naive UTC, like datetime.utcnow()
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+
+# Rows keyed by a question that go with it; attempts, rollups and adaptive
+# answers keep their history
+QUESTION_DEPENDENT_MODELS = (ReviewState, QuestionTiming)
+
+
+def _live_quiz_set(quiz_set_id: str):
+    """Condition that the quiz set exists and is not soft-deleted, for single-statement writes"""
+    return (
+        select(DBQuizSet.id)
+        .where(DBQuizSet.id == quiz_set_id, DBQuizSet.deleted_at.is_(None))
+        .exists()
+    )
+
+
+def grade_answer(user_answer: Union[int, List[int]], correct_answer: Union[int, List[int]]) -> bool:
+    """Check a single answer against a question's answer key"""
+    if isinstance(correct_answer, list):
+        # Multiple choice
+        user_answer_list = user_answer if isinstance(user_answer, list) else [user_answer]
+        return (
+            len(user_answer_list) == len(correct_answer) and
+            all(ans in correct_answer for ans in user_answer_list)
+        )
+    # Single choice
+    return user_answer == correct_answer
+
 
 class QuizService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache: Optional[CacheBackend] = None):
         self.db = db
+        self.cache = cache if cache is not None else quiz_cache
 
     def get_quiz_sets(self, skip: int = 0, limit: int = 100) -> List[QuizSet]:
-        quiz_sets = (
-            self.db.query(DBQuizSet)
-            .filter(DBQuizSet.is_active == True)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
-        return [self._convert_quiz_set(qs) for qs in quiz_sets]
+        key = f"quiz_sets:{skip}:{limit}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            return list(cached)
+        generation = quiz_cache_generations.current("quiz_sets")
+        
+        # Each shard returns its first skip + limit sets; the merged page is cut from those
+        shards = len(session_factories())
+        offset, fetch = (skip, limit) if shards == 1 else (0, skip + limit)
+        pages = fan_out(lambda db: [
+            self._convert_quiz_set(qs) for qs in
+            db.query(DBQuizSet)
+            .filter(DBQuizSet.is_active == True, DBQuizSet.deleted_at.is_(None))
+            .order_by(DBQuizSet.created_at, DBQuizSet.id)
+            .offset(offset)
+            .limit(fetch)
+        ], self.db)
+        result = pages[0]
+        if shards > 1:
+            result = sorted(
+                (quiz_set for page in pages for quiz_set in page),
+                key=lambda quiz_set: (quiz_set.created_at, quiz_set.id)
+            )[skip:skip + limit]
+        quiz_cache_generations.set_if_current(self.cache, "quiz_sets", generation, {key: result})
+        return list(result)
 
     def get_quiz_set(self, quiz_set_id: str) -> Optional[QuizSet]:
-        quiz_set = self.db.query(DBQuizSet).filter(DBQuizSet.id == quiz_set_id).first()
+        key = f"quiz_set:{quiz_set_id}"
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        generation = quiz_cache_generations.current(quiz_set_id)
+        
+        quiz_set = (
+            self.db.query(DBQuizSet)
+            .filter(DBQuizSet.id == quiz_set_id, DBQuizSet.deleted_at.is_(None))
+            .first()
+        )
         if not quiz_set:
             return None
-        return self._convert_quiz_set(quiz_set)
+        result = self._convert_quiz_set(quiz_set)
+        quiz_cache_generations.set_if_current(self.cache, quiz_set_id, generation, {key: result})
+        return result
 
-    def create_quiz_set(self, quiz_set_data: QuizSetCreate) -> QuizSet:
-        db_quiz_set = DBQuizSet(**quiz_set_data.model_dump())
+    def create_quiz_set(self, quiz_set_data: QuizSetCreate, quiz_set_id: Optional[str] = None) -> QuizSet:
+        """Create a quiz set; with sharding, pass the id the session's shard was chosen for"""
+        db_quiz_set = DBQuizSet(id=quiz_set_id or generate_uuid(), **quiz_set_data.model_dump())
         self.db.add(db_quiz_set)
         self.db.commit()
         self.db.refresh(db_quiz_set)
+        self._invalidate_read_cache(db_quiz_set.id)
         return self._convert_quiz_set(db_quiz_set)
 
     def update_quiz_set(self, quiz_set_id: str, quiz_set_data: QuizSetUpdate) -> Optional[QuizSet]:
-        db_quiz_set = self.db.query(DBQuizSet).filter(DBQuizSet.id == quiz_set_id).first()
+        db_quiz_set = (
+            self.db.query(DBQuizSet)
+            .filter(DBQuizSet.id == quiz_set_id, DBQuizSet.deleted_at.is_(None))
+            .first()
+        )
         if not db_quiz_set:
             return None
         
@@ -51,15 +179,29 @@ class QuizService:
         
         self.db.commit()
         self.db.refresh(db_quiz_set)
+        self._invalidate_read_cache(quiz_set_id)
         return self._convert_quiz_set(db_quiz_set)
 
     def delete_quiz_set(self, quiz_set_id: str) -> bool:
-        db_quiz_set = self.db.query(DBQuizSet).filter(DBQuizSet.id == quiz_set_id).first()
-        if not db_quiz_set:
+        """Soft-delete a quiz set; its questions, attempts and other rows are purged in chunks later"""
+        seq = reserve_change_seqs(self.db, 1)
+        deleted = self.db.execute(
+            update(DBQuizSet)
+            .where(DBQuizSet.id == quiz_set_id, DBQuizSet.deleted_at.is_(None))
+            .values(deleted_at=datetime.utcnow(), change_seq=seq)
+            .returning(DBQuizSet.id)
+        ).first()
+        if deleted is None:
+            self.db.rollback()
             return False
         
-        self.db.delete(db_quiz_set)
+        # Sync clients drop the set and its questions as soon as they see this
+        self.db.add(DBTombstone(entity="quiz_set", entity_id=quiz_set_id, quiz_set_id=quiz_set_id, change_seq=seq))
         self.db.commit()
+        self._invalidate_question_caches(quiz_set_id)
+        
+        if settings.QUIZ_SET_PURGE_INTERVAL_SECONDS <= 0:
+            QuizSetPurgeService(self.db).purge(quiz_set_id)
         return True
 
     def get_questions(
@@ -69,23 +211,65 @@ class QuizService:
         limit: Optional[int] = None,
         difficulty: Optional[DifficultyLevel] = None
     ) -> List[Question]:
-        query = self.db.query(DBQuestion).filter(DBQuestion.quiz_set_id == quiz_set_id)
-        
-        if difficulty:
-            query = query.filter(DBQuestion.difficulty == difficulty.value)
-        
-        questions = query.all()
+        key = f"questions:{quiz_set_id}:{difficulty.value if difficulty else 'all'}"
+        questions = self.cache.get(key)
+        if questions is None:
+            generation = quiz_cache_generations.current(quiz_set_id)
+            query = self.db.query(DBQuestion).filter(DBQuestion.quiz_set_id == quiz_set_id)
+            
+            if difficulty:
+                query = query.filter(DBQuestion.difficulty == difficulty.value)
+            
+            questions = [self._convert_question(q) for q in query.all()]
+            quiz_cache_generations.set_if_current(self.cache, quiz_set_id, generation, {key: questions})
         
+        # The cached list is shared, so shuffle and limit a copy
         if shuffle:
-            random.shuffle(questions)
+            questions = random.sample(questions, len(questions))
+        else:
+            questions = list(questions)
         
         if limit:
             questions = questions[:limit]
         
-        return [self._convert_question(q) for q in questions]
+        return questions
+
+    def get_questions_by_ids(self, quiz_set_id: str, question_ids: List[str]) -> Tuple[List[Question], List[str]]:
+        """Questions in request order, from cache then one IN query, plus the ids not found"""
+        question_ids = list(dict.fromkeys(question_ids))
+        keys = {question_id: f"question:{quiz_set_id}:{question_id}" for question_id in question_ids}
+        cached = self.cache.get_many(list(keys.values()))
+        found = {
+            question_id: cached[key]
+            for question_id, key in keys.items()
+            if key in cached
+        }
+        
+        misses = [question_id for question_id in question_ids if question_id not in found]
+        if misses:
+            generation = quiz_cache_generations.current(quiz_set_id)
+            db_questions = (
+                self.db.query(DBQuestion)
+                .filter(DBQuestion.quiz_set_id == quiz_set_id, DBQuestion.id.in_(misses))
+                .all()
+            )
+            loaded = {q.id: self._convert_question(q) for q in db_questions}
+            quiz_cache_generations.set_if_current(self.cache, quiz_set_id, generation, {
+                keys[question_id]: question for question_id, question in loaded.items()
+            })
+            found.update(loaded)
+        
+        questions = [found[question_id] for question_id in question_ids if question_id in found]
+        missing = [question_id for question_id in question_ids if question_id not in found]
+        return questions, missing
 
     def get_question(self, question_id: str) -> Optional[Question]:
-        question = self.db.query(DBQuestion).filter(DBQuestion.id == question_id).first()
+        question = (
+            self.db.query(DBQuestion)
+            .join(DBQuizSet, DBQuizSet.id == DBQuestion.quiz_set_id)
+            .filter(DBQuestion.id == question_id, DBQuizSet.deleted_at.is_(None))
+            .first()
+        )
         if not question:
             return None
         return self._convert_question(question)
@@ -96,28 +280,25 @@ class QuizService:
         reference_links = [link.model_dump() for link in question_data.reference_links]
         videos = [video.model_dump() for video in question_data.videos]
         
+        # One sequence for the question, one for its quiz set's new count
+        seq = reserve_change_seqs(self.db, 2)
         db_question = DBQuestion(
             **{k: v for k, v in question_dict.items() if k not in ['reference_links', 'videos']},
             reference_links=reference_links,
-            videos=videos
+            videos=videos,
+            change_seq=seq
         )
         
         self.db.add(db_question)
-        
-        # Update quiz set total questions
-        quiz_set = self.db.query(DBQuizSet).filter(DBQuizSet.id == question_data.quiz_set_id).first()
-        if quiz_set:
-            quiz_set.total_questions += 1
+        self._adjust_question_count(question_data.quiz_set_id, 1, seq + 1)
         
         self.db.commit()
         self.db.refresh(db_question)
+        self._invalidate_question_caches(db_question.quiz_set_id, db_question.id)
         return self._convert_question(db_question)
 
-    def update_question(self, question_id: str, question_data: QuestionUpdate) -> Optional[Question]:
-        db_question = self.db.query(DBQuestion).filter(DBQuestion.id == question_id).first()
-        if not db_question:
-            return None
-        
+    def update_question(self, quiz_set_id: str, question_id: str, question_data: QuestionUpdate) -> Optional[Question]:
+        """Update a question of the given quiz set in one UPDATE ... RETURNING"""
         update_data = question_data.model_dump(exclude_unset=True)
         
         # Handle reference_links and videos separately
@@ -126,31 +307,112 @@ class QuizService:
         if 'videos' in update_data:
             update_data['videos'] = [video.model_dump() for video in question_data.videos or []]
         
-        for field, value in update_data.items():
-            setattr(db_question, field, value)
-        
-        db_question.last_updated = datetime.utcnow()
+        update_data['last_updated'] = datetime.utcnow()
+        # Core statements bypass the change tracking hook, so reserve the sequence here
+        update_data['change_seq'] = reserve_change_seqs(self.db, 1)
+        
+        db_question = self.db.execute(
+            update(DBQuestion)
+            .where(DBQuestion.id == question_id, DBQuestion.quiz_set_id == quiz_set_id, _live_quiz_set(quiz_set_id))
+            .values(**update_data)
+            .returning(DBQuestion)
+        ).scalar_one_or_none()
+        if db_question is None:
+            self.db.rollback()
+            return None
         
+        # Convert before commit expires the returned row
+        question = self._convert_question(db_question)
         self.db.commit()
-        self.db.refresh(db_question)
-        return self._convert_question(db_question)
+        self._invalidate_question_caches(quiz_set_id, question_id)
+        return question
 
-    def delete_question(self, question_id: str) -> bool:
-        db_question = self.db.query(DBQuestion).filter(DBQuestion.id == question_id).first()
-        if not db_question:
+    def delete_question(self, quiz_set_id: str, question_id: str) -> bool:
+        """Delete a question of the given quiz set, its dependent rows and decrement its count in one transaction"""
+        # Dependents go first, so this works whether or not the foreign keys cascade;
+        # a rejected delete below rolls them back
+        for model in QUESTION_DEPENDENT_MODELS:
+            self.db.execute(
+                delete(model)
+                .where(model.question_id == question_id, model.quiz_set_id == quiz_set_id)
+                .execution_options(synchronize_session=False)
+            )
+        deleted = self.db.execute(
+            delete(DBQuestion)
+            .where(DBQuestion.id == question_id, DBQuestion.quiz_set_id == quiz_set_id, _live_quiz_set(quiz_set_id))
+            .returning(DBQuestion.id)
+        ).first()
+        if deleted is None:
+            self.db.rollback()
             return False
         
-        quiz_set_id = db_question.quiz_set_id
-        self.db.delete(db_question)
-        
-        # Update quiz set total questions
-        quiz_set = self.db.query(DBQuizSet).filter(DBQuizSet.id == quiz_set_id).first()
-        if quiz_set and quiz_set.total_questions > 0:
-            quiz_set.total_questions -= 1
+        seq = reserve_change_seqs(self.db, 2)
+        self.db.add(DBTombstone(entity="question", entity_id=question_id, quiz_set_id=quiz_set_id, change_seq=seq))
+        self._adjust_question_count(quiz_set_id, -1, seq + 1)
         
         self.db.commit()
+        self._invalidate_question_caches(quiz_set_id, question_id)
         return True
 
+    def _adjust_question_count(self, quiz_set_id: str, delta: int, change_seq: int) -> None:
+        """Atomic ``total_questions += delta``, so concurrent writers cannot lose an update"""
+        statement = (
+            update(DBQuizSet)
+            .where(DBQuizSet.id == quiz_set_id)
+            .values(total_questions=DBQuizSet.total_questions + delta, change_seq=change_seq)
+            .execution_options(synchronize_session=False)
+        )
+        if delta < 0:
+            statement = statement.where(DBQuizSet.total_questions >= -delta)
+        self.db.execute(statement)
+
+    def get_changes(self, since: int = 0, limit: int = 500, quiz_set_id: Optional[str] = None) -> ChangeFeed:
+        """Quiz sets, questions and tombstones with change_seq > since, in sequence order"""
+        # The sequence is global across shards, so per-shard changes merge by seq
+        changes = sorted(
+            (change for shard in fan_out(lambda db: self._changes_after(db, since, limit, quiz_set_id), self.db)
+             for change in shard),
+            key=lambda change: change[0]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        
+        feed = ChangeFeed(next_since=changes[-1][0] if changes else since, has_more=has_more)
+        for _, kind, item in changes:
+            if kind == "quiz_set":
+                feed.quiz_sets.append(item)
+            elif kind == "question":
+                feed.questions.append(item)
+            else:
+                feed.tombstones.append(item)
+        return feed
+
+    def _changes_after(
+        self, db: Session, since: int, limit: int, quiz_set_id: Optional[str]
+    ) -> List[Tuple[int, str, Union[QuizSet, Question, Tombstone]]]:
+        quiz_sets = db.query(DBQuizSet).filter(DBQuizSet.change_seq > since, DBQuizSet.deleted_at.is_(None))
+        questions = db.query(DBQuestion).filter(DBQuestion.change_seq > since)
+        tombstones = db.query(DBTombstone).filter(DBTombstone.change_seq > since)
+        if quiz_set_id:
+            quiz_sets = quiz_sets.filter(DBQuizSet.id == quiz_set_id)
+            questions = questions.filter(DBQuestion.quiz_set_id == quiz_set_id)
+            tombstones = tombstones.filter(DBTombstone.quiz_set_id == quiz_set_id)
+        
+        # limit + 1 from each source is enough to find the first limit overall
+        return (
+            [(qs.change_seq, "quiz_set", self._convert_quiz_set(qs))
+             for qs in quiz_sets.order_by(DBQuizSet.change_seq).limit(limit + 1)] +
+            [(q.change_seq, "question", self._convert_question(q))
+             for q in questions.order_by(DBQuestion.change_seq).limit(limit + 1)] +
+            [(t.change_seq, "tombstone", Tombstone(
+                entity=t.entity,
+                id=t.entity_id,
+                quiz_set_id=t.quiz_set_id,
+                change_seq=t.change_seq,
+                deleted_at=t.deleted_at
+            )) for t in tombstones.order_by(DBTombstone.change_seq).limit(limit + 1)]
+        )
+
     def save_progress(self, user_id: str, progress_data: UserProgressCreate) -> UserProgress:
         # Check if progress already exists
         existing_progress = (
@@ -172,11 +434,89 @@ class QuizService:
             # Create new progress
             db_progress = DBUserProgress(user_id=user_id, **progress_data.model_dump(exclude={'user_id'}))
             self.db.add(db_progress)
+        # An online save is newer than anything an offline client has queued so far
+        db_progress.client_updated_at = datetime.utcnow()
         
         self.db.commit()
         self.db.refresh(db_progress)
         return self._convert_user_progress(db_progress)
 
+    def sync_progress(self, user_id: str, records: List[ProgressSyncRecord]) -> List[ProgressSyncResult]:
+        """Apply offline progress records in one transaction; the latest ``client_updated_at`` wins.
+
+        All records go into a single multi-row ``INSERT ... ON CONFLICT DO
+        UPDATE`` whose ``WHERE`` skips rows the server has a newer write for,
+        so the cost is a few statements however many records there are.
+        """
+        now = datetime.utcnow()
+        # A client clock running ahead would otherwise win every later write
+        stamps = [min(_naive_utc(record.client_updated_at), now) for record in records]
+        known = {
+            quiz_set_id for (quiz_set_id,) in
+            self.db.query(DBQuizSet.id)
+            .filter(DBQuizSet.id.in_({record.quiz_set_id for record in records}), DBQuizSet.deleted_at.is_(None))
+        }
+        # Only the latest record per quiz set is written; earlier duplicates lose to it
+        latest: Dict[str, int] = {}
+        for i, record in enumerate(records):
+            if record.quiz_set_id in known:
+                best = latest.get(record.quiz_set_id)
+                if best is None or stamps[i] >= stamps[best]:
+                    latest[record.quiz_set_id] = i
+        
+        created: Dict[str, bool] = {}  # quiz sets written, and whether the row is new
+        if latest:
+            statement = UPSERT_INSERTS[self.db.get_bind().dialect.name](DBUserProgress).values([
+                {
+                    "id": generate_uuid(),
+                    "user_id": user_id,
+                    **records[i].model_dump(exclude={"user_id", "client_updated_at"}),
+                    "client_updated_at": stamps[i],
+                }
+                for i in latest.values()
+            ])
+            excluded = statement.excluded
+            statement = statement.on_conflict_do_update(
+                index_elements=[DBUserProgress.user_id, DBUserProgress.quiz_set_id],
+                set_={
+                    "current_question": excluded.current_question,
+                    "answers": excluded.answers,
+                    "score": excluded.score,
+                    "time_spent": excluded.time_spent,
+                    "client_updated_at": excluded.client_updated_at,
+                    "updated_at": func.now(),
+                },
+                where=or_(
+                    DBUserProgress.client_updated_at.is_(None),
+                    DBUserProgress.client_updated_at <= excluded.client_updated_at
+                )
+            ).returning(DBUserProgress.quiz_set_id, DBUserProgress.updated_at)
+            # Inserted rows have never been updated
+            created = {quiz_set_id: updated_at is None for quiz_set_id, updated_at in self.db.execute(statement)}
+        
+        winners = {quiz_set_id: stamps[latest[quiz_set_id]] for quiz_set_id in created}
+        stale = [quiz_set_id for quiz_set_id in latest if quiz_set_id not in created]
+        if stale:
+            winners.update(
+                self.db.query(DBUserProgress.quiz_set_id, DBUserProgress.client_updated_at)
+                .filter(DBUserProgress.user_id == user_id, DBUserProgress.quiz_set_id.in_(stale))
+            )
+        self.db.commit()
+        
+        results = []
+        for i, record in enumerate(records):
+            quiz_set_id = record.quiz_set_id
+            if quiz_set_id not in known:
+                status = ProgressSyncStatus.NOT_FOUND
+            elif latest[quiz_set_id] == i and quiz_set_id in created:
+                status = ProgressSyncStatus.CREATED if created[quiz_set_id] else ProgressSyncStatus.UPDATED
+            else:
+                status = ProgressSyncStatus.STALE
+            results.append(ProgressSyncResult(
+                quiz_set_id=quiz_set_id, status=status, client_updated_at=winners.get(quiz_set_id)
+            ))
+        return results
+
     def get_progress(self, user_id: str, quiz_set_id: str) -> Optional[UserProgress]:
         progress = (
             self.db.query(DBUserProgress)
@@ -191,28 +531,42 @@ class QuizService:
         return self._convert_user_progress(progress)
 
     def submit_quiz(self, user_id: str, quiz_set_id: str, submission: QuizSubmission) -> QuizResults:
-        # Get questions
-        questions = self.db.query(DBQuestion).filter(DBQuestion.quiz_set_id == quiz_set_id).all()
-        
+        # Answer keys come from the database, never the read cache, so a write
+        # that has not reached this worker's cache yet cannot change a score
+        questions = (
+            self.db.query(DBQuestion.id, DBQuestion.correct_answer)
+            .filter(DBQuestion.quiz_set_id == quiz_set_id)
+            .all()
+        )
+        return self.grade_submission(
+            user_id, quiz_set_id, questions, submission.answers, submission.question_times
+        )
+
+    def grade_submission(
+        self,
+        user_id: str,
+        quiz_set_id: str,
+        questions: List[Union[DBQuestion, Question, Row]],
+        answers: Dict[str, Union[int, List[int]]],
+        question_times: Optional[Dict[str, float]] = None
+    ) -> QuizResults:
+        """Grade answers against the given questions and record the attempt"""
+        # Timings for questions outside this attempt are ignored
+        times = {
+            question.id: min(question_times[question.id], settings.TIMING_MAX_SECONDS)
+            for question in questions
+            if question_times and question.id in question_times
+        }
+        time_spent = round(sum(times.values()))
         detailed_results = []
         correct_answers = 0
         
         for question in questions:
-            user_answer = submission.answers.get(question.id)
+            user_answer = answers.get(question.id)
             correct_answer = question.correct_answer
             
             if user_answer is not None:
-                # Check if answer is correct
-                if isinstance(correct_answer, list):
-                    # Multiple choice
-                    user_answer_list = user_answer if isinstance(user_answer, list) else [user_answer]
-                    correct = (
-                        len(user_answer_list) == len(correct_answer) and
-                        all(ans in correct_answer for ans in user_answer_list)
-                    )
-                else:
-                    # Single choice
-                    correct = user_answer == correct_answer
+                correct = grade_answer(user_answer, correct_answer)
                 
                 if correct:
                     correct_answers += 1
@@ -230,47 +584,93 @@ class QuizService:
         attempt = QuizAttempt(
             user_id=user_id,
             quiz_set_id=quiz_set_id,
-            answers=submission.answers,
+            answers=answers,
             score=score,
             correct_answers=correct_answers,
             total_questions=len(questions),
-            time_spent=0,  # TODO: Get from frontend
+            time_spent=time_spent,
             detailed_results=[dr.model_dump() for dr in detailed_results]
         )
+        if settings.ATTEMPT_COMPACT_ENCODING:
+            self._encode_attempt(attempt, questions, answers, detailed_results)
         self.db.add(attempt)
         
-        # Update progress as completed
-        progress = (
-            self.db.query(DBUserProgress)
-            .filter(
-                DBUserProgress.user_id == user_id,
-                DBUserProgress.quiz_set_id == quiz_set_id
-            )
-            .first()
-        )
-        if progress:
-            progress.completed_at = datetime.utcnow()
-            progress.score = score
+        # Progress and review scheduling run after the response, from the outbox
+        completed_at = datetime.utcnow().isoformat()
+        enqueue(self.db, "progress_completed", {
+            "user_id": user_id, "quiz_set_id": quiz_set_id, "score": score, "completed_at": completed_at
+        })
+        if detailed_results:
+            enqueue(self.db, "review_results", {
+                "user_id": user_id,
+                "quiz_set_id": quiz_set_id,
+                "results": [[result.question_id, result.correct] for result in detailed_results],
+                "completed_at": completed_at
+            })
         
         self.db.commit()
+        outbox_worker.notify()
+        
+        if times:
+            timing_recorder.record(quiz_set_id, times)
+            if settings.TIMING_FLUSH_INTERVAL_SECONDS <= 0:
+                try:
+                    timing_recorder.flush(self.db)
+                except Exception:
+                    # The attempt is saved; the timings stay buffered for the next submit
+                    logger.exception("Timing sketch flush failed")
         
         return QuizResults(
             score=score,
             correct_answers=correct_answers,
             total_questions=len(questions),
-            time_spent=0,  # TODO: Calculate from progress
+            time_spent=time_spent,
             detailed_results=detailed_results
         )
 
+    def _encode_attempt(
+        self,
+        attempt: QuizAttempt,
+        questions: List[Union[DBQuestion, Question, Row]],
+        answers: Dict[str, Union[int, List[int]]],
+        detailed_results: List[DetailedResult]
+    ) -> None:
+        """Store the attempt's results in the compact format when they fit"""
+        question_ids = [question.id for question in questions]
+        blob = encode_attempt(
+            question_ids,
+            answers,
+            {result.question_id: result.correct for result in detailed_results}
+        )
+        if blob is None:
+            return
+        attempt.question_order_id = get_question_order_id(self.db, attempt.quiz_set_id, question_ids)
+        attempt.results_blob = blob
+        attempt.answers = {}
+        attempt.detailed_results = []
+
     def get_quiz_analytics(self, quiz_set_id: str) -> QuizAnalytics:
-        # Get all attempts for this quiz set
+        # Compacted history comes from the daily rollups, recent attempts from raw rows
+        rollup = (
+            self.db.query(
+                func.coalesce(func.sum(AttemptRollup.attempts), 0),
+                func.coalesce(func.sum(AttemptRollup.completed), 0),
+                func.coalesce(func.sum(AttemptRollup.score_sum), 0.0)
+            )
+            .filter(AttemptRollup.quiz_set_id == quiz_set_id)
+            .one()
+        )
         attempts = (
-            self.db.query(QuizAttempt)
+            self.db.query(
+                QuizAttempt.score, QuizAttempt.completed_at, QuizAttempt.detailed_results,
+                QuizAttempt.question_order_id, QuizAttempt.results_blob
+            )
             .filter(QuizAttempt.quiz_set_id == quiz_set_id)
             .all()
         )
         
-        if not attempts:
+        total_attempts = int(rollup[0]) + len(attempts)
+        if not total_attempts:
             return QuizAnalytics(
                 total_attempts=0,
                 average_score=0.0,
@@ -278,34 +678,49 @@ class QuizService:
                 question_stats=[]
             )
         
-        total_attempts = len(attempts)
-        average_score = sum(attempt.score for attempt in attempts) / total_attempts
+        average_score = (float(rollup[2]) + sum(attempt.score for attempt in attempts)) / total_attempts
         
         # Calculate completion rate (users who completed vs started)
-        completed_attempts = len([a for a in attempts if a.completed_at])
+        completed_attempts = int(rollup[1]) + len([a for a in attempts if a.completed_at])
         completion_rate = completed_attempts / total_attempts if total_attempts > 0 else 0
         
         # Question statistics
         questions = self.db.query(DBQuestion).filter(DBQuestion.quiz_set_id == quiz_set_id).all()
+        answered_counts: Dict[str, int] = {}
+        correct_counts: Dict[str, int] = {}
+        question_rollups = (
+            self.db.query(
+                QuestionRollup.question_id,
+                func.sum(QuestionRollup.answered),
+                func.sum(QuestionRollup.correct)
+            )
+            .filter(QuestionRollup.quiz_set_id == quiz_set_id)
+            .group_by(QuestionRollup.question_id)
+        )
+        for question_id, answered, correct in question_rollups:
+            answered_counts[question_id] = int(answered)
+            correct_counts[question_id] = int(correct)
+        orders = load_question_orders(self.db, (attempt.question_order_id for attempt in attempts))
+        for attempt in attempts:
+            for question_id, correct in attempt_outcomes(attempt, orders):
+                answered_counts[question_id] = answered_counts.get(question_id, 0) + 1
+                if correct:
+                    correct_counts[question_id] = correct_counts.get(question_id, 0) + 1
+        timings = load_timing_sketches(self.db, quiz_set_id)
         question_stats = []
         
         for question in questions:
-            correct_count = 0
-            total_answers = 0
-            
-            for attempt in attempts:
-                detailed_results = attempt.detailed_results
-                for result in detailed_results:
-                    if result.get('question_id') == question.id:
-                        total_answers += 1
-                        if result.get('correct'):
-                            correct_count += 1
+            correct_count = correct_counts.get(question.id, 0)
+            total_answers = answered_counts.get(question.id, 0)
             
             correct_rate = correct_count / total_answers if total_answers > 0 else 0
+            timing = timings.get(question.id)
             question_stats.append(QuestionStats(
                 question_id=question.id,
                 correct_rate=correct_rate,
-                avg_time_spent=60.0  # TODO: Calculate from actual data
+                avg_time_spent=timing.mean if timing and timing.count else 0.0,
+                p50_time_spent=timing.quantile(0.5) if timing else None,
+                p90_time_spent=timing.quantile(0.9) if timing else None
             ))
         
         return QuizAnalytics(
@@ -316,14 +731,14 @@ class QuizService:
         )
 
     def get_user_stats(self, user_id: str) -> UserStats:
-        # Get user attempts
-        attempts = (
-            self.db.query(QuizAttempt)
-            .filter(QuizAttempt.user_id == user_id)
-            .all()
-        )
-        
-        if not attempts:
+        # Per quiz set [attempts, score sum, time spent] and category; a quiz set's rows are all on one shard
+        totals: Dict[str, List[float]] = {}
+        categories: Dict[str, str] = {}
+        for shard_totals, shard_categories in fan_out(lambda db: self._user_totals(db, user_id), self.db):
+            totals.update(shard_totals)
+            categories.update(shard_categories)
+        
+        if not totals:
             return UserStats(
                 total_quizzes=0,
                 completed_quizzes=0,
@@ -333,25 +748,24 @@ class QuizService:
                 weak_categories=[]
             )
         
-        total_quizzes = len(set(attempt.quiz_set_id for attempt in attempts))
-        completed_quizzes = len(attempts)
-        average_score = sum(attempt.score for attempt in attempts) / completed_quizzes
-        total_time_spent = sum(attempt.time_spent for attempt in attempts)
+        total_quizzes = len(totals)
+        completed_quizzes = sum(int(entry[0]) for entry in totals.values())
+        average_score = sum(entry[1] for entry in totals.values()) / completed_quizzes
+        total_time_spent = sum(int(entry[2]) for entry in totals.values())
         
         # Calculate category performance
-        category_scores = {}
-        for attempt in attempts:
-            quiz_set = self.db.query(DBQuizSet).filter(DBQuizSet.id == attempt.quiz_set_id).first()
-            if quiz_set:
-                category = quiz_set.category
-                if category not in category_scores:
-                    category_scores[category] = []
-                category_scores[category].append(attempt.score)
+        category_scores: Dict[str, List[float]] = {}
+        for quiz_set_id, (count, score_sum, _) in totals.items():
+            category = categories.get(quiz_set_id)
+            if category:
+                entry = category_scores.setdefault(category, [0, 0.0])
+                entry[0] += count
+                entry[1] += score_sum
         
         # Calculate average per category
         category_averages = {
-            cat: sum(scores) / len(scores)
-            for cat, scores in category_scores.items()
+            cat: score_sum / count
+            for cat, (count, score_sum) in category_scores.items()
         }
         
         # Sort by performance
@@ -369,6 +783,53 @@ class QuizService:
             weak_categories=weak_categories
         )
 
+    def _user_totals(self, db: Session, user_id: str) -> Tuple[Dict[str, List[float]], Dict[str, str]]:
+        """A user's per quiz set totals, from rollups plus raw attempts, and those sets' categories"""
+        totals: Dict[str, List[float]] = {}
+        rollups = (
+            db.query(
+                AttemptRollup.quiz_set_id,
+                func.sum(AttemptRollup.attempts),
+                func.sum(AttemptRollup.score_sum),
+                func.sum(AttemptRollup.time_spent_sum)
+            )
+            .filter(AttemptRollup.user_id == user_id)
+            .group_by(AttemptRollup.quiz_set_id)
+        )
+        for quiz_set_id, attempts, score_sum, time_spent_sum in rollups:
+            totals[quiz_set_id] = [int(attempts), float(score_sum), int(time_spent_sum)]
+        attempts = (
+            db.query(QuizAttempt.quiz_set_id, QuizAttempt.score, QuizAttempt.time_spent)
+            .filter(QuizAttempt.user_id == user_id)
+        )
+        for quiz_set_id, score, time_spent in attempts:
+            entry = totals.setdefault(quiz_set_id, [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += score
+            entry[2] += time_spent
+        categories = dict(
+            db.query(DBQuizSet.id, DBQuizSet.category)
+            .filter(DBQuizSet.id.in_(list(totals)))
+            .all()
+        ) if totals else {}
+        return totals, categories
+
+    def _invalidate_read_cache(self, quiz_set_id: str) -> None:
+        self._publish_invalidations([("quiz_set", quiz_set_id)])
+
+    def _invalidate_question_caches(self, quiz_set_id: str, question_id: Optional[str] = None) -> None:
+        keys = [("questions", quiz_set_id)]
+        if question_id:
+            keys.append(("question", question_id))
+        self._publish_invalidations(keys)
+
+    def _publish_invalidations(self, keys: List[Tuple[str, str]]) -> None:
+        # Evicts quiz_cache in every worker, including this one
+        invalidation_bus.publish_many(keys)
+        if self.cache is not quiz_cache:
+            for entity, entity_id in keys:
+                apply_invalidation(InvalidationEvent(entity, entity_id, 0), self.cache)
+
     def _convert_quiz_set(self, db_quiz_set: DBQuizSet) -> QuizSet:
         return QuizSet(
             id=db_quiz_set.id,
@@ -380,7 +841,8 @@ class QuizService:
             total_questions=db_quiz_set.total_questions,
             is_active=db_quiz_set.is_active,
             created_at=db_quiz_set.created_at,
-            updated_at=db_quiz_set.updated_at
+            updated_at=db_quiz_set.updated_at,
+            change_seq=db_quiz_set.change_seq
         )
 
     def _convert_question(self, db_question: DBQuestion) -> Question:
@@ -417,7 +879,8 @@ class QuizService:
             last_updated=db_question.last_updated,
             review_status=db_question.review_status,
             difficulty_rating=db_question.difficulty_rating,
-            success_rate=db_question.success_rate
+            success_rate=db_question.success_rate,
+            change_seq=db_question.change_seq
         )
 
     def _convert_user_progress(self, db_progress: DBUserProgress) -> UserProgress:
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.database.sharding import session_factories
+from app.models.database import Question as DBQuestion, QuizAttempt, QuestionRollup, JobWatermark
+from app.services.attempt_codec import count_outcomes, load_question_orders
+from app.services.difficulty_index import invalidate_difficulty_index
+
+logger = logging.getLogger(__name__)
+
+RATING_JOB_NAME = "question_ratings"
+
+
+@dataclass
+class RecalculationResult:
+    attempts_processed: int
+    questions_updated: int
+    watermark: Optional[datetime]
+
+
+class RatingService:
+    """Incrementally recalculates ``success_rate`` and ``difficulty_rating``.
+
+    Attempts are streamed in chunks since the last watermark and per-question
+    answered/correct counts are aggregated with NumPy. The counts are kept on
+    the question rows, so each run only touches new attempts.
+    """
+
+    def __init__(self, db: Session, chunk_size: Optional[int] = None):
+        self.db = db
+        self.chunk_size = chunk_size or settings.RATING_RECALC_CHUNK_SIZE
+
+    def recalculate(self, full: bool = False) -> RecalculationResult:
+        watermark = self._get_watermark()
+        if full:
+            self.db.execute(update(DBQuestion).values(times_answered=0, times_correct=0))
+            watermark.watermark = None
+
+        # Only consider attempts old enough that no in-flight transaction can
+        # still commit one with an earlier timestamp.
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.RATING_RECALC_SETTLE_SECONDS)
+
+        query = (
+            self.db.query(QuizAttempt.detailed_results, QuizAttempt.question_order_id, QuizAttempt.results_blob)
+            .filter(QuizAttempt.completed_at <= cutoff)
+        )
+        if watermark.watermark is not None:
+            query = query.filter(QuizAttempt.completed_at > watermark.watermark)
+
+        answered: Dict[str, int] = {}
+        correct: Dict[str, int] = {}
+        attempts_processed = 0
+        if full:
+            # Compacted attempts only survive as daily rollups
+            rollups = (
+                self.db.query(
+                    QuestionRollup.question_id,
+                    func.sum(QuestionRollup.answered),
+                    func.sum(QuestionRollup.correct)
+                )
+                .group_by(QuestionRollup.question_id)
+            )
+            for question_id, rollup_answered, rollup_correct in rollups:
+                answered[question_id] = int(rollup_answered)
+                correct[question_id] = int(rollup_correct)
+
+        for chunk in self._chunks(query):
+            attempts_processed += len(chunk)
+            ids, counts, correct_counts = self._aggregate_chunk(chunk)
+            for question_id, count, correct_count in zip(ids, counts, correct_counts):
+                answered[question_id] = answered.get(question_id, 0) + int(count)
+                correct[question_id] = correct.get(question_id, 0) + int(correct_count)
+
+        questions_updated = self._apply_counts(answered, correct)
+
+        watermark.watermark = cutoff
+        self.db.commit()
+        if questions_updated:
+            invalidate_difficulty_index()
+
+        return RecalculationResult(
+            attempts_processed=attempts_processed,
+            questions_updated=questions_updated,
+            watermark=cutoff
+        )
+
+    def _get_watermark(self) -> JobWatermark:
+        # Row lock serialises concurrent runs from several workers (Postgres)
+        watermark = self.db.get(JobWatermark, RATING_JOB_NAME, with_for_update=True)
+        if not watermark:
+            watermark = JobWatermark(name=RATING_JOB_NAME)
+            self.db.add(watermark)
+        return watermark
+
+    def _chunks(self, query):
+        chunk = []
+        for row in query.yield_per(self.chunk_size):
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _aggregate_chunk(self, chunk: list) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        question_ids = []
+        counts = []
+        correct_counts = []
+
+        # Compact attempts: sum bitmaps per shared question order
+        blobs_by_order: Dict[int, List[bytes]] = {}
+        for row in chunk:
+            if row.results_blob is not None:
+                blobs_by_order.setdefault(row.question_order_id, []).append(row.results_blob)
+        orders = load_question_orders(self.db, blobs_by_order)
+        for order_id, blobs in blobs_by_order.items():
+            order = orders.get(order_id)
+            if not order:
+                continue
+            answered, correct = count_outcomes(blobs)
+            question_ids.extend(order[:len(answered)])
+            counts.append(answered[:len(order)])
+            correct_counts.append(correct[:len(order)])
+
+        # Legacy attempts stored as JSON
+        flags = []
+        for row in chunk:
+            if row.results_blob is None:
+                for result in row.detailed_results or []:
+                    question_ids.append(result.get('question_id'))
+                    flags.append(bool(result.get('correct')))
+        if flags:
+            counts.append(np.ones(len(flags), dtype=np.int64))
+            correct_counts.append(np.array(flags, dtype=np.int64))
+
+        if not question_ids:
+            empty = np.array([], dtype=np.int64)
+            return np.array([], dtype=object), empty, empty
+
+        ids, inverse = np.unique(np.array(question_ids, dtype=object), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(counts), minlength=len(ids))
+        hits = np.bincount(inverse, weights=np.concatenate(correct_counts), minlength=len(ids))
+        return ids, totals.astype(np.int64), hits.astype(np.int64)
+
+    def _apply_counts(self, answered: Dict[str, int], correct: Dict[str, int]) -> int:
+        if not answered:
+            return 0
+
+        question_ids = list(answered)
+        rows = []
+        for start in range(0, len(question_ids), self.chunk_size):
+            batch = question_ids[start:start + self.chunk_size]
+            rows.extend(
+                self.db.query(DBQuestion.id, DBQuestion.times_answered, DBQuestion.times_correct)
+                .filter(DBQuestion.id.in_(batch))
+                .all()
+            )
+        if not rows:
+            return 0
+
+        ids = [row.id for row in rows]
+        totals = np.array([(row.times_answered or 0) + answered[row.id] for row in rows], dtype=np.int64)
+        hits = np.array([(row.times_correct or 0) + correct[row.id] for row in rows], dtype=np.int64)
+
+        success_rates = hits / np.maximum(totals, 1)
+        # Rasch (1PL) item difficulty in logits against an average learner,
+        # with add-one smoothing so unanimous results stay finite.
+        difficulties = np.log((totals - hits + 1) / (hits + 1))
+
+        self.db.execute(
+            update(DBQuestion),
+            [
+                {
+                    "id": question_id,
+                    "times_answered": int(total),
+                    "times_correct": int(hit),
+                    "success_rate": float(rate),
+                    "difficulty_rating": float(difficulty),
+                }
+                for question_id, total, hit, rate, difficulty in zip(
+                    ids, totals, hits, success_rates, difficulties
+                )
+            ]
+        )
+        return len(ids)
+
+
+def run_rating_recalculation(full: bool = False, chunk_size: Optional[int] = None) -> RecalculationResult:
+    """Run one recalculation pass on every shard, with their own database sessions"""
+    result = RecalculationResult(attempts_processed=0, questions_updated=0, watermark=None)
+    for factory in session_factories():
+        with factory() as db:
+            shard = RatingService(db, chunk_size=chunk_size).recalculate(full=full)
+        result.attempts_processed += shard.attempts_processed
+        result.questions_updated += shard.questions_updated
+        # Each shard keeps its own watermark; report the one furthest behind
+        if shard.watermark is not None and (result.watermark is None or shard.watermark < result.watermark):
+            result.watermark = shard.watermark
+    return result
+
+
+async def rating_recalculation_loop(interval_seconds: int) -> None:
+    """Periodically recalculate question ratings until cancelled"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await run_in_threadpool(run_rating_recalculation)
+            logger.info(
+                "Question ratings recalculated: %s attempts, %s questions",
+                result.attempts_processed, result.questions_updated
+            )
+        except Exception:
+            logger.exception("Question rating recalculation failed")
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import Question as DBQuestion, ReviewState
+from app.models.schemas import DetailedResult, ReviewItem
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes, Postgres aware ones; both hold UTC
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+class ReviewService:
+    """SM-2 style review scheduling for questions a user got wrong"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_results(
+        self,
+        user_id: str,
+        quiz_set_id: str,
+        results: List[DetailedResult],
+        now: Optional[datetime] = None
+    ) -> None:
+        """Update review states from graded answers given at ``now``; the caller commits.
+
+        States last reviewed at or after ``now`` are left alone, so an outbox
+        event delivered twice (or an older attempt handled late) changes nothing.
+        """
+        if not results:
+            return
+
+        question_ids = [result.question_id for result in results]
+        states = {
+            state.question_id: state
+            for state in (
+                self.db.query(ReviewState)
+                .filter(
+                    ReviewState.user_id == user_id,
+                    ReviewState.question_id.in_(question_ids)
+                )
+                .all()
+            )
+        }
+
+        now = now or datetime.utcnow()
+        for result in results:
+            state = states.get(result.question_id)
+            if state is not None and state.last_reviewed_at is not None and _naive_utc(state.last_reviewed_at) >= now:
+                continue
+            if result.correct:
+                # Questions answered correctly are only tracked once missed
+                if state:
+                    self._schedule_success(state, now)
+                continue
+
+            if not state:
+                state = ReviewState(
+                    user_id=user_id,
+                    question_id=result.question_id,
+                    quiz_set_id=quiz_set_id,
+                    interval_days=0.0,
+                    ease=settings.REVIEW_DEFAULT_EASE,
+                    repetitions=0,
+                    lapses=0
+                )
+                self.db.add(state)
+                states[result.question_id] = state
+            self._schedule_lapse(state, now)
+
+    def get_due_reviews(self, user_id: str, limit: int = 20) -> List[ReviewItem]:
+        from app.services.quiz_service import QuizService
+
+        states = (
+            self.db.query(ReviewState)
+            .filter(
+                ReviewState.user_id == user_id,
+                ReviewState.due_at <= datetime.utcnow()
+            )
+            .order_by(ReviewState.due_at)
+            .limit(limit)
+            .all()
+        )
+        if not states:
+            return []
+
+        questions = {
+            question.id: question
+            for question in (
+                self.db.query(DBQuestion)
+                .filter(DBQuestion.id.in_([state.question_id for state in states]))
+                .all()
+            )
+        }
+
+        quiz_service = QuizService(self.db)
+        return [
+            ReviewItem(
+                question=quiz_service._convert_question(questions[state.question_id]),
+                due_at=state.due_at,
+                interval_days=state.interval_days,
+                ease=state.ease,
+                repetitions=state.repetitions,
+                lapses=state.lapses
+            )
+            for state in states
+            if state.question_id in questions
+        ]
+
+    def _schedule_success(self, state: ReviewState, now: datetime) -> None:
+        state.repetitions = (state.repetitions or 0) + 1
+        if state.repetitions == 1:
+            state.interval_days = 1.0
+        elif state.repetitions == 2:
+            state.interval_days = 6.0
+        else:
+            state.interval_days = round(state.interval_days * state.ease, 2)
+        state.ease = round(state.ease + 0.1, 2)
+        state.due_at = now + timedelta(days=state.interval_days)
+        state.last_reviewed_at = now
+
+    def _schedule_lapse(self, state: ReviewState, now: datetime) -> None:
+        # A miss makes the question due again immediately
+        state.repetitions = 0
+        state.lapses = (state.lapses or 0) + 1
+        state.interval_days = 0.0
+        state.ease = max(settings.REVIEW_MIN_EASE, round(state.ease - 0.2, 2))
+        state.due_at = now
+        state.last_reviewed_at = now
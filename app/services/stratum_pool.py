@@ -0,0 +1,62 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.database import Question as DBQuestion
+
+# (category, difficulty); questions without a category use ""
+StratumKey = Tuple[str, str]
+
+
+@dataclass
+class StratumPool:
+    """Question ids of one quiz set grouped by category and difficulty"""
+    strata: Dict[StratumKey, List[str]]
+    built_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def size(self) -> int:
+        return sum(len(ids) for ids in self.strata.values())
+
+
+_pools: Dict[str, StratumPool] = {}
+_lock = threading.Lock()
+
+
+def build_stratum_pool(db: Session, quiz_set_id: str) -> StratumPool:
+    rows = (
+        db.query(DBQuestion.id, DBQuestion.category, DBQuestion.difficulty)
+        .filter(DBQuestion.quiz_set_id == quiz_set_id)
+        .all()
+    )
+    strata: Dict[StratumKey, List[str]] = {}
+    for row in rows:
+        strata.setdefault((row.category or "", row.difficulty or "medium"), []).append(row.id)
+    for ids in strata.values():
+        ids.sort()
+    return StratumPool(strata=strata)
+
+
+def get_stratum_pool(db: Session, quiz_set_id: str) -> StratumPool:
+    """Return the cached pool for a quiz set, rebuilding it when stale"""
+    pool = _pools.get(quiz_set_id)
+    if pool is not None and time.monotonic() - pool.built_at < settings.EXAM_POOL_TTL_SECONDS:
+        return pool
+
+    pool = build_stratum_pool(db, quiz_set_id)
+    with _lock:
+        _pools[quiz_set_id] = pool
+    return pool
+
+
+def invalidate_stratum_pool(quiz_set_id: Optional[str] = None) -> None:
+    """Drop the cached pool for a quiz set, or all of them"""
+    with _lock:
+        if quiz_set_id is None:
+            _pools.clear()
+        else:
+            _pools.pop(quiz_set_id, None)
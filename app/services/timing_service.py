@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.sketch import QuantileSketch
+from app.database.sharding import session_factories, shard_index
+from app.models.database import QuestionTiming
+
+logger = logging.getLogger(__name__)
+
+
+def new_sketch() -> QuantileSketch:
+    return QuantileSketch(settings.TIMING_SKETCH_ACCURACY)
+
+
+class TimingRecorder:
+    """Buffers per-question answer times and merges them into persisted sketches.
+
+    Submissions only touch the in-memory buffer; ``flush`` merges it into
+    ``question_timings`` with the rows locked, so concurrent workers add to
+    each other's counts instead of overwriting them. Raw timings are never
+    stored.
+    """
+
+    def __init__(self):
+        # question_id -> (quiz_set_id, sketch of timings not yet flushed)
+        self._pending: Dict[str, Tuple[str, QuantileSketch]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, quiz_set_id: str, times: Dict[str, float]) -> None:
+        with self._lock:
+            for question_id, seconds in times.items():
+                entry = self._pending.get(question_id)
+                if entry is None:
+                    entry = self._pending[question_id] = (quiz_set_id, new_sketch())
+                entry[1].add(seconds)
+
+    def pending(self, quiz_set_id: str) -> Dict[str, QuantileSketch]:
+        """Copies of the unflushed sketches for one quiz set"""
+        with self._lock:
+            copies = {}
+            for question_id, (entry_quiz_set_id, sketch) in self._pending.items():
+                if entry_quiz_set_id == quiz_set_id:
+                    copies[question_id] = new_sketch()
+                    copies[question_id].merge(sketch)
+            return copies
+
+    def flush(self, db: Session, quiz_sets: Optional[Callable[[str], bool]] = None) -> int:
+        """Merge buffered timings into the database; returns the number of questions written.
+
+        ``quiz_sets`` limits the flush to the quiz sets it accepts, e.g. one shard's.
+        """
+        with self._lock:
+            if quiz_sets is None:
+                pending, self._pending = self._pending, {}
+            else:
+                pending = {
+                    question_id: entry for question_id, entry in self._pending.items() if quiz_sets(entry[0])
+                }
+                for question_id in pending:
+                    del self._pending[question_id]
+        if not pending:
+            return 0
+
+        try:
+            # Locked in key order so concurrent flushes cannot deadlock
+            rows = {
+                row.question_id: row
+                for row in db.query(QuestionTiming)
+                .filter(QuestionTiming.question_id.in_(pending))
+                .order_by(QuestionTiming.question_id)
+                .with_for_update()
+            }
+            for question_id, (quiz_set_id, sketch) in pending.items():
+                row = rows.get(question_id)
+                if row is None:
+                    db.add(QuestionTiming(
+                        question_id=question_id,
+                        quiz_set_id=quiz_set_id,
+                        responses=sketch.count,
+                        sketch=sketch.to_bytes()
+                    ))
+                    continue
+                merged = QuantileSketch.from_bytes(row.sketch)
+                if merged.relative_accuracy != sketch.relative_accuracy:
+                    # TIMING_SKETCH_ACCURACY changed; buckets are incompatible, so start over
+                    logger.warning("Resetting timing sketch of question %s after accuracy change", question_id)
+                    merged = new_sketch()
+                merged.merge(sketch)
+                row.responses = merged.count
+                row.sketch = merged.to_bytes()
+            db.commit()
+        except BaseException:
+            db.rollback()
+            # Keep the timings for the next flush
+            with self._lock:
+                for question_id, (quiz_set_id, sketch) in pending.items():
+                    entry = self._pending.get(question_id)
+                    if entry is None:
+                        self._pending[question_id] = (quiz_set_id, sketch)
+                    else:
+                        entry[1].merge(sketch)
+            raise
+        return len(pending)
+
+
+timing_recorder = TimingRecorder()
+
+
+def load_timing_sketches(db: Session, quiz_set_id: str) -> Dict[str, QuantileSketch]:
+    """Persisted sketches for a quiz set's questions, plus this worker's unflushed timings"""
+    sketches = {
+        row.question_id: QuantileSketch.from_bytes(row.sketch)
+        for row in db.query(QuestionTiming.question_id, QuestionTiming.sketch)
+        .filter(QuestionTiming.quiz_set_id == quiz_set_id)
+    }
+    for question_id, sketch in timing_recorder.pending(quiz_set_id).items():
+        if question_id in sketches:
+            sketches[question_id].merge(sketch)
+        else:
+            sketches[question_id] = sketch
+    return sketches
+
+
+def run_timing_flush() -> int:
+    """Flush buffered timings to their shards, with their own database sessions"""
+    factories = session_factories()
+    if len(factories) == 1:
+        with factories[0]() as db:
+            return timing_recorder.flush(db)
+    written = 0
+    for shard, factory in enumerate(factories):
+        with factory() as db:
+            written += timing_recorder.flush(db, lambda quiz_set_id: shard_index(quiz_set_id) == shard)
+    return written
+
+
+async def timing_flush_loop(interval_seconds: float) -> None:
+    """Periodically flush buffered timings until cancelled"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_threadpool(run_timing_flush)
+        except Exception:
+            logger.exception("Timing sketch flush failed")
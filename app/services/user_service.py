@@ -0,0 +1,64 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.models.database import User as DBUser
+from app.core.invalidation import invalidation_bus
+from app.models.schemas import UserCreate, UserUpdate, User
+
+
+class UserService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_user(self, user_id: str) -> Optional[DBUser]:
+        return self.db.get(DBUser, user_id)
+
+    def get_user_by_email(self, email: str) -> Optional[DBUser]:
+        return self.db.query(DBUser).filter(DBUser.email == email.lower()).first()
+
+    def create_user(self, user_data: UserCreate, hashed_password: str) -> User:
+        """Create a user; the password must already be hashed by the caller"""
+        db_user = DBUser(
+            name=user_data.name,
+            email=user_data.email.lower(),
+            hashed_password=hashed_password,
+            role="user"
+        )
+        self.db.add(db_user)
+        self.db.commit()
+        self.db.refresh(db_user)
+        return self._convert_user(db_user)
+
+    def update_user(
+        self,
+        user_id: str,
+        user_data: UserUpdate,
+        hashed_password: Optional[str] = None
+    ) -> Optional[User]:
+        """Update a user; a new password must already be hashed by the caller"""
+        db_user = self.get_user(user_id)
+        if not db_user:
+            return None
+        
+        update_data = user_data.model_dump(exclude_unset=True, exclude={'password'})
+        if 'email' in update_data and update_data['email']:
+            update_data['email'] = update_data['email'].lower()
+        for field, value in update_data.items():
+            setattr(db_user, field, value)
+        if hashed_password:
+            db_user.hashed_password = hashed_password
+        
+        self.db.commit()
+        self.db.refresh(db_user)
+        # Every worker drops its cached principals for the user, this one at once
+        invalidation_bus.publish("user", user_id)
+        return self._convert_user(db_user)
+
+    def _convert_user(self, db_user: DBUser) -> User:
+        return User(
+            id=db_user.id,
+            name=db_user.name,
+            email=db_user.email,
+            role=db_user.role,
+            created_at=db_user.created_at,
+            updated_at=db_user.updated_at
+        )
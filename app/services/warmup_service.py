@@ -0,0 +1,117 @@
+import logging
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, desc
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database.sharding import fan_out, quiz_session
+from app.models.database import QuizSet as DBQuizSet, QuizAttempt
+from app.services.difficulty_index import get_difficulty_index
+from app.services.quiz_service import QuizService
+from app.services.stratum_pool import get_stratum_pool
+
+logger = logging.getLogger(__name__)
+
+# Each warmer loads one quiz set into an in-process cache
+Warmer = Callable[[Session, str], Any]
+
+
+def warm_quiz_reads(db: Session, quiz_set_id: str) -> None:
+    service = QuizService(db)
+    service.get_quiz_set(quiz_set_id)
+    service.get_questions(quiz_set_id)
+
+
+WARMERS: List[Warmer] = [
+    get_difficulty_index,
+    get_stratum_pool,
+    warm_quiz_reads,
+]
+
+
+@dataclass
+class WarmupState:
+    status: str = "pending"  # pending, running, complete, failed
+    total: int = 0
+    completed: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("complete", "failed")
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+warmup_state = WarmupState()
+
+
+def select_quiz_sets(db: Session) -> List[str]:
+    """Configured quiz sets, or the most attempted ones over the lookback window"""
+    if settings.WARMUP_QUIZ_SET_IDS:
+        return list(settings.WARMUP_QUIZ_SET_IDS)
+
+    since = datetime.utcnow() - timedelta(days=settings.WARMUP_LOOKBACK_DAYS)
+    rows = (
+        db.query(QuizAttempt.quiz_set_id, func.count(QuizAttempt.id).label("attempts"))
+        .filter(QuizAttempt.completed_at >= since)
+        .group_by(QuizAttempt.quiz_set_id)
+        .order_by(desc("attempts"))
+        .limit(settings.WARMUP_TOP_N)
+        .all()
+    )
+    quiz_set_ids = [row.quiz_set_id for row in rows]
+    if len(quiz_set_ids) < settings.WARMUP_TOP_N:
+        # Top up with active sets so a fresh deploy still warms something
+        active = (
+            db.query(DBQuizSet.id)
+            .filter(DBQuizSet.is_active == True, DBQuizSet.deleted_at.is_(None))
+            .limit(settings.WARMUP_TOP_N)
+            .all()
+        )
+        for (quiz_set_id,) in active:
+            if len(quiz_set_ids) >= settings.WARMUP_TOP_N:
+                break
+            if quiz_set_id not in quiz_set_ids:
+                quiz_set_ids.append(quiz_set_id)
+    return quiz_set_ids
+
+
+def run_warmup() -> WarmupState:
+    """Preload popular quiz sets into the in-process caches"""
+    warmup_state.status = "running"
+    warmup_state.started_at = datetime.utcnow()
+    warmup_state.completed = 0
+    warmup_state.error = None
+
+    try:
+        # With sharding, each shard contributes its own most attempted sets
+        quiz_set_ids = list(dict.fromkeys(
+            quiz_set_id for shard in fan_out(select_quiz_sets) for quiz_set_id in shard
+        ))
+        warmup_state.total = len(quiz_set_ids)
+        for quiz_set_id in quiz_set_ids:
+            with quiz_session(quiz_set_id) as db:
+                for warmer in WARMERS:
+                    warmer(db, quiz_set_id)
+            warmup_state.completed += 1
+        warmup_state.status = "complete"
+    except Exception as e:
+        # A failed warm-up only costs cold caches; do not keep the worker out of rotation
+        logger.exception("Cache warm-up failed")
+        warmup_state.status = "failed"
+        warmup_state.error = str(e)
+    finally:
+        warmup_state.finished_at = datetime.utcnow()
+    return warmup_state
+
+
+def skip_warmup() -> None:
+    warmup_state.status = "complete"
+    warmup_state.finished_at = datetime.utcnow()
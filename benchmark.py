@@ -0,0 +1,829 @@
+"""Benchmark harness for the Salesforce Quiz API.
+
+Each benchmark drives the in-process ASGI app through httpx, against a
+throwaway SQLite database unless --database-url is given.
+
+    python benchmark.py login --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import List
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def report(name: str, latencies: List[float], elapsed: float) -> None:
+    print(f"{name}: {len(latencies)} requests in {elapsed:.2f}s ({len(latencies) / elapsed:.1f} req/s)")
+    if latencies:
+        print(
+            f"  latency ms  mean={statistics.mean(latencies) * 1000:.1f}"
+            f"  p50={percentile(latencies, 50) * 1000:.1f}"
+            f"  p90={percentile(latencies, 90) * 1000:.1f}"
+            f"  p99={percentile(latencies, 99) * 1000:.1f}"
+            f"  max={max(latencies) * 1000:.1f}"
+        )
+
+
+def make_client():
+    import httpx
+    from app.main import app
+    from init_db import create_tables
+
+    create_tables()
+    return httpx.AsyncClient(app=app, base_url="http://benchmark")
+
+
+async def run_concurrently(count: int, concurrency: int, request) -> List[float]:
+    """Run ``request(i)`` ``count`` times with bounded concurrency, returning latencies"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await request(i)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return latencies
+
+
+async def bench_login(args) -> None:
+    """Login throughput, plus event-loop responsiveness while bcrypt runs"""
+    async with make_client() as client:
+        credentials = {"email": f"bench-{time.time_ns()}@example.com", "password": "benchmark-password"}
+        response = await client.post(
+            "/api/v1/auth/register", json={"name": "Benchmark", **credentials}
+        )
+        response.raise_for_status()
+
+        async def login(_: int) -> None:
+            response = await client.post("/api/v1/auth/login", json=credentials)
+            response.raise_for_status()
+
+        probe_latencies: List[float] = []
+        done = asyncio.Event()
+
+        async def probe() -> None:
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/health")
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        latencies = await run_concurrently(args.requests, args.concurrency, login)
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    report("login", latencies, elapsed)
+    report("health probe during logins", probe_latencies, elapsed)
+
+
+async def bench_auth(args) -> None:
+    """Per-request auth overhead with and without the verified-token cache"""
+    from app.core.auth import authenticate_token, token_cache
+    from app.database.session import SessionLocal
+
+    async with make_client() as client:
+        credentials = {"email": f"bench-{time.time_ns()}@example.com", "password": "benchmark-password"}
+        await client.post("/api/v1/auth/register", json={"name": "Benchmark", **credentials})
+        response = await client.post("/api/v1/auth/login", json=credentials)
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        cache_size = token_cache.max_size
+        for label, size in (("uncached", 0), ("cached", cache_size)):
+            token_cache.max_size = size
+            token_cache.clear()
+
+            db = SessionLocal()
+            try:
+                started = time.perf_counter()
+                for _ in range(args.requests):
+                    authenticate_token(token, db)
+                    db.expunge_all()
+                elapsed = time.perf_counter() - started
+            finally:
+                db.close()
+            print(f"{label}: authenticate_token {elapsed / args.requests * 1e6:.1f} us/call")
+
+            async def me(_: int) -> None:
+                response = await client.get("/api/v1/auth/me", headers=headers)
+                response.raise_for_status()
+
+            started = time.perf_counter()
+            latencies = await run_concurrently(args.requests, 1, me)
+            report(f"{label}: GET /auth/me", latencies, time.perf_counter() - started)
+        token_cache.max_size = cache_size
+
+
+async def bench_throughput(args) -> None:
+    """Throughput of a running server, e.g. one started by serve.py"""
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        async def get(_: int) -> None:
+            response = await client.get(args.path)
+            response.raise_for_status()
+
+        await run_concurrently(min(args.requests, args.concurrency * 2), args.concurrency, get)
+        started = time.perf_counter()
+        latencies = await run_concurrently(args.requests, args.concurrency, get)
+        report(f"GET {args.path}", latencies, time.perf_counter() - started)
+
+
+FIRST_RESPONSE_SCRIPT = """
+import asyncio, httpx
+from app.main import app
+
+async def main():
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+            (await client.get("/health")).raise_for_status()
+
+asyncio.run(main())
+"""
+
+
+async def bench_startup(args) -> None:
+    """Cold-start cost: -X importtime breakdown and time to first response"""
+    import subprocess
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    total = next((cumulative for cumulative, _, name in imports if name.strip() == "app.main"), 0)
+    print(f"import app.main: {total / 1000:.1f} ms cumulative")
+    print(f"top {args.top} imports by self time:")
+    for cumulative, self_us, name in sorted(imports, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self {cumulative / 1000:8.1f} ms cumulative  {name.strip()}")
+
+    durations = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", FIRST_RESPONSE_SCRIPT], check=True)
+        durations.append(time.perf_counter() - started)
+    print(
+        f"time to first response (process start to /health): "
+        f"median={statistics.median(durations) * 1000:.0f} ms  min={min(durations) * 1000:.0f} ms"
+        f"  over {args.runs} runs"
+    )
+
+
+def count_queries():
+    """Start counting SQL statements executed through the app's engine"""
+    from sqlalchemy import event
+    from app.database.session import engine
+
+    counter = {"queries": 0}
+
+    def before_cursor_execute(*_):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return counter
+
+
+async def bench_herd(args) -> None:
+    """Thundering herd on GET /quiz-sets/{id}/questions with and without coalescing"""
+    from app.services.quiz_service import quiz_cache, quiz_reads
+    from init_db import seed_data
+
+    async with make_client() as client:
+        seed_data()
+        counter = count_queries()
+        path = f"/api/v1/quiz-sets/{args.quiz_set_id}/questions"
+
+        async def get(_: int) -> None:
+            response = await client.get(path)
+            response.raise_for_status()
+
+        for label, enabled in (("without coalescing", False), ("with coalescing", True)):
+            quiz_reads.enabled = enabled
+            quiz_cache.clear()
+            counter["queries"] = 0
+            started = time.perf_counter()
+            latencies = await run_concurrently(args.requests, args.requests, get)
+            report(f"{label}", latencies, time.perf_counter() - started)
+            print(f"  SQL queries: {counter['queries']}")
+
+
+async def bench_cache(args) -> None:
+    """Question reads through each cache backend, with a byte budget to force evictions"""
+    from app.core.cache import ExternalCache, LocalStoreClient, MemoryCache, NullCache
+    from app.services import quiz_service
+    from init_db import seed_data
+
+    backends = {
+        "none": NullCache(),
+        "memory": MemoryCache(args.max_bytes, default_ttl=300),
+        "local": ExternalCache(LocalStoreClient(), default_ttl=300),
+    }
+    async with make_client() as client:
+        seed_data()
+        counter = count_queries()
+        quiz_set_ids = [quiz_set["id"] for quiz_set in (await client.get("/api/v1/quiz-sets")).json()]
+
+        async def get(i: int) -> None:
+            response = await client.get(f"/api/v1/quiz-sets/{quiz_set_ids[i % len(quiz_set_ids)]}/questions")
+            response.raise_for_status()
+
+        for label, cache in backends.items():
+            quiz_service.quiz_cache = cache
+            counter["queries"] = 0
+            started = time.perf_counter()
+            latencies = await run_concurrently(args.requests, 1, get)
+            report(label, latencies, time.perf_counter() - started)
+            print(f"  SQL queries: {counter['queries']}  cache: {cache.stats().as_dict()}")
+
+
+async def bench_invalidation(args) -> None:
+    """Cross-worker invalidation latency over the database change log"""
+    from app.core.invalidation import DatabaseBus
+    from app.database.session import SessionLocal
+    from init_db import create_tables
+
+    create_tables()
+    # Two buses on one database stand in for two workers
+    publisher = DatabaseBus(SessionLocal, args.poll_interval, retention_seconds=3600)
+    receiver = DatabaseBus(SessionLocal, args.poll_interval, retention_seconds=3600)
+    latencies: List[float] = []
+    received = asyncio.Event()
+
+    def on_event(event) -> None:
+        latencies.append((time.time_ns() - event.version) / 1e9)
+        received.set()
+
+    receiver.subscribe(on_event)
+    listener = asyncio.create_task(receiver.listen())
+    await asyncio.sleep(args.poll_interval * 2)
+
+    started = time.perf_counter()
+    for i in range(args.events):
+        # Publish at a random point in the receiver's poll cycle
+        await asyncio.sleep(random.uniform(0, args.poll_interval))
+        received.clear()
+        publisher.publish("questions", f"quiz-set-{i}")
+        await asyncio.wait_for(received.wait(), timeout=10)
+    elapsed = time.perf_counter() - started
+    listener.cancel()
+    await asyncio.gather(listener, return_exceptions=True)
+
+    print(f"poll interval {args.poll_interval * 1000:.0f} ms")
+    report("publish to remote eviction", latencies, elapsed)
+
+
+async def bench_attempts(args) -> None:
+    """Storage size and analytics decode speed: JSON attempts vs the compact encoding"""
+    import json
+    import uuid
+    from app.services.attempt_codec import count_outcomes, decode_attempt, encode_attempt
+
+    rng = random.Random(42)
+    question_ids = [str(uuid.uuid4()) for _ in range(args.questions)]
+    answer_keys = {
+        question_id: sorted(rng.sample(range(5), 2)) if rng.random() < 0.2 else rng.randrange(4)
+        for question_id in question_ids
+    }
+    json_rows = []
+    blobs = []
+    for _ in range(args.attempts):
+        answers = {}
+        results = []
+        for question_id in question_ids:
+            if rng.random() < 0.1:
+                continue
+            key = answer_keys[question_id]
+            answer = key if rng.random() < 0.7 else (
+                sorted(rng.sample(range(5), 2)) if isinstance(key, list) else rng.randrange(4)
+            )
+            answers[question_id] = answer
+            results.append({
+                "question_id": question_id,
+                "correct": answer == key,
+                "user_answer": answer,
+                "correct_answer": key,
+            })
+        json_rows.append((json.dumps(answers), json.dumps(results)))
+        blobs.append(encode_attempt(question_ids, answers, {r["question_id"]: r["correct"] for r in results}))
+
+    json_bytes = sum(len(answers) + len(results) for answers, results in json_rows)
+    compact_bytes = sum(len(blob) for blob in blobs) + len(",".join(question_ids))
+    print(f"{args.attempts} attempts x {args.questions} questions")
+    print(f"  JSON:    {json_bytes / args.attempts:8.0f} bytes/attempt")
+    print(f"  compact: {compact_bytes / args.attempts:8.0f} bytes/attempt ({json_bytes / compact_bytes:.0f}x smaller)")
+
+    started = time.perf_counter()
+    answered = {}
+    correct = {}
+    for _, results in json_rows:
+        for result in json.loads(results):
+            answered[result["question_id"]] = answered.get(result["question_id"], 0) + 1
+            correct[result["question_id"]] = correct.get(result["question_id"], 0) + result["correct"]
+    json_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    answered_counts, correct_counts = count_outcomes(blobs)
+    compact_elapsed = time.perf_counter() - started
+    assert [answered.get(q, 0) for q in question_ids] == answered_counts.tolist()
+    assert [correct.get(q, 0) for q in question_ids] == correct_counts.tolist()
+
+    started = time.perf_counter()
+    for blob in blobs:
+        decode_attempt(blob, question_ids, answer_keys)
+    full_decode_elapsed = time.perf_counter() - started
+
+    print(f"per-question counts: JSON {json_elapsed * 1000:.1f} ms, compact {compact_elapsed * 1000:.1f} ms")
+    print(f"full decode back to JSON shape: {full_decode_elapsed / args.attempts * 1e6:.1f} us/attempt")
+
+
+async def bench_reports(args) -> None:
+    """Cross-quiz reports: per-row Python loops vs the columnar analytics engine"""
+    import numpy as np
+    from app.services import analytics_engine
+    from app.services.analytics_engine import AttemptColumns, category_pass_rates, question_discrimination
+
+    rng = np.random.default_rng(42)
+    quiz_set_ids = tuple(f"quiz-{i}" for i in range(args.quiz_sets))
+    categories = {quiz_set_id: f"category-{i % 8}" for i, quiz_set_id in enumerate(quiz_set_ids)}
+    question_ids = tuple(f"{quiz_set_id}-q{j}" for quiz_set_id in quiz_set_ids for j in range(args.questions))
+    question_quiz_sets = {question_id: question_id.rsplit("-q", 1)[0] for question_id in question_ids}
+
+    now = time.time()
+    quiz_set = rng.integers(0, args.quiz_sets, args.attempts).astype(np.int32)
+    skill = rng.random(args.attempts)
+    response_attempt = np.repeat(np.arange(args.attempts), args.questions)
+    response_question = (quiz_set[response_attempt] * args.questions + np.tile(np.arange(args.questions), args.attempts)).astype(np.int32)
+    response_correct = rng.random(len(response_attempt)) < skill[response_attempt]
+    score = np.bincount(response_attempt, weights=response_correct, minlength=args.attempts) / args.questions * 100
+    columns = AttemptColumns(
+        completed_at=now - rng.random(args.attempts) * 84 * 86400,
+        quiz_set=quiz_set,
+        user=rng.integers(0, args.attempts // 10 + 1, args.attempts).astype(np.int32),
+        score=score,
+        response_attempt=response_attempt,
+        response_question=response_question,
+        response_correct=response_correct,
+        quiz_set_ids=quiz_set_ids,
+        user_ids=(),
+        question_ids=question_ids,
+    )
+    print(f"{args.attempts} attempts, {columns.responses} responses")
+
+    # Baseline: what a row-at-a-time report over ORM results would do
+    started = time.perf_counter()
+    groups = {}
+    for i in range(args.attempts):
+        week = int((columns.completed_at[i] + analytics_engine.WEEK_OFFSET_SECONDS) // analytics_engine.WEEK_SECONDS)
+        groups.setdefault((categories[quiz_set_ids[quiz_set[i]]], week), []).append(float(score[i]))
+    for scores in groups.values():
+        scores.sort()
+        sum(score_ >= 70 for score_ in scores) / len(scores)
+    correct_counts = {}
+    for i in range(len(response_attempt)):
+        attempt = int(response_attempt[i])
+        correct_counts[attempt] = correct_counts.get(attempt, 0) + bool(response_correct[i])
+    by_question = {}
+    for i in range(len(response_attempt)):
+        x = bool(response_correct[i])
+        by_question.setdefault(int(response_question[i]), []).append((x, correct_counts[int(response_attempt[i])] - x))
+    for pairs in by_question.values():
+        statistics.correlation([float(x) for x, _ in pairs], [float(y) for _, y in pairs])
+    loop_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rows = category_pass_rates(columns, categories, now - 12 * analytics_engine.WEEK_SECONDS, 70.0)
+    questions = question_discrimination(columns, question_quiz_sets, 1)
+    vector_elapsed = time.perf_counter() - started
+    assert len(rows) == len(groups) and len(questions) == len(by_question)
+
+    print(f"  Python loops: {loop_elapsed * 1000:8.1f} ms")
+    print(f"  vectorized:   {vector_elapsed * 1000:8.1f} ms ({loop_elapsed / vector_elapsed:.0f}x faster)")
+
+    for workers in (0, args.processes):
+        analytics_engine.settings.ANALYTICS_PROCESS_WORKERS = workers
+        analytics_engine.settings.ANALYTICS_PROCESS_MIN_RESPONSES = 0
+        if workers:
+            # Start the pool outside the timing
+            await analytics_engine.run_report(columns, question_discrimination, question_quiz_sets, 1)
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            analytics_engine.run_report(columns, question_discrimination, question_quiz_sets, 1)
+            for _ in range(args.concurrent)
+        ))
+        elapsed = time.perf_counter() - started
+        print(f"  {args.concurrent} concurrent reports, {workers or 'no'} worker processes: {elapsed * 1000:8.1f} ms")
+    analytics_engine.shutdown_process_pool()
+
+
+async def bench_sketch(args) -> None:
+    """Timing sketches: update, merge and (de)serialization cost, size and accuracy"""
+    from app.core.sketch import QuantileSketch
+
+    rng = random.Random(42)
+    # Answer times are roughly log-normal: most take tens of seconds, a few take minutes
+    values = [rng.lognormvariate(3.2, 0.8) for _ in range(args.values)]
+
+    sketch = QuantileSketch(args.accuracy)
+    started = time.perf_counter()
+    for value in values:
+        sketch.add(value)
+    update_elapsed = time.perf_counter() - started
+
+    # One sketch per flush, as workers produce them
+    parts = []
+    for i in range(args.merges):
+        part = QuantileSketch(args.accuracy)
+        for value in values[i::args.merges]:
+            part.add(value)
+        parts.append(part)
+    started = time.perf_counter()
+    merged = QuantileSketch(args.accuracy)
+    for part in parts:
+        merged.merge(part)
+    merge_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(args.merges):
+        data = sketch.to_bytes()
+        QuantileSketch.from_bytes(data)
+    roundtrip_elapsed = time.perf_counter() - started
+
+    print(f"{args.values} values, relative accuracy {args.accuracy}")
+    print(f"  update:    {update_elapsed / args.values * 1e9:8.0f} ns/value")
+    print(f"  merge:     {merge_elapsed / args.merges * 1e6:8.1f} us/sketch ({len(sketch.bins)} buckets)")
+    print(f"  roundtrip: {roundtrip_elapsed / args.merges * 1e6:8.1f} us/sketch, {len(data)} bytes "
+          f"vs {8 * args.values} bytes of raw float64 timings")
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        estimate = merged.quantile(q)
+        print(f"  p{int(q * 100):<3} exact {exact:8.2f}s  sketch {estimate:8.2f}s  error {abs(estimate - exact) / exact:.2%}")
+
+
+async def bench_submit(args) -> None:
+    """Submit latency with side effects inline vs deferred to the outbox worker"""
+    from app.core.config import settings
+    from app.models.database import OutboxEvent
+    from app.database.session import SessionLocal
+    from app.services.outbox_service import outbox_worker
+    from init_db import seed_data
+
+    async with make_client() as client:
+        seed_data()
+        path = f"/api/v1/quiz-sets/{args.quiz_set_id}"
+        questions = (await client.get(f"{path}/questions")).json()
+        # Existing progress rows make the progress update a real write
+        for i in range(args.users):
+            await client.post("/api/v1/progress", json={
+                "quiz_set_id": args.quiz_set_id, "user_id": f"user-{i}", "current_question": 1
+            })
+
+        async def submit(i: int) -> None:
+            rng = random.Random(i)
+            answers = {question["id"]: rng.randrange(4) for question in questions}
+            response = await client.post(f"{path}/submit", json={"answers": answers})
+            response.raise_for_status()
+
+        modes = (
+            ("inline", 0.0, False),
+            ("outbox, drained after the run", args.poll_interval, False),
+            ("outbox, worker running alongside", args.poll_interval, True),
+        )
+        for label, poll_interval, concurrent_worker in modes:
+            settings.OUTBOX_POLL_INTERVAL_SECONDS = poll_interval
+            worker = None
+            if concurrent_worker:
+                worker = asyncio.create_task(outbox_worker.run(poll_interval))
+            started = time.perf_counter()
+            latencies = await run_concurrently(args.requests, args.concurrency, submit)
+            report(label, latencies, time.perf_counter() - started)
+            if poll_interval:
+                worker = worker or asyncio.create_task(outbox_worker.run(poll_interval))
+                drain_started = time.perf_counter()
+                while SessionLocal().query(OutboxEvent).filter(OutboxEvent.failed_at.is_(None)).count():
+                    await asyncio.sleep(0.01)
+                print(f"  outbox drained in {time.perf_counter() - drain_started:.2f}s, {outbox_worker.stats()}")
+                worker.cancel()
+                await asyncio.gather(worker, return_exceptions=True)
+
+
+async def bench_delete(args) -> None:
+    """Deleting a large quiz set: ORM cascade vs soft delete plus chunked purge"""
+    from app.core.config import settings
+    from app.database.session import SessionLocal
+    from app.models.database import QuizAttempt, QuizSet as DBQuizSet, Question as DBQuestion
+    from app.services.purge_service import run_quiz_set_purge
+
+    settings.QUIZ_SET_PURGE_INTERVAL_SECONDS = 10  # purge below, not inside the request
+
+    def seed(quiz_set_id: str) -> None:
+        db = SessionLocal()
+        db.add(DBQuizSet(id=quiz_set_id, title=quiz_set_id, category="bench", difficulty="easy",
+                         estimated_time=1, total_questions=args.questions))
+        db.flush()
+        db.bulk_insert_mappings(DBQuestion, [
+            {"id": f"{quiz_set_id}-{i}", "quiz_set_id": quiz_set_id, "question": "?", "options": ["a", "b"],
+             "correct_answer": 0, "type": "radio", "justification": ""}
+            for i in range(args.questions)
+        ])
+        db.bulk_insert_mappings(QuizAttempt, [
+            {"user_id": "anonymous", "quiz_set_id": quiz_set_id, "answers": {}, "score": 0.0,
+             "correct_answers": 0, "total_questions": args.questions, "time_spent": 0, "detailed_results": []}
+            for _ in range(args.attempts)
+        ])
+        db.commit()
+        db.close()
+
+    async with make_client() as client:
+        seed("bench-orm")
+        started = time.perf_counter()
+        db = SessionLocal()
+        # What delete_quiz_set used to do: the ORM cascade loaded and deleted every question
+        quiz_set = db.get(DBQuizSet, "bench-orm")
+        for question in quiz_set.questions:
+            db.delete(question)
+        db.delete(quiz_set)
+        db.commit()
+        db.close()
+        print(f"ORM cascade delete:      {(time.perf_counter() - started) * 1000:8.1f} ms "
+              f"({args.attempts} attempts left behind)")
+
+        seed("bench-soft")
+        started = time.perf_counter()
+        response = await client.delete("/api/v1/quiz-sets/bench-soft")
+        response.raise_for_status()
+        print(f"DELETE request (soft):   {(time.perf_counter() - started) * 1000:8.1f} ms")
+        started = time.perf_counter()
+        result = await asyncio.to_thread(run_quiz_set_purge)
+        print(f"background purge:        {(time.perf_counter() - started) * 1000:8.1f} ms "
+              f"({result.rows_deleted} rows in chunks of {settings.QUIZ_SET_PURGE_CHUNK_SIZE})")
+
+
+async def bench_shards(args) -> None:
+    """Concurrent submits across many quiz sets: one SQLite file vs several shards"""
+    from concurrent.futures import ThreadPoolExecutor
+    from app.core.config import settings
+    from app.database.sharding import ShardRouter
+    from app.models.database import QuizSet as DBQuizSet, Question as DBQuestion
+    from app.models.schemas import QuizSubmission
+    from app.services.quiz_service import QuizService
+
+    settings.OUTBOX_POLL_INTERVAL_SECONDS = 0  # side effects inline, so each submit is several writes
+    quiz_set_ids = [f"bench-{i}" for i in range(args.quiz_sets)]
+    directory = tempfile.mkdtemp(prefix="quiz-shards-")
+
+    for shards in (1, args.shards):
+        router = ShardRouter([f"sqlite:///{directory}/{shards}-{i}.db" for i in range(shards)])
+        router.create_schema()
+        for quiz_set_id in quiz_set_ids:
+            with router.session_for(quiz_set_id) as db:
+                # Bulk inserts skip the change feed, whose counter lives in the home database
+                db.bulk_insert_mappings(DBQuizSet, [{
+                    "id": quiz_set_id, "title": quiz_set_id, "category": "bench", "difficulty": "easy",
+                    "estimated_time": 1, "total_questions": args.questions
+                }])
+                db.bulk_insert_mappings(DBQuestion, [
+                    {"id": f"{quiz_set_id}-{i}", "quiz_set_id": quiz_set_id, "question": "?",
+                     "options": ["a", "b"], "correct_answer": 0, "type": "radio", "justification": ""}
+                    for i in range(args.questions)
+                ])
+                db.commit()
+
+        def submit(i: int) -> float:
+            rng = random.Random(i)
+            quiz_set_id = rng.choice(quiz_set_ids)
+            answers = {f"{quiz_set_id}-{q}": rng.randrange(2) for q in range(args.questions)}
+            started = time.perf_counter()
+            with router.session_for(quiz_set_id) as db:
+                QuizService(db).submit_quiz(f"user-{i}", quiz_set_id, QuizSubmission(answers=answers))
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            started = time.perf_counter()
+            latencies = list(pool.map(submit, range(args.requests)))
+            report(f"{shards} shard(s)", latencies, time.perf_counter() - started)
+        started = time.perf_counter()
+        counts = router.fan_out(lambda db: db.query(DBQuizSet).count())
+        print(f"  fan-out count over {shards} shard(s): {(time.perf_counter() - started) * 1000:.1f} ms, "
+              f"quiz sets per shard {counts}")
+        router.dispose()
+
+
+async def bench_sync(args) -> None:
+    """Offline progress sync: one POST /progress per record vs one bulk POST /progress/sync"""
+    from app.database.sharding import quiz_session
+    from app.models.database import QuizSet as DBQuizSet
+
+    quiz_set_ids = [f"bench-sync-{i}" for i in range(max(args.records))]
+    async with make_client() as client:
+        for quiz_set_id in quiz_set_ids:
+            with quiz_session(quiz_set_id) as db:
+                if db.get(DBQuizSet, quiz_set_id) is None:
+                    db.bulk_insert_mappings(DBQuizSet, [{
+                        "id": quiz_set_id, "title": quiz_set_id, "category": "bench", "difficulty": "easy",
+                        "estimated_time": 1, "total_questions": 0
+                    }])
+                    db.commit()
+
+        def record(quiz_set_id: str, round_: int) -> dict:
+            return {
+                "quiz_set_id": quiz_set_id, "user_id": "bench", "current_question": round_,
+                "answers": {"q1": 1, "q2": [0, 2]}, "score": 50.0, "time_spent": 120,
+                "client_updated_at": f"2026-01-01T00:{round_:02d}:00Z",
+            }
+
+        for round_, count in enumerate(args.records, start=1):
+            records = [record(quiz_set_id, round_) for quiz_set_id in quiz_set_ids[:count]]
+            started = time.perf_counter()
+            for body in records:
+                (await client.post("/api/v1/progress", json=body)).raise_for_status()
+            one_by_one = time.perf_counter() - started
+
+            # Newer than the saves above, so every record wins
+            synced_at = datetime.now(timezone.utc).isoformat()
+            for body in records:
+                body["client_updated_at"] = synced_at
+            started = time.perf_counter()
+            response = await client.post("/api/v1/progress/sync", json={"records": records})
+            response.raise_for_status()
+            bulk = time.perf_counter() - started
+            statuses = {}
+            for result in response.json()["results"]:
+                statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+            print(f"{count:4d} records: one by one {one_by_one * 1000:8.1f} ms, "
+                  f"bulk sync {bulk * 1000:7.1f} ms ({one_by_one / bulk:.0f}x) {statuses}")
+
+
+async def bench_profiling(args) -> None:
+    """Request overhead of the profiling middleware: absent, installed but idle, and profiling"""
+    import httpx
+    from app.core.cache import NullCache
+    from app.core.config import settings
+    from app.core.profiling import profiler
+    from app.main import create_app
+    from app.services import quiz_service
+    from init_db import seed_data
+
+    quiz_service.quiz_cache = NullCache()  # every request reaches the database
+    profiler.directory = tempfile.mkdtemp(prefix="quiz-profiles-")
+    settings.PROFILING_TOKEN = "benchmark"
+    path = "/api/v1/quiz-sets/mcpa-level-1/questions"
+    async with make_client():
+        seed_data()
+
+    modes = [("disabled", False, {}), ("enabled, idle", True, {}),
+             ("profiled", True, {"X-Profile-Token": settings.PROFILING_TOKEN})]
+    for label, enabled, headers in modes:
+        settings.PROFILING_ENABLED = enabled
+        async with httpx.AsyncClient(app=create_app(), base_url="http://benchmark") as client:
+            async def get(_: int) -> None:
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+
+            await run_concurrently(args.requests // 5, 1, get)
+            started = time.perf_counter()
+            latencies = await run_concurrently(args.requests, 1, get)
+            report(label, latencies, time.perf_counter() - started)
+    print(f"  profiles written to {profiler.directory}")
+
+
+BENCHMARKS = {
+    "login": bench_login,
+    "auth": bench_auth,
+    "throughput": bench_throughput,
+    "startup": bench_startup,
+    "herd": bench_herd,
+    "cache": bench_cache,
+    "invalidation": bench_invalidation,
+    "attempts": bench_attempts,
+    "reports": bench_reports,
+    "sketch": bench_sketch,
+    "submit": bench_submit,
+    "delete": bench_delete,
+    "shards": bench_shards,
+    "sync": bench_sync,
+    "profiling": bench_profiling,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Database to benchmark against (default: temporary SQLite file)")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    login = subparsers.add_parser("login", help=bench_login.__doc__)
+    login.add_argument("--requests", type=int, default=100)
+    login.add_argument("--concurrency", type=int, default=10)
+    login.add_argument("--rounds", type=int, help="bcrypt cost factor (BCRYPT_ROUNDS)")
+    login.add_argument("--workers", type=int, help="password hashing threads (PASSWORD_HASH_WORKERS)")
+
+    auth = subparsers.add_parser("auth", help=bench_auth.__doc__)
+    auth.add_argument("--requests", type=int, default=1000)
+
+    throughput = subparsers.add_parser("throughput", help=bench_throughput.__doc__)
+    throughput.add_argument("--url", default="http://localhost:8000")
+    throughput.add_argument("--path", default="/api/v1/quiz-sets")
+    throughput.add_argument("--requests", type=int, default=2000)
+    throughput.add_argument("--concurrency", type=int, default=32)
+
+    startup = subparsers.add_parser("startup", help=bench_startup.__doc__)
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--top", type=int, default=15)
+
+    herd = subparsers.add_parser("herd", help=bench_herd.__doc__)
+    herd.add_argument("--requests", type=int, default=200, help="concurrent identical requests")
+    herd.add_argument("--quiz-set-id", default="mcpa-level-1")
+
+    cache = subparsers.add_parser("cache", help=bench_cache.__doc__)
+    cache.add_argument("--requests", type=int, default=500)
+    cache.add_argument("--max-bytes", type=int, default=64 * 1024 * 1024, help="memory backend budget")
+
+    invalidation = subparsers.add_parser("invalidation", help=bench_invalidation.__doc__)
+    invalidation.add_argument("--events", type=int, default=50)
+    invalidation.add_argument("--poll-interval", type=float, default=0.2)
+
+    attempts = subparsers.add_parser("attempts", help=bench_attempts.__doc__)
+    attempts.add_argument("--attempts", type=int, default=20000)
+    attempts.add_argument("--questions", type=int, default=60)
+
+    reports = subparsers.add_parser("reports", help=bench_reports.__doc__)
+    reports.add_argument("--attempts", type=int, default=50000)
+    reports.add_argument("--questions", type=int, default=20, help="questions per quiz set")
+    reports.add_argument("--quiz-sets", type=int, default=40)
+    reports.add_argument("--concurrent", type=int, default=4, help="reports run at once")
+    reports.add_argument("--processes", type=int, default=4, help="analytics worker processes")
+
+    sketch = subparsers.add_parser("sketch", help=bench_sketch.__doc__)
+    sketch.add_argument("--values", type=int, default=200000)
+    sketch.add_argument("--merges", type=int, default=1000, help="partial sketches merged")
+    sketch.add_argument("--accuracy", type=float, default=0.01)
+
+    submit = subparsers.add_parser("submit", help=bench_submit.__doc__)
+    submit.add_argument("--requests", type=int, default=1000)
+    submit.add_argument("--concurrency", type=int, default=16)
+    submit.add_argument("--quiz-set-id", default="mcpa-level-1")
+    submit.add_argument("--users", type=int, default=1, help="progress rows created up front")
+    submit.add_argument("--poll-interval", type=float, default=1.0, help="outbox worker poll interval")
+
+    delete = subparsers.add_parser("delete", help=bench_delete.__doc__)
+    delete.add_argument("--questions", type=int, default=5000)
+    delete.add_argument("--attempts", type=int, default=20000)
+
+    shards = subparsers.add_parser("shards", help=bench_shards.__doc__)
+    shards.add_argument("--shards", type=int, default=4)
+    shards.add_argument("--quiz-sets", type=int, default=64)
+    shards.add_argument("--questions", type=int, default=40)
+    shards.add_argument("--requests", type=int, default=2000)
+    shards.add_argument("--concurrency", type=int, default=8)
+
+    sync = subparsers.add_parser("sync", help=bench_sync.__doc__)
+    sync.add_argument("--records", type=int, nargs="+", default=[10, 100, 500], help="records per sync")
+
+    profiling = subparsers.add_parser("profiling", help=bench_profiling.__doc__)
+    profiling.add_argument("--requests", type=int, default=500)
+
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure the environment first
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        database_path = os.path.join(tempfile.mkdtemp(prefix="quiz-benchmark-"), "benchmark.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+    if getattr(args, "rounds", None):
+        os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    if getattr(args, "workers", None):
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+
+    asyncio.run(BENCHMARKS[args.benchmark](args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+import argparse
+from app.services.compaction_service import run_attempt_compaction
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll old quiz attempts into daily aggregates and archive the raw rows")
+    parser.add_argument("--hot-days", type=int, default=None, help="Days of raw attempts to keep (default: ATTEMPT_HOT_DAYS)")
+    args = parser.parse_args()
+
+    print("Compacting quiz attempts...")
+    result = run_attempt_compaction(hot_days=args.hot_days)
+    print(f"Compacted {result.days_compacted} days, archived {result.attempts_archived} attempts.")
+    for path in result.archive_files:
+        print(f"  {path}")
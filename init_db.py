@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
-from app.database.session import SessionLocal, engine
+from app.database.session import engine
+from app.database.sharding import quiz_session, shard_router
 from app.models.database import Base, QuizSet as DBQuizSet, Question as DBQuestion
 from app.models.schemas import DifficultyLevel, QuestionType
 
@@ -7,11 +8,13 @@ from app.models.schemas import DifficultyLevel, QuestionType
 def create_tables():
     """Create all database tables"""
     Base.metadata.create_all(bind=engine)
+    if shard_router is not None:
+        shard_router.create_schema()
 
 
 def seed_data():
     """Seed the database with sample data"""
-    db = SessionLocal()
+    db = quiz_session("mcpa-level-1")
     
     try:
         # Check if data already exists
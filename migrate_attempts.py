@@ -0,0 +1,93 @@
+"""Convert stored quiz attempts from JSON detailed_results to the compact encoding.
+
+Adds the question_order_id/results_blob columns when an existing database
+predates them, then rewrites legacy rows in batches. Rows whose answers do
+not fit the compact format are left as JSON. Runs against every shard when
+sharding is configured. Safe to re-run.
+"""
+import argparse
+import json
+
+from sqlalchemy import inspect, text, LargeBinary, Integer
+from sqlalchemy.orm import sessionmaker
+
+from app.database.session import SessionLocal, engine
+from app.database.sharding import create_shard_schema, shard_router
+from app.models.database import Base, QuizAttempt
+from app.services.attempt_codec import encode_attempt, get_question_order_id
+
+
+def add_missing_columns(bind) -> None:
+    columns = {column["name"] for column in inspect(bind).get_columns("quiz_attempts")}
+    new_columns = {
+        "question_order_id": Integer().compile(dialect=bind.dialect),
+        "results_blob": LargeBinary().compile(dialect=bind.dialect),
+    }
+    with bind.begin() as connection:
+        for name, column_type in new_columns.items():
+            if name not in columns:
+                connection.execute(text(f"ALTER TABLE quiz_attempts ADD COLUMN {name} {column_type}"))
+                print(f"Added quiz_attempts.{name}")
+
+
+def migrate(bind, session_factory: sessionmaker, batch_size: int, shard: bool = False) -> None:
+    if shard:
+        create_shard_schema(bind)
+    else:
+        Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind)
+
+    db = session_factory()
+    converted = skipped = bytes_before = bytes_after = 0
+    last_id = ""
+    try:
+        while True:
+            attempts = (
+                db.query(QuizAttempt)
+                .filter(QuizAttempt.results_blob.is_(None), QuizAttempt.id > last_id)
+                .order_by(QuizAttempt.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not attempts:
+                break
+            last_id = attempts[-1].id
+
+            for attempt in attempts:
+                results = attempt.detailed_results or []
+                question_ids = [result.get("question_id") for result in results]
+                blob = encode_attempt(
+                    question_ids,
+                    {result.get("question_id"): result.get("user_answer") for result in results},
+                    {result.get("question_id"): bool(result.get("correct")) for result in results}
+                )
+                if blob is None or not question_ids:
+                    skipped += 1
+                    continue
+                bytes_before += len(json.dumps(attempt.answers)) + len(json.dumps(results))
+                bytes_after += len(blob)
+                attempt.question_order_id = get_question_order_id(db, attempt.quiz_set_id, question_ids)
+                attempt.results_blob = blob
+                attempt.answers = {}
+                attempt.detailed_results = []
+                converted += 1
+            db.commit()
+            print(f"Converted {converted} attempts so far...")
+    finally:
+        db.close()
+
+    print(f"Converted {converted} attempts, left {skipped} as JSON.")
+    if converted:
+        print(f"Results payload: {bytes_before} bytes as JSON -> {bytes_after} bytes compact")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Attempts rewritten per transaction")
+    args = parser.parse_args()
+    if shard_router is None:
+        migrate(engine, SessionLocal, args.batch_size)
+    else:
+        for bind, session_factory in zip(shard_router.engines, shard_router.sessionmakers):
+            print(f"Migrating {bind.url.render_as_string(hide_password=True)}")
+            migrate(bind, session_factory, args.batch_size, shard=True)
@@ -0,0 +1,46 @@
+"""Prepare existing databases for bulk progress sync.
+
+Adds the user_progress.client_updated_at column when a database predates
+it, keeps only the most recently written row for each user and quiz set,
+and creates the unique index the sync upsert relies on. Runs against every
+shard when sharding is configured. Safe to re-run.
+"""
+from sqlalchemy import DateTime, inspect, text
+
+from app.database.session import engine
+from app.database.sharding import shard_router
+
+
+def migrate(bind) -> None:
+    inspector = inspect(bind)
+    columns = {column["name"] for column in inspector.get_columns("user_progress")}
+    unique = [constraint["column_names"] for constraint in inspector.get_unique_constraints("user_progress")]
+    unique += [index["column_names"] for index in inspector.get_indexes("user_progress") if index["unique"]]
+    with bind.begin() as connection:
+        if "client_updated_at" not in columns:
+            column_type = DateTime(timezone=True).compile(dialect=bind.dialect)
+            connection.execute(text(f"ALTER TABLE user_progress ADD COLUMN client_updated_at {column_type}"))
+            print("Added user_progress.client_updated_at")
+        removed = connection.execute(text(
+            "DELETE FROM user_progress WHERE id IN ("
+            " SELECT id FROM ("
+            "  SELECT id, ROW_NUMBER() OVER ("
+            "   PARTITION BY user_id, quiz_set_id"
+            "   ORDER BY COALESCE(updated_at, created_at) DESC, id"
+            "  ) AS position FROM user_progress"
+            " ) ranked WHERE position > 1"
+            ")"
+        )).rowcount
+        if removed:
+            print(f"Removed {removed} duplicate progress rows")
+        if ["user_id", "quiz_set_id"] not in unique:
+            connection.execute(text(
+                "CREATE UNIQUE INDEX uq_user_progress_user_quiz_set ON user_progress (user_id, quiz_set_id)"
+            ))
+            print("Created unique index on user_progress (user_id, quiz_set_id)")
+
+
+if __name__ == "__main__":
+    for bind in shard_router.engines if shard_router else [engine]:
+        print(f"Migrating {bind.url.render_as_string(hide_password=True)}")
+        migrate(bind)
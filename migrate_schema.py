@@ -0,0 +1,168 @@
+"""Bring existing databases up to the current quiz content schema.
+
+Creates the tables that are missing, adds new columns to quiz_sets and
+questions (and their indexes), and re-creates foreign keys that gained ON
+DELETE CASCADE since the table was created (SQLite cannot alter a
+constraint, so there the table is rebuilt with its rows copied over).
+Answer counters of existing questions start at zero, and existing quiz
+sets and questions get a change_seq from the change counter, so the delta
+feed hands them to clients that sync from zero. Runs against the home
+database and every shard when sharding is configured. Safe to re-run.
+"""
+import argparse
+
+from sqlalchemy import MetaData, inspect, select, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import AddConstraint, CreateIndex, CreateTable
+
+from app.database.change_tracking import reserve_change_seqs
+from app.database.session import engine
+from app.database.sharding import HOME_TABLES, create_shard_schema, shard_router
+from app.models.database import Base, Question, QuizSet
+
+# table -> columns added after the table first shipped
+NEW_COLUMNS = {
+    "quiz_sets": ("change_seq", "deleted_at"),
+    "questions": ("times_answered", "times_correct", "change_seq"),
+}
+# Counters that start from zero on rows that predate them
+ZEROED_COLUMNS = {
+    "questions": ("times_answered", "times_correct"),
+}
+
+
+def add_missing_columns(connection) -> None:
+    inspector = inspect(connection)
+    for table_name, names in NEW_COLUMNS.items():
+        table = Base.metadata.tables[table_name]
+        columns = {column["name"] for column in inspector.get_columns(table_name)}
+        indexes = {index["name"] for index in inspector.get_indexes(table_name)}
+        for name in names:
+            if name not in columns:
+                column_type = table.c[name].type.compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type}"))
+                print(f"Added {table_name}.{name}")
+            for index in table.indexes:
+                if name in index.columns and index.name not in indexes:
+                    connection.execute(CreateIndex(index))
+                    indexes.add(index.name)
+
+
+def zero_new_counters(connection) -> None:
+    for table_name, names in ZEROED_COLUMNS.items():
+        for name in names:
+            zeroed = connection.execute(text(f"UPDATE {table_name} SET {name} = 0 WHERE {name} IS NULL")).rowcount
+            if zeroed:
+                print(f"Set {table_name}.{name} to 0 on {zeroed} rows")
+
+
+def _foreign_keys(table, shard: bool) -> list:
+    # Shards leave out the foreign keys to home-only tables, see create_shard_schema
+    return [
+        constraint for constraint in table.foreign_key_constraints
+        if not shard or constraint.referred_table.name not in HOME_TABLES
+    ]
+
+
+def _stale_foreign_keys(connection, table, shard: bool) -> list:
+    """(existing name, declared constraint) pairs whose ON DELETE differs from the model"""
+    existing = {
+        tuple(foreign_key["constrained_columns"]): foreign_key
+        for foreign_key in inspect(connection).get_foreign_keys(table.name)
+    }
+    stale = []
+    for constraint in _foreign_keys(table, shard):
+        if not constraint.ondelete:
+            continue
+        foreign_key = existing.get(tuple(constraint.column_keys))
+        ondelete = (foreign_key or {}).get("options", {}).get("ondelete") or ""
+        if foreign_key is not None and ondelete.upper() != constraint.ondelete.upper():
+            stale.append((foreign_key["name"], constraint))
+    return stale
+
+
+def _rebuild_sqlite_table(connection, table, shard: bool) -> None:
+    metadata = MetaData()
+    for other in Base.metadata.tables.values():
+        other.to_metadata(metadata)
+    rebuilt = table.to_metadata(metadata, name=f"_rebuilt_{table.name}")
+    columns = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    copied = ", ".join(column.name for column in table.columns if column.name in columns)
+
+    connection.execute(CreateTable(rebuilt, include_foreign_key_constraints=_foreign_keys(rebuilt, shard)))
+    connection.execute(text(f"INSERT INTO {rebuilt.name} ({copied}) SELECT {copied} FROM {table.name}"))
+    connection.execute(text(f"DROP TABLE {table.name}"))
+    connection.execute(text(f"ALTER TABLE {rebuilt.name} RENAME TO {table.name}"))
+    for index in table.indexes:
+        connection.execute(CreateIndex(index))
+
+
+def cascade_foreign_keys(connection, shard: bool) -> None:
+    existing = set(inspect(connection).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        stale = _stale_foreign_keys(connection, table, shard)
+        if not stale:
+            continue
+        if connection.dialect.name == "sqlite":
+            _rebuild_sqlite_table(connection, table, shard)
+        else:
+            for name, constraint in stale:
+                connection.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT {name}"))
+                connection.execute(AddConstraint(constraint))
+        print(f"Re-created foreign keys of {table.name} with ON DELETE CASCADE")
+
+
+def backfill_change_seqs(bind, batch_size: int) -> None:
+    """Number the rows written before change tracking, a batch per transaction"""
+    for model in (QuizSet, Question):
+        numbered = 0
+        while True:
+            with Session(bind) as db:
+                ids = db.scalars(
+                    select(model.id).where(model.change_seq.is_(None)).order_by(model.id).limit(batch_size)
+                ).all()
+                if not ids:
+                    break
+                seq = reserve_change_seqs(db, len(ids))
+                db.execute(update(model), [{"id": id, "change_seq": seq + i} for i, id in enumerate(ids)])
+                db.commit()
+            numbered += len(ids)
+        if numbered:
+            print(f"Assigned change_seq to {numbered} {model.__tablename__} rows")
+
+
+def migrate(bind, shard: bool = False, batch_size: int = 1000) -> None:
+    if shard:
+        create_shard_schema(bind)
+    else:
+        Base.metadata.create_all(bind=bind)
+    if bind.dialect.name == "sqlite":
+        # The rebuild drops tables other tables point at; checks are off only for this connection
+        with bind.connect() as connection:
+            connection.execute(text("PRAGMA foreign_keys=OFF"))
+            connection.commit()
+            with connection.begin():
+                add_missing_columns(connection)
+                cascade_foreign_keys(connection, shard)
+                zero_new_counters(connection)
+    else:
+        with bind.begin() as connection:
+            add_missing_columns(connection)
+            cascade_foreign_keys(connection, shard)
+            zero_new_counters(connection)
+    # With sharding the quiz content lives on the shards
+    if shard or shard_router is None:
+        backfill_change_seqs(bind, batch_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows numbered per transaction")
+    args = parser.parse_args()
+    print(f"Migrating {engine.url.render_as_string(hide_password=True)}")
+    migrate(engine, batch_size=args.batch_size)
+    for bind in shard_router.engines if shard_router else []:
+        print(f"Migrating {bind.url.render_as_string(hide_password=True)}")
+        migrate(bind, shard=True, batch_size=args.batch_size)
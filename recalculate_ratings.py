@@ -0,0 +1,14 @@
+import argparse
+from app.services.rating_service import run_rating_recalculation
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalculate question success rates and difficulty ratings")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and rebuild from all attempts")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Attempts processed per chunk")
+    args = parser.parse_args()
+
+    print("Recalculating question ratings...")
+    result = run_rating_recalculation(full=args.full, chunk_size=args.chunk_size)
+    print(f"Processed {result.attempts_processed} attempts, updated {result.questions_updated} questions.")
+    print(f"Watermark: {result.watermark}")
@@ -0,0 +1,50 @@
+import argparse
+import importlib.util
+import os
+import uvicorn
+from app.core.config import settings
+from init_db import create_tables
+
+
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with multiple worker processes")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument(
+        "--workers", type=int, default=settings.WORKERS,
+        help="Worker processes (default: one per CPU core)"
+    )
+    parser.add_argument(
+        "--graceful-timeout", type=int, default=settings.GRACEFUL_SHUTDOWN_SECONDS,
+        help="Seconds to let in-flight requests finish on shutdown"
+    )
+    parser.add_argument("--skip-create-tables", action="store_true", help="Skip the pre-start schema step")
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+
+    # Create the schema once here instead of in every worker
+    if not args.skip_create_tables:
+        print("Creating database tables...")
+        create_tables()
+    os.environ["DB_CREATE_ON_STARTUP"] = "false"
+
+    loop = "uvloop" if _has_module("uvloop") else "asyncio"
+    http = "httptools" if _has_module("httptools") else "h11"
+    print(f"Starting {workers} workers on {args.host}:{args.port} (loop={loop}, http={http})")
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        access_log=False
+    )
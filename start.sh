@@ -27,4 +27,9 @@ echo "🌐 Starting API server..."
 echo "📚 API Documentation will be available at: http://localhost:8000/docs"
 echo "🔴 ReDoc will be available at: http://localhost:8000/redoc"
 echo ""
-uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+if [ "$ENVIRONMENT" = "production" ]; then
+    # Tables were created above, so workers skip the schema step
+    exec python serve.py --skip-create-tables
+else
+    uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+fi
@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+# Settings are read at import time, so point the app at a throwaway database first
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='quiz-tests-')}/test.db")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("WARMUP_ENABLED", "false")
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.database import Base
+
+
+def _sessions(url, enforce_foreign_keys=False, **engine_args):
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **engine_args)
+    if enforce_foreign_keys:
+        event.listen(engine, "connect", lambda connection, record: connection.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def session_factory():
+    """Sessions on a fresh in-memory SQLite database with the full schema"""
+    engine, factory = _sessions("sqlite://", poolclass=StaticPool)
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def file_session_factory(tmp_path):
+    """Like ``session_factory``, but each session gets its own connection, for concurrency tests"""
+    engine, factory = _sessions(f"sqlite:///{tmp_path}/test.db")
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def enforced_session_factory(tmp_path):
+    """Like ``file_session_factory``, with foreign keys enforced as on Postgres"""
+    engine, factory = _sessions(f"sqlite:///{tmp_path}/test.db", enforce_foreign_keys=True)
+    yield factory
+    engine.dispose()
@@ -0,0 +1,60 @@
+import threading
+
+from app.models.database import (
+    AdaptiveAnswer, Question as DBQuestion, QuizSet as DBQuizSet, UserAbility, UserProgress
+)
+from app.models.schemas import PracticeAnswer
+from app.services.adaptive_service import AdaptiveService
+
+
+def seed(factory):
+    with factory() as db:
+        db.add(DBQuizSet(id="qs", title="t", category="c", difficulty="easy", estimated_time=1, total_questions=2))
+        for i in range(2):
+            db.add(DBQuestion(id=f"q{i}", quiz_set_id="qs", question="?", options=["a", "b"], correct_answer=0,
+                              type="radio", justification="", difficulty="easy"))
+        db.commit()
+
+
+def test_practice_answers_leave_quiz_progress_alone(session_factory):
+    seed(session_factory)
+    with session_factory() as db:
+        db.add(UserProgress(user_id="u", quiz_set_id="qs", current_question=7, answers={"q1": 1}))
+        db.commit()
+
+        service = AdaptiveService(db)
+        service.record_answer("u", "qs", PracticeAnswer(question_id="q0", answer=0))
+        service.record_answer("u", "qs", PracticeAnswer(question_id="q0", answer=1))
+
+        progress = db.query(UserProgress).one()
+        assert (progress.current_question, progress.answers) == (7, {"q1": 1})
+        answer = db.query(AdaptiveAnswer).one()
+        assert (answer.question_id, answer.answer, answer.correct) == ("q0", 1, False)
+        assert db.query(UserAbility).one().answered == 2
+        # Only practice answers exclude questions from the next pick
+        assert service.next_question("u", "qs").question.id == "q1"
+
+
+def test_concurrent_first_answers_share_one_ability_row(file_session_factory):
+    seed(file_session_factory)
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def answer(question_id):
+        with file_session_factory() as db:
+            barrier.wait()
+            try:
+                AdaptiveService(db).record_answer("u", "qs", PracticeAnswer(question_id=question_id, answer=0))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=answer, args=(f"q{i % 2}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with file_session_factory() as db:
+        assert db.query(UserAbility).count() == 1
+        assert db.query(AdaptiveAnswer).count() == 2
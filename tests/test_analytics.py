@@ -0,0 +1,61 @@
+import calendar
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.models.database import QuizAttempt, QuizSet as DBQuizSet
+from app.services import analytics_engine
+from app.services.analytics_engine import AttemptColumnStore
+
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    """Run with the process in a timezone far from UTC"""
+    monkeypatch.setenv("TZ", "Asia/Tokyo")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def store(session_factory, monkeypatch):
+    monkeypatch.setattr(analytics_engine, "session_factories", lambda: [session_factory])
+    monkeypatch.setattr(analytics_engine, "attempt_store", AttemptColumnStore())
+    monkeypatch.setattr(settings, "ANALYTICS_REFRESH_SECONDS", 3600)
+    return analytics_engine.attempt_store
+
+
+def _quiz_set(db, quiz_set_id):
+    db.add(DBQuizSet(id=quiz_set_id, title="t", description="", category=f"cat-{quiz_set_id}", difficulty="easy",
+                     estimated_time=1, total_questions=0))
+    db.commit()
+
+
+def test_stored_utc_times_are_not_read_as_local_time(session_factory, store, local_timezone):
+    completed_at = (datetime.utcnow() - timedelta(hours=1)).replace(microsecond=0)
+    with session_factory() as db:
+        _quiz_set(db, "qs")
+        db.add(QuizAttempt(user_id="u", quiz_set_id="qs", answers={}, score=50.0, correct_answers=0,
+                           total_questions=0, time_spent=1, detailed_results=[], completed_at=completed_at))
+        db.commit()
+
+    columns, _, _ = analytics_engine.load_snapshot()
+
+    assert columns.completed_at.tolist() == [calendar.timegm(completed_at.timetuple())]
+
+
+def test_mappings_are_loaded_with_the_snapshot_not_per_report(session_factory, store):
+    with session_factory() as db:
+        _quiz_set(db, "first")
+        _, quiz_set_categories, _ = analytics_engine.load_snapshot()
+        _quiz_set(db, "second")
+
+        # Within ANALYTICS_REFRESH_SECONDS reports reuse the loaded mappings
+        assert analytics_engine.load_snapshot()[1] is quiz_set_categories
+        assert quiz_set_categories == {"first": "cat-first"}
+        store.refresh(db)
+
+    assert analytics_engine.load_snapshot()[1] == {"first": "cat-first", "second": "cat-second"}
@@ -0,0 +1,71 @@
+import pytest
+
+from app.core.cache import MemoryCache
+from app.models.database import Question as DBQuestion, QuizAttempt, QuizSet as DBQuizSet
+from app.models.schemas import QuizSubmission
+from app.services.attempt_codec import attempt_outcomes, decode_attempt, decode_outcomes, encode_attempt
+from app.services.quiz_service import QuizService
+
+QUESTION_IDS = ["q1", "q2", "q3", "q4", "q5"]
+ANSWERS = {"q1": 2, "q2": [3, 0, 1], "q4": [], "q5": [15]}
+CORRECT = {"q1": True, "q2": False, "q4": False, "q5": True}
+ANSWER_KEYS = {"q1": 2, "q2": [0, 1], "q3": 0, "q4": [2], "q5": [15]}
+
+
+def test_round_trip_with_multi_select_answers():
+    blob = encode_attempt(QUESTION_IDS, ANSWERS, CORRECT)
+
+    answers, detailed_results = decode_attempt(blob, QUESTION_IDS, ANSWER_KEYS)
+
+    # List answers come back in ascending order; unanswered questions are left out
+    assert answers == {"q1": 2, "q2": [0, 1, 3], "q4": [], "q5": [15]}
+    assert detailed_results == [
+        {"question_id": "q1", "correct": True, "user_answer": 2, "correct_answer": 2},
+        {"question_id": "q2", "correct": False, "user_answer": [0, 1, 3], "correct_answer": [0, 1]},
+        {"question_id": "q4", "correct": False, "user_answer": [], "correct_answer": [2]},
+        {"question_id": "q5", "correct": True, "user_answer": [15], "correct_answer": [15]},
+    ]
+    assert decode_outcomes(blob) == ([True, True, False, True, True], [True, False, False, False, True])
+
+
+@pytest.mark.parametrize("answer", [[1, 1], [16], [-1], 0x10000, True, "2"])
+def test_answers_that_do_not_fit_stay_json(answer):
+    assert encode_attempt(["q1"], {"q1": answer}, {"q1": False}) is None
+
+
+def test_outcomes_read_compact_and_legacy_json_rows_alike():
+    legacy = QuizAttempt(detailed_results=[
+        {"question_id": question_id, "user_answer": answer, "correct": CORRECT[question_id]}
+        for question_id, answer in ANSWERS.items()
+    ])
+    compact = QuizAttempt(
+        question_order_id=7, results_blob=encode_attempt(QUESTION_IDS, ANSWERS, CORRECT), detailed_results=[]
+    )
+    orders = {7: QUESTION_IDS}
+
+    expected = [("q1", True), ("q2", False), ("q4", False), ("q5", True)]
+    assert attempt_outcomes(legacy, orders) == expected
+    assert attempt_outcomes(compact, orders) == expected
+
+
+def test_submissions_that_do_not_fit_are_stored_as_json(file_session_factory):
+    with file_session_factory() as db:
+        db.add(DBQuizSet(id="qs", title="t", description="", category="c", difficulty="easy", estimated_time=1,
+                         total_questions=2))
+        db.add(DBQuestion(id="q1", quiz_set_id="qs", question="?", options=["a", "b"], correct_answer=1,
+                          type="radio", justification=""))
+        db.add(DBQuestion(id="q2", quiz_set_id="qs", question="?", options=["a", "b", "c"], correct_answer=[0, 2],
+                          type="checkbox", justification=""))
+        db.commit()
+        service = QuizService(db, MemoryCache(max_bytes=1 << 20, default_ttl=60))
+
+        service.submit_quiz("u", "qs", QuizSubmission(answers={"q1": 1, "q2": [2, 0]}))
+        service.submit_quiz("u", "qs", QuizSubmission(answers={"q1": 1, "q2": [0, 20]}))
+
+        compact, legacy = db.query(QuizAttempt).order_by(QuizAttempt.results_blob.is_(None)).all()
+        assert compact.results_blob is not None and compact.detailed_results == []
+        assert legacy.results_blob is None and legacy.answers == {"q1": 1, "q2": [0, 20]}
+        # Both formats feed the same statistics
+        analytics = service.get_quiz_analytics("qs")
+        assert analytics.total_attempts == 2
+        assert {stats.question_id: stats.correct_rate for stats in analytics.question_stats} == {"q1": 1.0, "q2": 0.5}
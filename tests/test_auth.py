@@ -0,0 +1,25 @@
+from app.core.auth import Principal, apply_user_invalidation, token_cache
+from app.core.invalidation import DatabaseBus
+from app.models.database import User
+from app.models.schemas import UserUpdate
+from app.services import user_service
+from app.services.user_service import UserService
+
+
+def test_user_update_evicts_cached_tokens_in_other_workers(session_factory, monkeypatch):
+    writer = DatabaseBus(session_factory, poll_interval=0.01, retention_seconds=3600)
+    other_worker = DatabaseBus(session_factory, poll_interval=0.01, retention_seconds=3600)
+    other_worker.subscribe(apply_user_invalidation)
+    other_worker.poll()
+    monkeypatch.setattr(user_service, "invalidation_bus", writer)
+    with session_factory() as db:
+        db.add(User(id="u", name="Old", email="u@example.com", hashed_password="x"))
+        db.commit()
+        # Cached by the other worker, which the writer's process cannot reach directly
+        token_cache.put("token", Principal(id="u", email="u@example.com", name="Old", role="user"), 2e9)
+
+        UserService(db).update_user("u", UserUpdate(name="New"))
+
+        assert token_cache.get("token") is not None
+        other_worker.poll()
+        assert token_cache.get("token") is None
@@ -0,0 +1,111 @@
+import pickle
+
+from app.core import cache as cache_module
+from app.core.cache import FillGenerations, MemoryCache
+from app.core.invalidation import InvalidationEvent
+from app.models.database import Question as DBQuestion, QuizSet as DBQuizSet
+from app.models.schemas import QuizSubmission
+from app.services.quiz_service import QuizService, apply_invalidation, quiz_cache_generations
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = MemoryCache(max_bytes=1 << 20, default_ttl=60)
+    cache.set("default", "a")
+    cache.set("short", "b", ttl=5)
+
+    now[0] += 5
+    assert cache.get("short") is None
+    assert cache.get("default") == "a"
+
+    now[0] += 55
+    assert cache.get("default") is None
+    stats = cache.stats()
+    assert (stats.expirations, stats.entries, stats.bytes) == (2, 0, 0)
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    value = "x" * 100
+    size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    cache = MemoryCache(max_bytes=3 * size, default_ttl=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, value)
+    cache.get("a")  # "b" is now the least recently used
+
+    cache.set("d", value)
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == [value] * 3
+    # A value larger than the whole budget is not stored and evicts nothing
+    cache.set("huge", "x" * (4 * size))
+    assert cache.get("huge") is None
+    stats = cache.stats()
+    assert (stats.evictions, stats.entries, stats.bytes) == (1, 3, 3 * size)
+
+
+def test_fill_after_invalidation_is_refused():
+    cache = MemoryCache(max_bytes=1 << 20, default_ttl=60)
+    generations = FillGenerations()
+
+    generation = generations.current("qs-1")
+    generations.bump("qs-1")  # a write committed while the reader was loading
+
+    assert not generations.set_if_current(cache, "qs-1", generation, {"questions:qs-1:all": ["stale"]})
+    assert cache.get("questions:qs-1:all") is None
+    # Other scopes are unaffected
+    assert generations.set_if_current(cache, "qs-2", generations.current("qs-2"), {"questions:qs-2:all": ["ok"]})
+
+
+def test_fill_racing_the_invalidation_deletes_is_removed():
+    generations = FillGenerations()
+
+    class InterleavingCache(MemoryCache):
+        def set_many(self, items, ttl=None):
+            # The bump lands between the check and the write, and its deletes ran before the write
+            generations.bump("qs-1")
+            super().set_many(items, ttl)
+
+    cache = InterleavingCache(max_bytes=1 << 20, default_ttl=60)
+    assert not generations.set_if_current(cache, "qs-1", generations.current("qs-1"), {"quiz_set:qs-1": "stale"})
+    assert cache.get("quiz_set:qs-1") is None
+
+
+def test_stale_read_cannot_repopulate_after_write(session_factory):
+    cache = MemoryCache(max_bytes=1 << 20, default_ttl=60)
+    with session_factory() as db:
+        db.add(DBQuizSet(id="qs", title="t", category="c", difficulty="easy", estimated_time=1, total_questions=1))
+        db.add(DBQuestion(id="q1", quiz_set_id="qs", question="?", options=["a", "b"], correct_answer=0,
+                          type="radio", justification=""))
+        db.commit()
+
+        service = QuizService(db, cache)
+        generation = quiz_cache_generations.current("qs")
+        stale = service.get_questions("qs")
+        cache.clear()
+        # The answer key changes and is invalidated before the slow reader stores its rows
+        db.query(DBQuestion).filter(DBQuestion.id == "q1").update({"correct_answer": 1})
+        db.commit()
+        apply_invalidation(InvalidationEvent("questions", "qs", 0), cache)
+
+        assert not quiz_cache_generations.set_if_current(cache, "qs", generation, {"questions:qs:all": stale})
+        assert service.get_questions("qs")[0].correct_answer == 1
+
+
+def test_grading_ignores_stale_cached_answer_keys(session_factory):
+    cache = MemoryCache(max_bytes=1 << 20, default_ttl=60)
+    with session_factory() as db:
+        db.add(DBQuizSet(id="qs", title="t", category="c", difficulty="easy", estimated_time=1, total_questions=1))
+        db.add(DBQuestion(id="q1", quiz_set_id="qs", question="?", options=["a", "b"], correct_answer=0,
+                          type="radio", justification=""))
+        db.commit()
+        service = QuizService(db, cache)
+        service.get_questions("qs")
+        # Changed by another worker whose invalidation has not arrived yet
+        db.query(DBQuestion).filter(DBQuestion.id == "q1").update({"correct_answer": 1})
+        db.commit()
+
+        results = service.submit_quiz("user", "qs", QuizSubmission(answers={"q1": 1}))
+
+        assert results.correct_answers == 1
+        assert service.get_questions("qs")[0].correct_answer == 0  # display copy still cached
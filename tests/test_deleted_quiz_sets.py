@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from app.core.cache import MemoryCache
+from app.models.database import Question as DBQuestion, QuizAttempt, QuizSet as DBQuizSet
+from app.models.schemas import QuestionUpdate
+from app.services import analytics_engine
+from app.services.analytics_engine import AttemptColumnStore, category_pass_rates, question_discrimination
+from app.services.quiz_service import QuizService
+
+
+def _seed(db, quiz_set_id, deleted=False):
+    db.add(DBQuizSet(id=quiz_set_id, title="t", category=f"cat-{quiz_set_id}", difficulty="easy",
+                     estimated_time=1, total_questions=1, deleted_at=datetime.utcnow() if deleted else None))
+    db.add(DBQuestion(id=f"{quiz_set_id}-q", quiz_set_id=quiz_set_id, question="?", options=["a", "b"],
+                      correct_answer=0, type="radio", justification=""))
+    db.commit()
+
+
+def test_questions_of_deleted_quiz_sets_are_gone(session_factory):
+    with session_factory() as db:
+        _seed(db, "live")
+        _seed(db, "gone", deleted=True)
+        service = QuizService(db, MemoryCache(max_bytes=1 << 20, default_ttl=60))
+
+        assert service.get_question("live-q") is not None
+        assert service.get_question("gone-q") is None
+        assert service.update_question("gone", "gone-q", QuestionUpdate(correct_answer=1)) is None
+        assert not service.delete_question("gone", "gone-q")
+        assert db.get(DBQuestion, "gone-q").correct_answer == 0
+        assert db.get(DBQuizSet, "gone").total_questions == 1
+
+        assert service.update_question("live", "live-q", QuestionUpdate(correct_answer=1)).correct_answer == 1
+        assert service.delete_question("live", "live-q")
+
+
+def _attempt(db, quiz_set_id, score, correct):
+    db.add(QuizAttempt(
+        user_id="user", quiz_set_id=quiz_set_id, answers={}, score=score, correct_answers=int(correct),
+        total_questions=1, time_spent=10, completed_at=datetime.utcnow() - timedelta(hours=1),
+        detailed_results=[{"question_id": f"{quiz_set_id}-q", "user_answer": 0, "correct": correct}]
+    ))
+    db.commit()
+
+
+def test_reports_leave_out_deleted_quiz_sets(session_factory, monkeypatch):
+    monkeypatch.setattr(analytics_engine, "session_factories", lambda: [session_factory])
+    monkeypatch.setattr(analytics_engine, "attempt_store", AttemptColumnStore())
+    with session_factory() as db:
+        _seed(db, "live")
+        _seed(db, "gone")
+        _attempt(db, "live", 100.0, True)
+        _attempt(db, "gone", 0.0, False)
+        analytics_engine.load_snapshot()
+        # Deleted after its attempt was loaded; the store only appends
+        db.get(DBQuizSet, "gone").deleted_at = datetime.utcnow()
+        db.commit()
+        analytics_engine.attempt_store.refresh(db)
+
+    columns, quiz_set_categories, question_quiz_sets = analytics_engine.load_snapshot()
+
+    assert columns.quiz_set_ids == ("live", "gone")
+    assert [row["category"] for row in category_pass_rates(columns, quiz_set_categories, 0, 70.0)] == ["cat-live"]
+    assert [row["question_id"] for row in question_discrimination(columns, question_quiz_sets, 1)] == ["live-q"]
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from app.models.database import Question as DBQuestion, QuizAttempt, QuizSet as DBQuizSet
+from app.models.schemas import ExamSessionCreate, QuizSubmission
+from app.services.exam_session_service import ExamSessionError, ExamSessionService, session_cache
+
+
+def create_session(factory):
+    with factory() as db:
+        db.add(DBQuizSet(id="qs", title="t", category="c", difficulty="easy", estimated_time=1, total_questions=3))
+        for i in range(3):
+            db.add(DBQuestion(id=f"q{i}", quiz_set_id="qs", question="?", options=["a", "b"], correct_answer=0,
+                              type="radio", justification="", category="c", difficulty="easy"))
+        db.commit()
+        return ExamSessionService(db).create_session(
+            "user", "qs", ExamSessionCreate(shuffle_options=False, seed=1)
+        ).id
+
+
+def test_concurrent_submits_record_one_attempt(file_session_factory):
+    session_id = create_session(file_session_factory)
+    barrier = threading.Barrier(4)
+    outcomes = []
+
+    def submit():
+        with file_session_factory() as db:
+            barrier.wait()
+            try:
+                ExamSessionService(db).submit_session(session_id, "user", QuizSubmission(answers={"q0": 0}))
+                outcomes.append("graded")
+            except ExamSessionError:
+                outcomes.append("rejected")
+
+    threads = [threading.Thread(target=submit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(outcomes) == ["graded", "rejected", "rejected", "rejected"]
+    with file_session_factory() as db:
+        assert db.query(QuizAttempt).count() == 1
+
+
+def test_submit_after_submit_is_rejected_even_with_a_stale_cached_record(file_session_factory):
+    session_id = create_session(file_session_factory)
+    stale = session_cache.get(session_id)
+    with file_session_factory() as db:
+        ExamSessionService(db).submit_session(session_id, "user", QuizSubmission(answers={}))
+    session_cache.put(stale)
+
+    with file_session_factory() as db:
+        with pytest.raises(ExamSessionError):
+            ExamSessionService(db).submit_session(session_id, "user", QuizSubmission(answers={}))
+    assert session_cache.get(session_id) is None
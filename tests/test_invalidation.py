@@ -0,0 +1,87 @@
+import time
+
+from app.core.invalidation import DatabaseBus
+from app.models.database import CacheInvalidation
+
+
+def make_bus(session_factory, received):
+    bus = DatabaseBus(session_factory, poll_interval=0.01, retention_seconds=3600)
+    bus.subscribe(received.append)
+    bus.poll()  # starts from the newest row
+    return bus
+
+
+def insert(session_factory, row_id, entity_id):
+    with session_factory() as db:
+        db.add(CacheInvalidation(id=row_id, entity="question", entity_id=entity_id, version=row_id, origin="other"))
+        db.commit()
+
+
+def test_round_trip_between_two_buses(session_factory):
+    publisher_events, listener_events = [], []
+    publisher = make_bus(session_factory, publisher_events)
+    listener = make_bus(session_factory, listener_events)
+
+    publisher.publish_many([("quiz_set", "qs-1"), ("question", "q-1")])
+
+    # Applied locally at once, remotely on the next poll
+    assert [event.entity_id for event in publisher_events] == ["qs-1", "q-1"]
+    assert listener.poll() == 2
+    assert [(event.entity, event.entity_id) for event in listener_events] == [("quiz_set", "qs-1"), ("question", "q-1")]
+    # A worker ignores its own events and never applies a row twice
+    assert publisher.poll() == 2
+    assert len(publisher_events) == 2
+    assert listener.poll() == 0
+    assert len(listener_events) == 2
+
+
+def test_propagation_latency_is_measured_by_the_receiver(session_factory):
+    publisher = make_bus(session_factory, [])
+    listener = make_bus(session_factory, [])
+
+    started = time.monotonic()
+    publisher.publish("question", "q-1")
+    time.sleep(0.05)  # the listener polls 50 ms after the publish
+    listener.poll()
+    elapsed_ms = (time.monotonic() - started) * 1000
+
+    assert 50 <= listener.last_latency_ms <= elapsed_ms + 1
+    assert listener.max_latency_ms == listener.last_latency_ms
+    first = listener.last_latency_ms
+
+    publisher.publish("question", "q-2")
+    listener.poll()
+
+    assert listener.last_latency_ms < first
+    assert listener.max_latency_ms == first
+    assert listener.stats()["max_latency_ms"] == first
+    # Own events are not propagation
+    assert publisher.last_latency_ms is None
+
+
+def test_out_of_order_commits_are_applied(session_factory):
+    received = []
+    bus = make_bus(session_factory, received)
+
+    # Id 2 commits while the transaction holding id 1 is still open
+    insert(session_factory, 2, "late-reader")
+    assert bus.poll() == 1
+    insert(session_factory, 1, "early-id")
+    assert bus.poll() == 1
+    insert(session_factory, 3, "next")
+    bus.poll()
+
+    assert [event.entity_id for event in received] == ["late-reader", "early-id", "next"]
+
+
+def test_skipped_ids_are_given_up_after_settling(session_factory):
+    received = []
+    bus = make_bus(session_factory, received)
+    bus.settle_seconds = 0
+
+    insert(session_factory, 3, "after-rollback")
+    bus.poll()
+    bus.poll()
+
+    assert bus._gaps == {}
+    assert [event.entity_id for event in received] == ["after-rollback"]
@@ -0,0 +1,43 @@
+import json
+
+from sqlalchemy import inspect, text
+
+from app.database.sharding import ShardRouter
+from migrate_attempts import migrate
+
+OLD_ATTEMPTS = """CREATE TABLE quiz_attempts (
+    id VARCHAR NOT NULL, user_id VARCHAR NOT NULL, quiz_set_id VARCHAR NOT NULL, answers JSON NOT NULL,
+    score FLOAT NOT NULL, correct_answers INTEGER NOT NULL, total_questions INTEGER NOT NULL,
+    time_spent INTEGER NOT NULL, detailed_results JSON NOT NULL, completed_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+    PRIMARY KEY (id)
+)"""
+
+
+def test_every_shard_is_migrated(tmp_path):
+    router = ShardRouter([f"sqlite:///{tmp_path}/shard-{i}.db" for i in range(2)])
+    results = [
+        {"question_id": "q1", "user_answer": 1, "correct": True},
+        {"question_id": "q2", "user_answer": [0, 2], "correct": False},
+    ]
+    for shard, bind in enumerate(router.engines):
+        with bind.begin() as connection:
+            connection.execute(text(OLD_ATTEMPTS))
+            connection.execute(
+                text("INSERT INTO quiz_attempts VALUES (:id, 'u', 'qs', '{}', 50, 1, 2, 10, :results, NULL)"),
+                {"id": f"a{shard}", "results": json.dumps(results)}
+            )
+
+    for bind, session_factory in zip(router.engines, router.sessionmakers):
+        migrate(bind, session_factory, batch_size=10, shard=True)
+
+    for bind in router.engines:
+        assert "question_orders" in inspect(bind).get_table_names()
+        with bind.connect() as connection:
+            row = connection.execute(text("SELECT results_blob, detailed_results FROM quiz_attempts")).one()
+            # The question order is stored next to the attempt, on the same shard
+            orders = connection.execute(text(
+                "SELECT o.question_ids FROM question_orders o JOIN quiz_attempts a ON a.question_order_id = o.id"
+            )).scalars().all()
+        assert row.results_blob is not None and json.loads(row.detailed_results) == []
+        assert orders == ["q1,q2"]
+    router.dispose()
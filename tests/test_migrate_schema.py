@@ -0,0 +1,125 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.core.cache import MemoryCache
+from app.models.database import Question as DBQuestion
+from app.services.quiz_service import QuizService
+from migrate_schema import migrate
+
+# quiz_sets and questions as they shipped before soft deletes and the delta feed
+OLD_SCHEMA = (
+    """CREATE TABLE quiz_sets (
+        id VARCHAR NOT NULL, title VARCHAR(255) NOT NULL, description TEXT, category VARCHAR(100) NOT NULL,
+        difficulty VARCHAR(20) NOT NULL, estimated_time INTEGER NOT NULL, total_questions INTEGER,
+        is_active BOOLEAN, created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME,
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE questions (
+        id VARCHAR NOT NULL, quiz_set_id VARCHAR NOT NULL, question TEXT NOT NULL, options JSON NOT NULL,
+        correct_answer JSON NOT NULL, type VARCHAR(20) NOT NULL, justification TEXT NOT NULL,
+        difficulty VARCHAR(20), category VARCHAR(100), tags JSON, time_limit INTEGER, points INTEGER,
+        explanation TEXT, hints JSON, screenshots JSON, reference_links JSON, videos JSON,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME, last_updated DATETIME,
+        review_status VARCHAR(20), difficulty_rating FLOAT, success_rate FLOAT,
+        PRIMARY KEY (id), FOREIGN KEY(quiz_set_id) REFERENCES quiz_sets (id)
+    )""",
+    "INSERT INTO quiz_sets (id, title, description, category, difficulty, estimated_time, total_questions, is_active)"
+    " VALUES ('qs', 't', '', 'c', 'easy', 1, 2, 1)",
+    "INSERT INTO questions (id, quiz_set_id, question, options, correct_answer, type, justification)"
+    " VALUES ('q1', 'qs', '?', '[\"a\", \"b\"]', '0', 'radio', ''), ('q2', 'qs', '?', '[\"a\", \"b\"]', '1', 'radio', '')",
+)
+
+
+def _old_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    with engine.begin() as connection:
+        for statement in OLD_SCHEMA:
+            connection.execute(text(statement))
+    return engine
+
+
+def test_migration_brings_an_old_database_up_to_date(tmp_path):
+    engine = _old_database(tmp_path)
+
+    migrate(engine)
+    migrate(engine)  # safe to re-run
+
+    inspector = inspect(engine)
+    assert "deleted_at" in {column["name"] for column in inspector.get_columns("quiz_sets")}
+    assert "tombstones" in inspector.get_table_names()
+    [foreign_key] = inspector.get_foreign_keys("questions")
+    assert foreign_key["options"]["ondelete"] == "CASCADE"
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT id FROM questions ORDER BY id")).scalars().all() == ["q1", "q2"]
+        assert connection.execute(text("SELECT deleted_at FROM quiz_sets")).scalar() is None
+    engine.dispose()
+
+
+def test_rebuilt_tables_cascade_on_delete(tmp_path):
+    engine = _old_database(tmp_path)
+    migrate(engine)
+
+    with engine.connect() as connection:
+        connection.execute(text("PRAGMA foreign_keys=ON"))
+        connection.execute(text("DELETE FROM quiz_sets WHERE id = 'qs'"))
+        assert connection.execute(text("SELECT COUNT(*) FROM questions")).scalar() == 0
+    engine.dispose()
+
+
+def test_existing_rows_are_numbered_for_the_delta_feed(tmp_path):
+    engine = _old_database(tmp_path)
+
+    migrate(engine, batch_size=1)
+    migrate(engine)  # numbered rows keep their sequence
+
+    with engine.connect() as connection:
+        seqs = connection.execute(text(
+            "SELECT change_seq FROM quiz_sets UNION ALL SELECT change_seq FROM questions"
+        )).scalars().all()
+        assert sorted(seqs) == [1, 2, 3]
+        assert connection.execute(text("SELECT value FROM change_counters")).scalar() == 3
+    engine.dispose()
+
+
+def test_migrated_database_serves_the_question_bank(tmp_path):
+    engine = _old_database(tmp_path)
+    migrate(engine)
+
+    with Session(engine) as db:
+        assert {(q.times_answered, q.times_correct) for q in db.query(DBQuestion)} == {(0, 0)}
+        feed = QuizService(db, MemoryCache(max_bytes=1 << 20, default_ttl=60)).get_changes(since=0)
+        assert [quiz_set.id for quiz_set in feed.quiz_sets] == ["qs"]
+        assert sorted(question.id for question in feed.questions) == ["q1", "q2"]
+    engine.dispose()
+
+
+def test_review_states_cascade_with_their_question(tmp_path):
+    engine = _old_database(tmp_path)
+    with engine.begin() as connection:
+        # As created before review states followed question deletes
+        connection.execute(text(
+            """CREATE TABLE review_states (
+                id VARCHAR NOT NULL, user_id VARCHAR NOT NULL, question_id VARCHAR NOT NULL,
+                quiz_set_id VARCHAR NOT NULL, interval_days FLOAT, ease FLOAT, repetitions INTEGER,
+                lapses INTEGER, due_at DATETIME NOT NULL, last_reviewed_at DATETIME,
+                PRIMARY KEY (id), CONSTRAINT uq_review_states_user_question UNIQUE (user_id, question_id),
+                FOREIGN KEY(user_id) REFERENCES users (id), FOREIGN KEY(question_id) REFERENCES questions (id),
+                FOREIGN KEY(quiz_set_id) REFERENCES quiz_sets (id)
+            )"""
+        ))
+        connection.execute(text(
+            "INSERT INTO review_states (id, user_id, question_id, quiz_set_id, due_at)"
+            " VALUES ('r1', 'u', 'q1', 'qs', '2024-01-01 00:00:00')"
+        ))
+
+    migrate(engine)
+
+    foreign_keys = {
+        foreign_key["referred_table"]: foreign_key["options"].get("ondelete")
+        for foreign_key in inspect(engine).get_foreign_keys("review_states")
+    }
+    assert foreign_keys == {"users": None, "questions": "CASCADE", "quiz_sets": None}
+    assert "ix_review_states_user_due" in {index["name"] for index in inspect(engine).get_indexes("review_states")}
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT id FROM review_states")).scalars().all() == ["r1"]
+    engine.dispose()
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from app.models.database import OutboxEvent, Question as DBQuestion, QuizSet as DBQuizSet, ReviewState
+from app.services.outbox_service import OutboxWorker
+
+
+def _review_event(completed_at, correct=False):
+    return {"user_id": "u", "quiz_set_id": "qs", "results": [["q1", correct]], "completed_at": completed_at.isoformat()}
+
+
+def test_redelivered_review_event_is_applied_once(session_factory):
+    with session_factory() as db:
+        db.add(DBQuizSet(id="qs", title="t", category="c", difficulty="easy", estimated_time=1, total_questions=1))
+        db.add(DBQuestion(id="q1", quiz_set_id="qs", question="?", options=["a", "b"], correct_answer=0,
+                          type="radio", justification=""))
+        db.commit()
+    worker = OutboxWorker()
+    first = datetime.utcnow() - timedelta(hours=2)
+
+    # Event 2 is event 1 delivered again, as after a worker's lease ran out mid-batch
+    for event_id in (1, 2):
+        with session_factory() as db:
+            db.add(OutboxEvent(id=event_id, kind="review_results", payload=_review_event(first),
+                               available_at=datetime.utcnow()))
+            db.commit()
+        assert worker.process(event_id, "review_results", _review_event(first), factory=session_factory)
+
+    with session_factory() as db:
+        state = db.query(ReviewState).one()
+        assert (state.lapses, state.due_at) == (1, first)
+
+    # A later attempt still counts
+    later = first + timedelta(hours=1)
+    with session_factory() as db:
+        db.add(OutboxEvent(id=3, kind="review_results", payload=_review_event(later, correct=True),
+                           available_at=datetime.utcnow()))
+        db.commit()
+    assert worker.process(3, "review_results", _review_event(later, correct=True), factory=session_factory)
+    with session_factory() as db:
+        state = db.query(ReviewState).one()
+        assert (state.lapses, state.repetitions, state.last_reviewed_at) == (1, 1, later)
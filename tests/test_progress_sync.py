@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from app.core.cache import MemoryCache
+from app.models.database import QuizSet as DBQuizSet, UserProgress
+from app.models.schemas import ProgressSyncRecord
+from app.services.quiz_service import QuizService
+
+T0 = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def _record(quiz_set_id, minutes, question):
+    return ProgressSyncRecord(user_id="ignored", quiz_set_id=quiz_set_id, current_question=question,
+                              client_updated_at=T0 + timedelta(minutes=minutes))
+
+
+def _statuses(results):
+    return [(result.quiz_set_id, result.status.value) for result in results]
+
+
+def _service(db):
+    for quiz_set_id in ("a", "b"):
+        db.add(DBQuizSet(id=quiz_set_id, title="t", category="c", difficulty="easy", estimated_time=1))
+    db.commit()
+    return QuizService(db, MemoryCache(max_bytes=1 << 20, default_ttl=60))
+
+
+def test_latest_client_write_wins_across_syncs(session_factory):
+    with session_factory() as db:
+        service = _service(db)
+
+        assert _statuses(service.sync_progress("u", [_record("a", 0, 1), _record("b", 0, 1)])) == [
+            ("a", "created"), ("b", "created")
+        ]
+        results = service.sync_progress("u", [_record("a", 10, 2), _record("b", -5, 9)])
+
+        assert _statuses(results) == [("a", "updated"), ("b", "stale")]
+        # A stale write reports the timestamp that won, and the stored row is kept
+        assert results[1].client_updated_at == T0
+        db.expire_all()
+        rows = {row.quiz_set_id: row for row in db.query(UserProgress).filter(UserProgress.user_id == "u")}
+        assert (rows["a"].current_question, rows["a"].client_updated_at) == (2, T0 + timedelta(minutes=10))
+        assert (rows["b"].current_question, rows["b"].client_updated_at) == (1, T0)
+
+
+def test_one_batch_keeps_the_latest_record_per_quiz_set(session_factory):
+    with session_factory() as db:
+        service = _service(db)
+
+        results = service.sync_progress("u", [
+            _record("a", 5, 5), _record("a", 1, 1), _record("missing", 0, 1), _record("a", 5, 6),
+        ])
+
+        # Ties go to the record sent last
+        assert _statuses(results) == [("a", "stale"), ("a", "stale"), ("missing", "not_found"), ("a", "created")]
+        assert db.query(UserProgress.current_question).scalar() == 6
+        assert db.query(UserProgress).count() == 1
+
+
+def test_client_clocks_ahead_of_the_server_are_capped(session_factory):
+    with session_factory() as db:
+        service = _service(db)
+        future = ProgressSyncRecord(user_id="u", quiz_set_id="a", current_question=1,
+                                    client_updated_at=datetime.utcnow() + timedelta(days=365))
+        service.sync_progress("u", [future])
+
+        now = ProgressSyncRecord(user_id="u", quiz_set_id="a", current_question=2,
+                                 client_updated_at=datetime.utcnow() + timedelta(seconds=1))
+
+        assert _statuses(service.sync_progress("u", [now])) == [("a", "updated")]
@@ -0,0 +1,99 @@
+import threading
+from datetime import datetime
+
+from app.core.cache import MemoryCache
+from app.models.database import Question as DBQuestion, QuestionTiming, QuizSet as DBQuizSet, ReviewState, User
+from app.models.schemas import QuestionCreate, QuestionUpdate
+from app.services.quiz_service import QuizService
+
+
+def _seed(db, questions=1, quiz_set_id="qs"):
+    if db.get(User, "u") is None:
+        db.add(User(id="u", name="u", email="u@example.com", hashed_password="x"))
+    db.add(DBQuizSet(id=quiz_set_id, title="t", description="", category="c", difficulty="easy", estimated_time=1,
+                     total_questions=questions))
+    for i in range(questions):
+        db.add(DBQuestion(id=f"{quiz_set_id}-q{i}", quiz_set_id=quiz_set_id, question="?", options=["a", "b"],
+                          correct_answer=0, type="radio", justification=""))
+    db.commit()
+
+
+def _service(db):
+    return QuizService(db, MemoryCache(max_bytes=1 << 20, default_ttl=60))
+
+
+def test_deleting_a_question_under_review_removes_its_review_states(enforced_session_factory):
+    with enforced_session_factory() as db:
+        _seed(db)
+        db.add(ReviewState(user_id="u", question_id="qs-q0", quiz_set_id="qs", due_at=datetime.utcnow()))
+        db.commit()
+
+        assert _service(db).delete_question("qs", "qs-q0")
+
+        assert db.query(ReviewState).count() == 0
+        assert db.get(DBQuizSet, "qs").total_questions == 0
+
+
+def _add_dependents(db, question_id, quiz_set_id):
+    db.add(ReviewState(user_id="u", question_id=question_id, quiz_set_id=quiz_set_id, due_at=datetime.utcnow()))
+    db.add(QuestionTiming(question_id=question_id, quiz_set_id=quiz_set_id, responses=1, sketch=b""))
+    db.commit()
+
+
+def test_delete_removes_dependents_in_its_transaction(session_factory):
+    with session_factory() as db:
+        _seed(db, questions=2)
+        _add_dependents(db, "qs-q0", "qs")
+        _add_dependents(db, "qs-q1", "qs")
+
+        assert _service(db).delete_question("qs", "qs-q0")
+
+        assert [state.question_id for state in db.query(ReviewState)] == ["qs-q1"]
+        assert [timing.question_id for timing in db.query(QuestionTiming)] == ["qs-q1"]
+
+
+def test_writes_outside_the_question_quiz_set_are_rejected(session_factory):
+    with session_factory() as db:
+        _seed(db, quiz_set_id="qs")
+        _seed(db, quiz_set_id="other")
+        _add_dependents(db, "qs-q0", "qs")
+        service = _service(db)
+
+        assert service.update_question("other", "qs-q0", QuestionUpdate(correct_answer=1)) is None
+        assert not service.delete_question("other", "qs-q0")
+        assert not service.delete_question("qs", "missing")
+
+        db.expire_all()
+        assert db.get(DBQuestion, "qs-q0").correct_answer == 0
+        assert db.query(ReviewState).count() == 1 and db.query(QuestionTiming).count() == 1
+        assert [db.get(DBQuizSet, quiz_set_id).total_questions for quiz_set_id in ("qs", "other")] == [1, 1]
+
+
+def test_concurrent_creates_count_every_question(file_session_factory):
+    with file_session_factory() as db:
+        _seed(db, questions=0)
+    writers = 8
+    barrier = threading.Barrier(writers, timeout=5)
+    errors = []
+
+    def create(i):
+        with file_session_factory() as db:
+            barrier.wait()
+            try:
+                _service(db).create_question(QuestionCreate(
+                    quiz_set_id="qs", question=f"q{i}", options=["a", "b"], correct_answer=0, type="radio",
+                    justification=""
+                ))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=create, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with file_session_factory() as db:
+        assert db.get(DBQuizSet, "qs").total_questions == writers
+        assert db.query(DBQuestion).count() == writers
@@ -0,0 +1,93 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.core.cache import MemoryCache
+from app.database import sharding
+from app.database.sharding import HashRing, ShardRouter
+from app.models.database import ExamSession as DBExamSession, QuizSet as DBQuizSet
+from app.services.exam_session_service import make_session_id, session_quiz_set_id
+from app.services.quiz_service import QuizService
+
+
+@pytest.fixture
+def router(tmp_path):
+    router = ShardRouter([f"sqlite:///{tmp_path}/shard-{i}.db" for i in range(3)])
+    router.create_schema()
+    yield router
+    router.dispose()
+
+
+def test_session_ids_name_their_quiz_set():
+    session_id = make_session_id("mcpa-level-1")
+
+    assert session_quiz_set_id(session_id) == "mcpa-level-1"
+    assert session_quiz_set_id(make_session_id("odd~id")) == "odd~id"
+    # Ids from before sessions carried their quiz set
+    assert session_quiz_set_id("0b5c7a8e-7a8b-4b55-a3e4-6f1f7e9d9c11") is None
+
+
+def test_session_is_stored_on_the_shard_its_id_routes_to(router):
+    quiz_set_id = "quiz-set-7"
+    session_id = make_session_id(quiz_set_id)
+    with router.session_for(quiz_set_id) as db:
+        db.add(DBExamSession(id=session_id, user_id="u", quiz_set_id=quiz_set_id, seed=1, question_ids="q1"))
+        db.commit()
+
+    with router.session_for(session_quiz_set_id(session_id)) as db:
+        assert db.get(DBExamSession, session_id) is not None
+    found = router.fan_out(lambda db: db.get(DBExamSession, session_id) is not None)
+    assert found.count(True) == 1 and found.index(True) == router.shard_for(quiz_set_id)
+
+
+def test_run_on_runs_only_the_given_shards_in_parallel(router):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def work(shard):
+        def run(db):
+            barrier.wait()  # both shards must be running at once to get past this
+            return shard, db.get_bind().url.database
+        return run
+
+    results = router.run_on({0: work(0), 2: work(2)})
+
+    assert sorted(results) == [0, 2]
+    assert results[2][1].endswith("shard-2.db")
+
+
+@pytest.mark.parametrize("shards", [1, 3, 7])
+def test_adding_a_shard_moves_only_its_share_of_keys(shards):
+    keys = [f"quiz-set-{i}" for i in range(20000)]
+    before = HashRing(shards)
+    after = HashRing(shards + 1)
+
+    moved = [key for key in keys if before.shard_for(key) != after.shard_for(key)]
+
+    # Keys only move onto the new shard, and roughly 1/(N+1) of them do
+    assert all(after.shard_for(key) == shards for key in moved)
+    assert abs(len(moved) / len(keys) - 1 / (shards + 1)) < 0.1
+
+
+def test_quiz_set_pages_merge_across_shards(router, monkeypatch):
+    monkeypatch.setattr(sharding, "shard_router", router)
+    start = datetime(2024, 1, 1)
+    ids = [f"qs-{i:02d}" for i in range(12)]
+    for i, quiz_set_id in enumerate(ids):
+        with router.session_for(quiz_set_id) as db:
+            # A core insert skips change stamping, which needs the main database
+            db.execute(insert(DBQuizSet).values(
+                id=quiz_set_id, title="t", description="", category="c", difficulty="easy", estimated_time=1,
+                total_questions=0, created_at=start + timedelta(minutes=i % 6)
+            ))
+            db.commit()
+    assert len({router.shard_for(quiz_set_id) for quiz_set_id in ids}) > 1
+    # Ties on created_at are broken by id, as on a single database
+    expected = sorted(ids, key=lambda quiz_set_id: (int(quiz_set_id[3:]) % 6, quiz_set_id))
+
+    with router.session_for(ids[0]) as db:
+        service = QuizService(db, MemoryCache(max_bytes=1 << 20, default_ttl=60))
+        pages = [[quiz_set.id for quiz_set in service.get_quiz_sets(skip, 5)] for skip in (0, 5, 10)]
+
+    assert pages == [expected[0:5], expected[5:10], expected[10:12]]
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def test_cancelled_leader_does_not_fail_coalesced_callers():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        executions = []
+
+        async def load():
+            executions.append(1)
+            await release.wait()
+            return "rows"
+
+        leader = asyncio.ensure_future(flight.do("key", load))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", load))
+        await asyncio.sleep(0)
+
+        leader.cancel()  # its client disconnected
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await follower == "rows"
+        assert leader.cancelled()
+        assert executions == [1]
+        assert flight.stats() == {"calls": 2, "executions": 1, "coalesced": 1, "in_flight": 0}
+
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_caller_and_free_the_key():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fail():
+            await release.wait()
+            raise ValueError("boom")
+
+        callers = [asyncio.ensure_future(flight.do("key", fail)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+
+        assert [type(result) for result in results] == [ValueError] * 3
+        assert await flight.do("key", lambda: asyncio.sleep(0, result="fresh")) == "fresh"
+
+    asyncio.run(scenario())
+
+
+def test_work_finishes_when_every_caller_left():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        finished = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            finished.set()
+            raise ValueError("nobody is listening")
+
+        caller = asyncio.ensure_future(flight.do("key", load))
+        await asyncio.sleep(0)
+        caller.cancel()
+        release.set()
+        await asyncio.wait_for(finished.wait(), 1)
+        await asyncio.sleep(0)
+
+        assert flight.stats()["in_flight"] == 0
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+
+    asyncio.run(scenario())
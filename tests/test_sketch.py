@@ -0,0 +1,55 @@
+import math
+import random
+
+import pytest
+
+from app.core.sketch import QuantileSketch
+
+QUANTILES = [0.0, 0.1, 0.5, 0.9, 0.99, 1.0]
+
+
+def _values(seed, n=5000):
+    rng = random.Random(seed)
+    # Seconds spent per question: long tailed, across several orders of magnitude
+    return [rng.lognormvariate(3, 1.5) for _ in range(n)]
+
+
+@pytest.mark.parametrize("relative_accuracy", [0.01, 0.05])
+def test_quantiles_are_within_the_relative_accuracy(relative_accuracy):
+    values = _values(1)
+    sketch = QuantileSketch(relative_accuracy)
+    for value in values:
+        sketch.add(value)
+
+    ordered = sorted(values)
+    for q in QUANTILES:
+        expected = ordered[math.floor(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - expected) <= relative_accuracy * expected
+    assert sketch.count == len(values)
+    assert sketch.mean == pytest.approx(sum(values) / len(values))
+
+
+def test_merged_sketches_match_one_sketch_over_all_values():
+    first, second = _values(2), _values(3, n=1234)
+    whole = QuantileSketch(0.02)
+    for value in first + second:
+        whole.add(value)
+    merged, other = QuantileSketch(0.02), QuantileSketch(0.02)
+    for value in first:
+        merged.add(value)
+    for value in second:
+        other.add(value)
+
+    merged.merge(other)
+
+    assert merged.bins == whole.bins and merged.count == whole.count
+    assert [merged.quantile(q) for q in QUANTILES] == [whole.quantile(q) for q in QUANTILES]
+    assert merged.sum == pytest.approx(whole.sum)
+    # Stored sketches merge the same way
+    restored = QuantileSketch.from_bytes(merged.to_bytes())
+    assert [restored.quantile(q) for q in QUANTILES] == [whole.quantile(q) for q in QUANTILES]
+
+
+def test_sketches_of_different_accuracy_do_not_merge():
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))